@@ -2,18 +2,31 @@
 犬画像中央配置スクリプト
 - 透明部分を検出してワンコを中央に配置
 - パディング付きで余裕を持たせる
-- 元画像はバックアップを取る
+- 元画像は scripts/backup_store.py の置き場にバックアップ（中身が同じなら増えない）
+- ビルドキャッシュで、前回と同じ設定で中央配置済みの画像はスキップ
+- 中央配置した @1x から @0.5x / @0.25x も書き出し、density_manifest.json を更新
+  （scripts/sprite_density.py。低スペック端末は小さい密度を読み込む）
 """
 
 from PIL import Image
 import os
-import shutil
-from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "scripts"))
+from backup_store import backup_before_write, restore_run
+from build_cache import BuildCache, make_key
+from parallel import default_jobs, map_ordered, parse_jobs
+import sprite_density
 
 # 設定
 OUTPUT_SIZE = 512  # 出力サイズ（正方形）
 PADDING_RATIO = 0.04  # パディング比率（4%の余白）
-BACKUP_FOLDER = "_backup_originals"
+BACKUP_TOOL = "center_dogs"  # バックアップ置き場での名前
+
+# 中央配置の処理を変えたら上げる（キャッシュを無効化するため）
+CENTER_VERSION = 2
+CACHE_NAME = "sprites"  # sprite_slicer と共有
+CACHE_STAGE = "center"
 
 # 処理対象フォルダ
 DOG_FOLDERS = [
@@ -111,28 +124,57 @@ def center_and_pad_image(img, output_size, padding_ratio):
     return result
 
 
-def process_all_dogs():
+def center_params():
+    """中央配置の結果を決めるパラメータ（キャッシュキー用）"""
+    return {
+        "CENTER_VERSION": CENTER_VERSION,
+        "OUTPUT_SIZE": OUTPUT_SIZE,
+        "PADDING_RATIO": PADDING_RATIO,
+        "DENSITIES": sprite_density.DENSITIES,
+    }
+
+
+def center_one(img_path):
+    """
+    1枚を中央配置し、密度バリアントも書き出す（ワーカープロセスで実行）
+    元画像のサイズを返す（バックアップは呼び出し側がまとめて取る）
+    """
+    img = Image.open(img_path)
+    original_size = img.size
+    
+    result = center_and_pad_image(img, OUTPUT_SIZE, PADDING_RATIO)
+    result.save(img_path, 'PNG', optimize=True)
+    sprite_density.save_variants(result, img_path, os.path.dirname(os.path.abspath(__file__)))
+    return original_size
+
+
+def process_all_dogs(force=False, cache=None, jobs=None):
     """
     全犬画像を処理
+    - force: キャッシュを無視して全画像を処理
+    - cache: 共有するビルドキャッシュ（省略時は読み込む）
+    - jobs: 並列プロセス数（省略時はCPUコア数、1なら逐次）
     """
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    backup_dir = os.path.join(base_dir, BACKUP_FOLDER)
-    
-    # バックアップフォルダ作成
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = os.path.join(backup_dir, timestamp)
+    cache = cache or BuildCache(CACHE_NAME)
+    cache_key = make_key(center_params())
+    jobs = jobs or default_jobs()
     
     print("=" * 50)
     print("🐕 犬画像中央配置ツール")
     print("=" * 50)
-    print(f"出力サイズ: {OUTPUT_SIZE}x{OUTPUT_SIZE}px")
+    print(f"出力サイズ: {OUTPUT_SIZE}x{OUTPUT_SIZE}px"
+          f"（{' / '.join(sprite_density.density_label(d) for d in sprite_density.DENSITIES)}）")
     print(f"パディング: {PADDING_RATIO * 100}%")
-    print(f"バックアップ先: {backup_path}")
+    print(f"並列数: {jobs}")
     print("=" * 50)
     
-    total_processed = 0
-    total_errors = 0
+    total_skipped = 0
+    outputs = []
+    variants_only = []
     
+    # 処理対象を順番に集める（結果の表示もこの順番）
+    tasks = []
     for dog_folder in DOG_FOLDERS:
         dog_path = os.path.join(base_dir, dog_folder)
         
@@ -140,43 +182,66 @@ def process_all_dogs():
             print(f"⚠ フォルダが見つかりません: {dog_folder}")
             continue
         
-        print(f"\n📁 {dog_folder}")
-        
         for expression in EXPRESSIONS:
             img_name = f"{expression}.png"
             img_path = os.path.join(dog_path, img_name)
             
             if not os.path.exists(img_path):
-                print(f"  ⚠ {img_name} が見つかりません")
+                print(f"  ⚠ {dog_folder}/{img_name} が見つかりません")
+                continue
+            outputs.append(img_path)
+            
+            # 同じ設定で中央配置済み・その後変更なし → スキップ
+            # （密度バリアントが消えていたら、中央配置はせずにバリアントだけ作り直す）
+            if not force and cache.is_fresh(img_path, CACHE_STAGE, cache_key):
+                if not sprite_density.variants_exist(img_path, base_dir):
+                    variants_only.append(img_path)
+                total_skipped += 1
                 continue
             
-            try:
-                # バックアップ
-                backup_dog_dir = os.path.join(backup_path, dog_folder)
-                os.makedirs(backup_dog_dir, exist_ok=True)
-                shutil.copy2(img_path, os.path.join(backup_dog_dir, img_name))
-                
-                # 画像処理
-                img = Image.open(img_path)
-                original_size = img.size
-                
-                result = center_and_pad_image(img, OUTPUT_SIZE, PADDING_RATIO)
-                
-                # 保存
-                result.save(img_path, 'PNG', optimize=True)
-                
-                print(f"  ✓ {img_name} ({original_size[0]}x{original_size[1]} → {OUTPUT_SIZE}x{OUTPUT_SIZE})")
-                total_processed += 1
-                
-            except Exception as e:
-                print(f"  ✗ {img_name} エラー: {e}")
+            tasks.append((dog_folder, img_name, img_path))
+    
+    # 書き換える画像だけ、書き換える前にまとめてバックアップ
+    run_id = backup_before_write(BACKUP_TOOL, [t[2] for t in tasks], jobs)
+    results = map_ordered(center_one, [(t[2],) for t in tasks], jobs)
+    
+    total_processed = 0
+    total_errors = 0
+    current_folder = None
+    for (dog_folder, img_name, img_path), (original_size, error) in zip(tasks, results):
+        if dog_folder != current_folder:
+            current_folder = dog_folder
+            print(f"\n📁 {dog_folder}")
+        
+        if error:
+            print(f"  ✗ {img_name} エラー: {error}")
+            total_errors += 1
+            continue
+        
+        cache.record(img_path, CACHE_STAGE, cache_key)
+        print(f"  ✓ {img_name} ({original_size[0]}x{original_size[1]} → {OUTPUT_SIZE}x{OUTPUT_SIZE})")
+        total_processed += 1
+    
+    cache.save()
+    
+    if variants_only:
+        emitted = sprite_density.emit_all(variants_only, base_dir, jobs)
+        for img_path, (_, error) in zip(variants_only, emitted):
+            if error:
+                print(f"  ✗ 密度バリアント {os.path.relpath(img_path, base_dir)}: {error}")
                 total_errors += 1
+        print(f"\n🔁 密度バリアントのみ再作成: {len(variants_only)}枚")
+    manifest_path = sprite_density.update_manifest(outputs, base_dir)
     
     print("\n" + "=" * 50)
     print(f"✅ 処理完了: {total_processed}枚")
+    if total_skipped > 0:
+        print(f"⏭ スキップ（変更なし）: {total_skipped}枚")
     if total_errors > 0:
         print(f"❌ エラー: {total_errors}枚")
-    print(f"💾 バックアップ: {backup_path}")
+    if run_id:
+        print(f"💾 バックアップ: {run_id}（--restore {run_id} で復元）")
+    print(f"📋 密度マニフェスト: {manifest_path}")
     print("=" * 50)
 
 
@@ -207,35 +272,12 @@ def preview_single(dog_folder, expression="neutral"):
     print(f"プレビュー保存: {preview_path}")
 
 
-def restore_from_backup(backup_timestamp):
+def restore_from_backup(run_id):
     """
-    バックアップから元画像を復元
+    バックアップから元画像を復元（実行ID は日時だけでもよい）
+    中身が今と同じ画像は書き換えない
     """
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    backup_path = os.path.join(base_dir, BACKUP_FOLDER, backup_timestamp)
-    
-    if not os.path.exists(backup_path):
-        print(f"Backup not found: {backup_path}")
-        return False
-    
-    print(f"Restoring from: {backup_path}")
-    
-    for dog_folder in DOG_FOLDERS:
-        backup_dog_dir = os.path.join(backup_path, dog_folder)
-        target_dog_dir = os.path.join(base_dir, dog_folder)
-        
-        if not os.path.exists(backup_dog_dir):
-            continue
-        
-        for filename in os.listdir(backup_dog_dir):
-            if filename.endswith('.png'):
-                src = os.path.join(backup_dog_dir, filename)
-                dst = os.path.join(target_dog_dir, filename)
-                shutil.copy2(src, dst)
-                print(f"  Restored: {dog_folder}/{filename}")
-    
-    print("Restore complete!")
-    return True
+    return restore_run(run_id, BACKUP_TOOL)
 
 
 if __name__ == "__main__":
@@ -252,10 +294,10 @@ if __name__ == "__main__":
         expr = sys.argv[3] if len(sys.argv) > 3 else "neutral"
         preview_single(dog, expr)
     elif len(sys.argv) > 1 and sys.argv[1] == "--run":
-        # 確認なしで実行
-        process_all_dogs()
+        # 確認なしで実行（--force で処理済みの画像も再処理、--jobs N で並列数指定）
+        process_all_dogs(force="--force" in sys.argv, jobs=parse_jobs(sys.argv))
     elif len(sys.argv) > 2 and sys.argv[1] == "--restore":
-        # バックアップから復元: python center_dogs.py --restore 20260116_225518
+        # バックアップから復元: python center_dogs.py --restore 20260116_225518（一覧は backup_store.py --list）
         restore_from_backup(sys.argv[2])
     else:
         # 全処理モード
@@ -264,6 +306,6 @@ if __name__ == "__main__":
         response = input("Continue? (y/N): ")
         
         if response.lower() == 'y':
-            process_all_dogs()
+            process_all_dogs(force="--force" in sys.argv, jobs=parse_jobs(sys.argv))
         else:
             print("Cancelled.")
@@ -3,10 +3,18 @@
 - 4x4グリッドの画像から各キャラクターを切り抜き
 - 透明部分を検出して中央配置
 - フォルダ分けして保存
+- @0.5x / @0.25x の密度バリアントと density_manifest.json も書き出す（scripts/sprite_density.py）
 """
 
 from PIL import Image
+from functools import partial
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))), "scripts"))
+import sprite_density
+import sprite_slicer
+from parallel import parse_jobs
 
 # 設定
 OUTPUT_SIZE = 512  # 出力サイズ（正方形）
@@ -132,63 +140,63 @@ def center_and_pad_image(img, output_size, padding_ratio):
     return result
 
 
-def extract_grid_cell(img, row, col, cell_width, cell_height):
+def build_sheet(input_path, dog_names, output_base_dir):
     """
-    グリッドから指定のセルを切り抜き
+    1枚の画像の切り抜きマニフェスト（行 = 犬種、列 = 表情）
+    切り抜いたセルは中央配置して保存
     """
-    left = col * cell_width
-    upper = row * cell_height
-    right = left + cell_width
-    lower = upper + cell_height
-    
-    return img.crop((left, upper, right, lower))
+    cells = [
+        sprite_slicer.cell(row, col, os.path.join(output_base_dir, dog_name, f"{expression}.png"))
+        for row, dog_name in enumerate(dog_names)
+        for col, expression in enumerate(EXPRESSIONS)
+    ]
+    return sprite_slicer.sheet(
+        input_path, GRID_ROWS, GRID_COLS, cells,
+        mode='RGBA',
+        postprocess=partial(center_and_pad_image, output_size=OUTPUT_SIZE, padding_ratio=PADDING_RATIO),
+        save_options={"optimize": True},
+    )
+
+
+def build_manifest():
+    """全入力ファイルの切り抜きマニフェストを作成（sprite_slicer 用）"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    output_base_dir = os.path.dirname(base_dir)  # charactersフォルダ
+    return [
+        build_sheet(os.path.join(base_dir, filename), dog_names, output_base_dir)
+        for filename, dog_names in INPUT_FILES.items()
+    ]
+
+
+def emit_densities(results, output_base_dir, jobs=None):
+    """
+    切り抜いた @1x から密度バリアントを書き出してマニフェストを更新
+    戻り値: バリアントを書き出せた枚数
+    """
+    outputs = [r["output"] for r in results if not r["error"]]
+    emitted = sprite_density.emit_all(outputs, output_base_dir, jobs)
+    for path, (_, error) in zip(outputs, emitted):
+        if error:
+            print(f"  ✗ 密度バリアント {os.path.relpath(path, output_base_dir)}: {error}")
+    sprite_density.update_manifest(outputs, output_base_dir)
+    return sum(1 for _, error in emitted if not error)
 
 
-def process_image(input_path, dog_names, output_base_dir):
+def process_image(input_path, dog_names, output_base_dir, jobs=None):
     """
     1枚の画像から全キャラクターを切り抜き
     """
     print(f"\n📷 処理中: {os.path.basename(input_path)}")
-    
-    img = Image.open(input_path)
-    if img.mode != 'RGBA':
-        img = img.convert('RGBA')
-    
-    width, height = img.size
-    print(f"   画像サイズ: {width}x{height}")
-    
-    cell_width = width // GRID_COLS
-    cell_height = height // GRID_ROWS
-    print(f"   セルサイズ: {cell_width}x{cell_height}")
-    
-    processed_count = 0
-    
-    for row, dog_name in enumerate(dog_names):
-        # 出力フォルダを作成
-        output_dir = os.path.join(output_base_dir, dog_name)
-        os.makedirs(output_dir, exist_ok=True)
-        print(f"\n   📁 {dog_name}/")
-        
-        for col, expression in enumerate(EXPRESSIONS):
-            # セルを切り抜き
-            cell = extract_grid_cell(img, row, col, cell_width, cell_height)
-            
-            # 中央配置して保存
-            centered = center_and_pad_image(cell, OUTPUT_SIZE, PADDING_RATIO)
-            
-            # 保存
-            output_path = os.path.join(output_dir, f"{expression}.png")
-            centered.save(output_path, 'PNG', optimize=True)
-            
-            print(f"      ✓ {expression}.png")
-            processed_count += 1
-    
-    return processed_count
-
-
-def main():
+    results = sprite_slicer.run([build_sheet(input_path, dog_names, output_base_dir)], jobs,
+                                executor="process")
+    emit_densities(results, output_base_dir, jobs)
+    return sum(1 for r in results if not r["error"])
+
+
+def main(jobs=None):
     """
     メイン処理
+    jobs: 並列プロセス数（省略時はCPUコア数、--jobs N で指定）
     """
     import sys
     
@@ -203,25 +211,20 @@ def main():
     print("=" * 60)
     print("🌟 伝説の犬キャラクター切り抜きツール")
     print("=" * 60)
-    print(f"出力サイズ: {OUTPUT_SIZE}x{OUTPUT_SIZE}px")
+    print(f"出力サイズ: {OUTPUT_SIZE}x{OUTPUT_SIZE}px"
+          f"（{' / '.join(sprite_density.density_label(d) for d in sprite_density.DENSITIES)}）")
     print(f"パディング: {PADDING_RATIO * 100}%")
     print(f"出力先: {output_base_dir}")
     print("=" * 60)
     
-    total_processed = 0
-    
-    for filename, dog_names in INPUT_FILES.items():
-        input_path = os.path.join(base_dir, filename)
-        
-        if not os.path.exists(input_path):
-            print(f"\n⚠ ファイルが見つかりません: {filename}")
-            continue
-        
-        count = process_image(input_path, dog_names, output_base_dir)
-        total_processed += count
+    # 全ファイルのセルをまとめて並列処理（見つからないファイルは警告してスキップ）
+    # 中央配置（LANCZOSリサイズ）が重いのでプロセスプールで実行
+    results = sprite_slicer.run(build_manifest(), jobs, executor="process")
+    total_processed = sum(1 for r in results if not r["error"])
+    total_variants = emit_densities(results, output_base_dir, jobs)
     
     print("\n" + "=" * 60)
-    print(f"✅ 処理完了: {total_processed}枚の画像を生成")
+    print(f"✅ 処理完了: {total_processed}枚の画像を生成（密度バリアント {total_variants}枚分）")
     print("=" * 60)
     
     # 生成されたフォルダ一覧
@@ -234,4 +237,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    main(jobs=parse_jobs(sys.argv))
@@ -1,10 +1,16 @@
 """
 画像下部のゴミを除去して中央配置
-NumPy不要版
+ゴミ判定は scripts/clean_isolated_pixels.py（NumPy高速版）を使用
+中央配置後は center_dogs.py と同じく密度バリアント（@0.5x / @0.25x）も書き出す
 """
 
 from PIL import Image
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "scripts"))
+import clean_isolated_pixels
+import sprite_density
 
 OUTPUT_SIZE = 512
 PADDING_RATIO = 0.04
@@ -13,6 +19,14 @@ def remove_bottom_artifacts(img, bottom_percent=0.15):
     """
     画像下部の孤立したピクセル（ゴミ）を除去
     """
+    return clean_isolated_pixels.remove_bottom_artifacts(img, bottom_percent)
+
+
+def remove_bottom_artifacts_legacy(img, bottom_percent=0.15):
+    """
+    旧実装（ピクセル単位のループ）
+    clean_isolated_pixels.py --benchmark の比較用に残している
+    """
     if img.mode != 'RGBA':
         img = img.convert('RGBA')
     
@@ -100,6 +114,7 @@ def fix_image(img_path):
     
     # 保存
     result.save(img_path, 'PNG', optimize=True)
+    sprite_density.save_variants(result, img_path, os.path.dirname(os.path.abspath(__file__)))
     print(f"  Saved!")
 
 
@@ -118,11 +133,14 @@ if __name__ == "__main__":
         "dog_03_toypoodle/neutral.png",
     ]
     
+    fixed = []
     for f in files_to_fix:
         img_path = os.path.join(base_dir, f)
         if os.path.exists(img_path):
             fix_image(img_path)
+            fixed.append(img_path)
         else:
             print(f"Not found: {img_path}")
+    sprite_density.update_manifest(fixed, base_dir)
     
     print("\nDone!")
@@ -1,16 +1,21 @@
 """
 肉球画像中央配置スクリプト
 - 透明部分を検出して肉球を画像中央に配置
-- 元画像はバックアップを取る
+- 元画像は scripts/backup_store.py の置き場にバックアップ（中身が同じなら増えない）
+- --restore <実行ID> でバックアップから復元（変わった画像だけ書き戻す）
+- --jobs N で並列プロセス数を指定（省略時はCPUコア数）
 """
 
 from PIL import Image
 import os
-import shutil
-from datetime import datetime
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "scripts"))
+from backup_store import backup_before_write, restore_run
+from parallel import default_jobs, map_ordered, parse_jobs
 
 # 設定
-BACKUP_FOLDER = "_backup_originals"
+BACKUP_TOOL = "center_paws"  # バックアップ置き場での名前
 INPUT_FOLDER = "individual"
 
 def get_content_bbox(img):
@@ -71,69 +76,68 @@ def center_image(img):
     return result, offset_x, offset_y
 
 
-def process_all_paws():
+def center_one(img_path):
+    """
+    1枚を中央配置（ワーカープロセスで実行）
+    (元のバウンディングボックス, 移動量X, 移動量Y) を返す。透明画像なら bbox は None
+    """
+    img = Image.open(img_path)
+    bbox = get_content_bbox(img)
+    if not bbox:
+        return None, 0, 0
+    
+    result, offset_x, offset_y = center_image(img)
+    result.save(img_path, 'PNG', optimize=True)
+    return bbox, offset_x, offset_y
+
+
+def process_all_paws(jobs=None):
     """
     全肉球画像を処理
+    jobs: 並列プロセス数（省略時はCPUコア数、1なら逐次）
     """
     base_dir = os.path.dirname(os.path.abspath(__file__))
     input_dir = os.path.join(base_dir, INPUT_FOLDER)
-    backup_dir = os.path.join(base_dir, BACKUP_FOLDER)
-    
-    # バックアップフォルダ作成
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = os.path.join(backup_dir, timestamp)
-    os.makedirs(backup_path, exist_ok=True)
+    jobs = jobs or default_jobs()
     
     print("=" * 50)
     print("肉球画像中央配置ツール")
     print("=" * 50)
     print(f"入力フォルダ: {input_dir}")
-    print(f"バックアップ先: {backup_path}")
+    print(f"並列数: {jobs}")
     print("=" * 50)
     
+    # PNGファイルを名前順に処理（結果の表示もこの順番）
+    filenames = [f for f in sorted(os.listdir(input_dir)) if f.endswith('.png')]
+    paths = [os.path.join(input_dir, f) for f in filenames]
+    run_id = backup_before_write(BACKUP_TOOL, paths, jobs)
+    results = map_ordered(center_one, [(p,) for p in paths], jobs)
+    
     total_processed = 0
     total_errors = 0
     
-    # PNGファイルを処理
-    for filename in sorted(os.listdir(input_dir)):
-        if not filename.endswith('.png'):
+    for filename, (result, error) in zip(filenames, results):
+        if error:
+            print(f"  {filename} エラー: {error}")
+            total_errors += 1
             continue
         
-        img_path = os.path.join(input_dir, filename)
-        
-        try:
-            # バックアップ
-            shutil.copy2(img_path, os.path.join(backup_path, filename))
-            
-            # 画像処理
-            img = Image.open(img_path)
-            original_size = img.size
-            
-            bbox = get_content_bbox(img)
-            if bbox:
-                print(f"\n{filename}:")
-                print(f"  元のコンテンツ位置: ({bbox[0]}, {bbox[1]}) - ({bbox[2]}, {bbox[3]})")
-                
-                result, offset_x, offset_y = center_image(img)
-                
-                # 保存
-                result.save(img_path, 'PNG', optimize=True)
-                
-                print(f"  移動量: X={offset_x:+d}px, Y={offset_y:+d}px")
-                print(f"  完了")
-                total_processed += 1
-            else:
-                print(f"  {filename}: 透明画像のためスキップ")
-                
-        except Exception as e:
-            print(f"  {filename} エラー: {e}")
-            total_errors += 1
+        bbox, offset_x, offset_y = result
+        if bbox:
+            print(f"\n{filename}:")
+            print(f"  元のコンテンツ位置: ({bbox[0]}, {bbox[1]}) - ({bbox[2]}, {bbox[3]})")
+            print(f"  移動量: X={offset_x:+d}px, Y={offset_y:+d}px")
+            print(f"  完了")
+            total_processed += 1
+        else:
+            print(f"  {filename}: 透明画像のためスキップ")
     
     print("\n" + "=" * 50)
     print(f"処理完了: {total_processed}枚")
     if total_errors > 0:
         print(f"エラー: {total_errors}枚")
-    print(f"バックアップ: {backup_path}")
+    if run_id:
+        print(f"バックアップ: {run_id}（--restore {run_id} で復元）")
     print("=" * 50)
 
 
@@ -175,8 +179,6 @@ def preview_single(filename):
 
 
 if __name__ == "__main__":
-    import sys
-    
     # Windows コンソール用 UTF-8 設定
     if sys.platform == 'win32':
         import io
@@ -188,7 +190,10 @@ if __name__ == "__main__":
         preview_single(filename)
     elif len(sys.argv) > 1 and sys.argv[1] == "--run":
         # 確認なしで実行
-        process_all_paws()
+        process_all_paws(jobs=parse_jobs(sys.argv))
+    elif len(sys.argv) > 2 and sys.argv[1] == "--restore":
+        # バックアップから復元: python center_paws.py --restore 20260129_060629
+        restore_run(sys.argv[2], BACKUP_TOOL)
     else:
         # 全処理モード
         print("\n全ての肉球画像を中央配置します。")
@@ -196,6 +201,6 @@ if __name__ == "__main__":
         response = input("続行しますか？ (y/N): ")
         
         if response.lower() == 'y':
-            process_all_paws()
+            process_all_paws(jobs=parse_jobs(sys.argv))
         else:
             print("キャンセルしました。")
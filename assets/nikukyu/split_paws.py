@@ -3,28 +3,18 @@
 4x4のグリッドから個別の画像に分割
 """
 
-from PIL import Image
 import os
+import sys
 
-# 画像を読み込み
-input_path = "freepik__4416ui__39161 (1).png"
-img = Image.open(input_path)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "scripts"))
+import sprite_slicer
 
-print(f"画像サイズ: {img.size}")
-print(f"モード: {img.mode}")
-
-width, height = img.size
-
-# 4x4のグリッドなので、各セルのサイズを計算
-cols = 4
-rows = 4
-cell_width = width // cols
-cell_height = height // rows
-
-print(f"セルサイズ: {cell_width} x {cell_height}")
+# 入力ファイルと出力ディレクトリ（このスクリプトのフォルダ基準）
+INPUT_FILE = "freepik__4416ui__39161 (1).png"
+OUTPUT_DIR = "individual"
 
 # 各肉球の名前（左上から右下へ、行ごとに）
-paw_names = [
+PAW_NAMES = [
     # 1行目
     "paw_pink_heart",      # ピンク＋ハート
     "paw_blue_heart",      # 水色＋ハート
@@ -47,26 +37,23 @@ paw_names = [
     "paw_rainbow_sparkle", # レインボー＋キラキラ
 ]
 
-# 出力ディレクトリ
-output_dir = "individual"
-os.makedirs(output_dir, exist_ok=True)
 
-# 切り抜いて保存
-for idx, name in enumerate(paw_names):
-    row = idx // cols
-    col = idx % cols
-    
-    left = col * cell_width
-    top = row * cell_height
-    right = left + cell_width
-    bottom = top + cell_height
+def build_manifest():
+    """切り抜きマニフェストを作成（sprite_slicer 用）"""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    output_dir = os.path.join(base_dir, OUTPUT_DIR)
     
-    # 切り抜き
-    paw_img = img.crop((left, top, right, bottom))
-    
-    # 保存
-    output_path = os.path.join(output_dir, f"{name}.png")
-    paw_img.save(output_path, "PNG")
-    print(f"保存: {output_path} (位置: {row+1}行{col+1}列)")
+    # 4x4のグリッド、左上から右下へ行ごとに
+    cells = sprite_slicer.named_cells(
+        PAW_NAMES, 4, lambda name: os.path.join(output_dir, f"{name}.png")
+    )
+    return [sprite_slicer.sheet(os.path.join(base_dir, INPUT_FILE), 4, 4, cells)]
+
+
+def main(jobs=None):
+    results = sprite_slicer.run(build_manifest(), jobs)
+    print(f"\n完了！{sum(1 for r in results if not r['error'])}個の肉球を切り抜きました。")
+
 
-print(f"\n完了！{len(paw_names)}個の肉球を切り抜きました。")
+if __name__ == "__main__":
+    main()
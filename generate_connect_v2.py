@@ -3,20 +3,7 @@
 se_tile_trace系統（pokopoko bubble pop）をベースに
 より達成感・気持ちよさを感じるかわいい音
 """
-import requests
-from pathlib import Path
-import os
-
-# プロキシを無効化
-os.environ['NO_PROXY'] = '*'
-os.environ['no_proxy'] = '*'
-for key in ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy']:
-    os.environ.pop(key, None)
-
-API_KEY = 'sk_3c4369ebcfbc8ef5dec5285f28a5be7f7ce41591a31aca4f'
-API_URL = 'https://api.elevenlabs.io/v1/sound-generation'
-
-output_dir = Path(__file__).parent / 'assets' / 'audio' / 'se'
+from sound_generation import main
 
 # se_tile_trace系統（pokopoko bubble pop）をベースに
 # 繋がった時の達成感・気持ちよさを加えたバリエーション
@@ -43,38 +30,10 @@ variations = [
     },
 ]
 
-headers = {
-    'xi-api-key': API_KEY,
-    'Content-Type': 'application/json'
-}
-
-print("=" * 50)
-print("繋がった時の効果音 5パターン生成 (v2)")
-print("se_tile_trace系統 - かわいい＆気持ちいい音")
-print("=" * 50)
-
-for i, v in enumerate(variations, 1):
-    output_path = output_dir / f"{v['name']}.mp3"
-    print(f"\n[{i}/5] {v['name']}")
-    print(f"  プロンプト: {v['prompt'][:60]}...")
-    
-    data = {
-        'text': v['prompt'],
-        'duration_seconds': 0.5,
-        'prompt_influence': 0.5
-    }
-    
-    response = requests.post(API_URL, headers=headers, json=data)
-    
-    if response.status_code == 200:
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
-        print(f"  [OK] 生成完了: {output_path.name}")
-    else:
-        print(f"  [ERROR] {response.status_code} - {response.text[:100]}")
-
-print("\n" + "=" * 50)
-print("完了！以下のファイルを聞き比べてください：")
-for v in variations:
-    print(f"  - {v['name']}.mp3")
-print("=" * 50)
+if __name__ == "__main__":
+    main(
+        [("se_tile_trace系統 - かわいい＆気持ちいい音", variations)],
+        "繋がった時の効果音 5パターン生成 (v2)",
+        duration_seconds=0.5,
+        prompt_influence=0.5,
+    )
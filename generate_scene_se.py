@@ -4,20 +4,7 @@
 2. ゲームオーバー画面「おしかったね！」用 - 残念だけどかわいい音
 各5パターン
 """
-import requests
-from pathlib import Path
-import os
-
-# プロキシを無効化
-os.environ['NO_PROXY'] = '*'
-os.environ['no_proxy'] = '*'
-for key in ['HTTP_PROXY', 'HTTPS_PROXY', 'http_proxy', 'https_proxy']:
-    os.environ.pop(key, None)
-
-API_KEY = 'sk_3c4369ebcfbc8ef5dec5285f28a5be7f7ce41591a31aca4f'
-API_URL = 'https://api.elevenlabs.io/v1/sound-generation'
-
-output_dir = Path(__file__).parent / 'assets' / 'audio' / 'se'
+from sound_generation import main
 
 # クリア画面「やったー！」用 - 嬉しい達成感、かわいいキラキラ
 clear_variations = [
@@ -67,48 +54,13 @@ gameover_variations = [
     },
 ]
 
-headers = {
-    'xi-api-key': API_KEY,
-    'Content-Type': 'application/json'
-}
-
-def generate_sounds(variations, category_name):
-    print(f"\n{'='*50}")
-    print(f"{category_name}")
-    print(f"{'='*50}")
-    
-    for i, v in enumerate(variations, 1):
-        output_path = output_dir / f"{v['name']}.mp3"
-        print(f"\n[{i}/{len(variations)}] {v['name']}")
-        print(f"  プロンプト: {v['prompt'][:50]}...")
-        
-        data = {
-            'text': v['prompt'],
-            'duration_seconds': 1.0,
-            'prompt_influence': 0.5
-        }
-        
-        response = requests.post(API_URL, headers=headers, json=data)
-        
-        if response.status_code == 200:
-            with open(output_path, 'wb') as f:
-                f.write(response.content)
-            print(f"  [OK] 生成完了: {output_path.name}")
-        else:
-            print(f"  [ERROR] {response.status_code} - {response.text[:100]}")
-
-# クリア用SE生成
-generate_sounds(clear_variations, "クリア画面「やったー！」用SE (5パターン)")
-
-# ゲームオーバー用SE生成
-generate_sounds(gameover_variations, "ゲームオーバー画面「おしかったね！」用SE (5パターン)")
-
-print("\n" + "=" * 50)
-print("完了！以下のファイルを聞き比べてください：")
-print("\n【クリア用】")
-for v in clear_variations:
-    print(f"  - {v['name']}.mp3")
-print("\n【ゲームオーバー用】")
-for v in gameover_variations:
-    print(f"  - {v['name']}.mp3")
-print("=" * 50)
+if __name__ == "__main__":
+    main(
+        [
+            ("クリア画面「やったー！」用SE (5パターン)", clear_variations),
+            ("ゲームオーバー画面「おしかったね！」用SE (5パターン)", gameover_variations),
+        ],
+        "シーン用SE生成",
+        duration_seconds=1.0,
+        prompt_influence=0.5,
+    )
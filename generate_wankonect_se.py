@@ -3,16 +3,7 @@
 ElevenLabs Sound Effects APIを使用
 """
 
-import requests
-import os
-from pathlib import Path
-
-API_KEY = "sk_3c4369ebcfbc8ef5dec5285f28a5be7f7ce41591a31aca4f"
-API_URL = "https://api.elevenlabs.io/v1/sound-generation"
-
-# 出力先ディレクトリ
-OUTPUT_DIR = Path(__file__).parent / "assets" / "audio" / "se"
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+from sound_generation import main
 
 # 生成する効果音の定義
 SOUND_EFFECTS = [
@@ -33,54 +24,6 @@ SOUND_EFFECTS = [
     }
 ]
 
-def generate_sound_effect(prompt: str, output_path: Path, duration: float = 1.0):
-    """ElevenLabs APIを使用して効果音を生成"""
-    headers = {
-        "xi-api-key": API_KEY,
-        "Content-Type": "application/json"
-    }
-    
-    data = {
-        "text": prompt,
-        "duration_seconds": duration,
-        "prompt_influence": 0.5
-    }
-    
-    print(f"生成中: {output_path.name}")
-    print(f"  プロンプト: {prompt}")
-    
-    response = requests.post(API_URL, headers=headers, json=data)
-    
-    if response.status_code == 200:
-        with open(output_path, "wb") as f:
-            f.write(response.content)
-        print(f"  [OK] Done: {output_path}")
-        return True
-    else:
-        print(f"  [ERROR] {response.status_code} - {response.text}")
-        return False
-
-def main():
-    print("=" * 50)
-    print("ワンこねくと SE生成")
-    print("=" * 50)
-    
-    success_count = 0
-    
-    for se in SOUND_EFFECTS:
-        output_path = OUTPUT_DIR / f"{se['name']}.mp3"
-        if output_path.exists():
-            print(f"[SKIP] {output_path.name} already exists")
-            success_count += 1
-            continue
-        if generate_sound_effect(se["prompt"], output_path, se["duration_seconds"]):
-            success_count += 1
-        print()
-    
-    print("=" * 50)
-    print(f"完了: {success_count}/{len(SOUND_EFFECTS)} ファイル生成")
-    print(f"出力先: {OUTPUT_DIR}")
-    print("=" * 50)
-
 if __name__ == "__main__":
-    main()
+    # 既にあるファイルはスキップ（--force で作り直す）
+    main([("ワンこねくと SE", SOUND_EFFECTS)], "ワンこねくと SE生成", skip_existing=True, prompt_influence=0.5)
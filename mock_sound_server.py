@@ -0,0 +1,182 @@
+"""
+効果音生成 API のローカル代替サーバー（オフラインでの確認・ベンチマーク用）
+- POST /v1/sound-generation に本物と同じ JSON（text / duration_seconds / prompt_influence）を受け付ける
+- プロンプトから決まる合成音（減衰するサイン波の WAV）を少しずつ返す
+  本物と同じく、同じプロンプトでも呼ぶたびに少し違う音になる（n 回目は n 番目の音程）
+  → キャッシュが効いているか（リクエスト数）とバリエーションの保存を確認できる
+- 応答の遅れ（--latency）と、429 / 503 を返す割合（--fail-rate）を指定できる
+  → 再試行・同時実行数の動作確認とベンチマークができる
+
+使い方:
+    python mock_sound_server.py --port 8765 --latency 0.5 --fail-rate 0.2
+    python generate_scene_se.py --api-url http://127.0.0.1:8765/v1/sound-generation -o /tmp/se_test
+
+    python mock_sound_server.py --bench 20      # 同時実行数ごとの生成時間を比較
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import math
+import random
+import struct
+import sys
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Windows コンソールのUTF-8対応
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+
+API_PATH = "/v1/sound-generation"
+SAMPLE_RATE = 22050
+STREAM_CHUNK = 4096
+MAX_DURATION = 22.0  # 本物の API の上限に合わせる
+
+
+def synth_audio(prompt, duration_seconds, take=0, rate=SAMPLE_RATE):
+    """プロンプトと回数から決まる音程の、減衰するサイン波（16bit モノラル WAV）"""
+    seed = int.from_bytes(hashlib.sha256(f"{prompt}#{take}".encode("utf-8")).digest()[:4], "little")
+    freq = 300 + seed % 900
+    n = int(rate * duration_seconds)
+    frames = bytearray()
+    for i in range(n):
+        t = i / rate
+        frames += struct.pack("<h", int(12000 * math.exp(-t * 6) * math.sin(2 * math.pi * freq * t)))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+class SoundGenerationHandler(BaseHTTPRequestHandler):
+    server_version = "MockSoundGeneration/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _error(self, code, message, retry_after=None):
+        body = json.dumps({"detail": {"status": code, "message": message}}).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            fail = server.random.random() < server.fail_rate
+
+        if self.path.split("?")[0] != API_PATH:
+            return self._error(404, "not found")
+        if not self.headers.get("xi-api-key"):
+            return self._error(401, "missing xi-api-key")
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length))
+            prompt = payload["text"]
+            duration = float(payload.get("duration_seconds") or 1.0)
+        except (ValueError, KeyError, TypeError):
+            return self._error(422, "invalid body")
+        if not 0.5 <= duration <= MAX_DURATION:
+            return self._error(422, "duration_seconds must be between 0.5 and 22")
+
+        time.sleep(server.latency)
+        if fail:
+            with server.lock:
+                server.failures += 1
+            if server.random.random() < 0.5:
+                return self._error(429, "too many concurrent requests", retry_after=server.retry_after)
+            return self._error(503, "service unavailable")
+
+        with server.lock:
+            take = server.takes.get(prompt, 0)
+            server.takes[prompt] = take + 1
+        audio = synth_audio(prompt, duration, take)
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Content-Length", str(len(audio)))
+        self.end_headers()
+        # 本物と同じように少しずつ送る
+        for start in range(0, len(audio), STREAM_CHUNK):
+            self.wfile.write(audio[start:start + STREAM_CHUNK])
+
+
+def start_server(host="127.0.0.1", port=0, latency=0.0, fail_rate=0.0, retry_after=0.1,
+                 seed=None, verbose=False):
+    """
+    代替サーバーを別スレッドで起動
+    戻り値: (サーバー, API の URL)。終わったら server.shutdown()
+    """
+    server = ThreadingHTTPServer((host, port), SoundGenerationHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.fail_rate = fail_rate
+    server.retry_after = retry_after
+    server.random = random.Random(seed)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.failures = 0
+    server.takes = {}
+    server.verbose = verbose
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}{API_PATH}"
+
+
+def benchmark(count, latency, fail_rate, levels=(1, 2, 4, 8)):
+    """同時実行数ごとに count 件生成して時間を比べる"""
+    import tempfile
+
+    from sound_generation import generate_all
+
+    prompts = [{"name": f"bench_{i:03d}", "prompt": f"benchmark sound {i}"} for i in range(count)]
+    print(f"📊 {count}件 / 遅延 {latency}s / 失敗率 {fail_rate:.0%}")
+    for level in levels:
+        server, url = start_server(latency=latency, fail_rate=fail_rate)
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            results = generate_all(prompts, tmp, duration_seconds=0.5, concurrency=level,
+                                   api_url=url, backoff=0.05, verbose=False)
+            elapsed = time.perf_counter() - start
+        server.shutdown()
+        ok = sum(1 for r in results if r["ok"])
+        print(f"  同時 {level:2d}: {elapsed:6.2f}s  成功 {ok}/{count}  "
+              f"リクエスト {server.requests}（失敗応答 {server.failures}）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="効果音生成 API のローカル代替サーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.3, help="応答までの遅れ（秒）")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="429 / 503 を返す割合（0〜1）")
+    parser.add_argument("--bench", type=int, metavar="N", help="N 件生成するベンチマークを実行して終了")
+    parser.add_argument("--verbose", "-v", action="store_true", help="リクエストをログに出す")
+    args = parser.parse_args()
+
+    if args.bench:
+        benchmark(args.bench, args.latency, args.fail_rate)
+        return
+
+    server, url = start_server(args.host, args.port, args.latency, args.fail_rate, verbose=args.verbose)
+    print(f"🧪 代替サーバー起動: {url}（Ctrl+C で終了）")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
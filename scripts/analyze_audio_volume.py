@@ -1,22 +1,38 @@
 #!/usr/bin/env python3
 """
-音声ファイルのラウドネス(dBFS)を測定し、推奨音量を計算するスクリプト
+音声ファイルのラウドネスを測定し、推奨音量を計算するスクリプト
+- ITU-R BS.1770 の K 特性ラウドネス（統合 LUFS・短期最大・トゥルーピーク）を loudness.py で測定
+- 推奨音量は統合ラウドネス（LUFS）から計算（従来の dBFS も参考値として残す）
+- ファイルごとにプロセスプールで並列解析（--jobs N）、1ファイルの処理時間も表示
+- PCM はブロックごとに読んで測定（曲全体をメモリに載せない → 長い BGM でもワーカーのメモリ一定）
+  1秒ごとのラウドネス推移（loudness_timeline）も出力
+- 解析結果は「内容ハッシュ + 解析バージョン」をキーにキャッシュ（.asset_cache/audio.json）
+  → 新規・変更ファイルだけデコードし、残りはキャッシュから合成
+  → CATEGORY_TARGETS / SPECIAL_ADJUSTMENTS を調整して再実行するときはデコードなし
+  （--force でキャッシュを無視して全部解析し直す）
 """
 
+import math
 import os
+import re
 import sys
 import json
+import time
 from pathlib import Path
 
 # Windows コンソールのUTF-8対応
 if sys.platform == "win32":
     sys.stdout.reconfigure(encoding='utf-8')
 
-from pydub import AudioSegment
+from build_cache import BuildCache, make_key
+from loudness import measure_file
+from parallel import default_jobs, map_ordered, parse_jobs
 
 # プロジェクトルート
 PROJECT_ROOT = Path(__file__).parent.parent
 
+GAME_JS = PROJECT_ROOT / "game.js"
+
 # 音声ファイルのディレクトリ
 BGM_DIR = PROJECT_ROOT / "assets" / "audio" / "bgm"
 SE_DIR = PROJECT_ROOT / "assets" / "audio" / "se"
@@ -59,6 +75,16 @@ KEY_CATEGORY_MAP = {
     "sfx_medal": "special_se",
 }
 
+# 解析処理（loudness.py / analyze_audio_file）を変えたら上げる → キャッシュが無効になる
+ANALYZER_VERSION = 2
+CACHE_NAME = "audio"
+
+# 推奨音量の基準ラウドネス（この値のファイルは目標音量の中央値になる）
+REFERENCE_LUFS = -18.0
+
+# 解析対象の拡張子
+AUDIO_EXTENSIONS = [".mp3", ".wav", ".ogg"]
+
 # sfx_draw_stepは繰り返し再生されるので特別に小さめにする
 SPECIAL_ADJUSTMENTS = {
     "sfx_draw_step": 0.6,  # 目標音量の60%に
@@ -66,17 +92,28 @@ SPECIAL_ADJUSTMENTS = {
 }
 
 
+def _round(value, digits=2):
+    """無音の -inf はそのまま、それ以外は丸める"""
+    return value if math.isinf(value) else round(value, digits)
+
+
 def analyze_audio_file(file_path: Path) -> dict:
-    """音声ファイルを分析してdBFSを返す"""
+    """音声ファイルを分析してラウドネス（LUFS）と dBFS を返す"""
+    start = time.perf_counter()
     try:
-        audio = AudioSegment.from_file(str(file_path))
-        dbfs = audio.dBFS
-        duration_ms = len(audio)
+        loudness = measure_file(file_path)
         return {
             "file": file_path.name,
             "path": str(file_path.relative_to(PROJECT_ROOT)),
-            "dBFS": round(dbfs, 2),
-            "duration_ms": duration_ms,
+            "dBFS": _round(loudness["rms_dbfs"]),
+            "lufs_integrated": _round(loudness["integrated"]),
+            "lufs_short_term_max": _round(loudness["short_term_max"]),
+            "true_peak_dbtp": _round(loudness["true_peak"]),
+            "duration_ms": loudness["duration_ms"],
+            "sample_rate": loudness["sample_rate"],
+            "channels": loudness["channels"],
+            "loudness_timeline": [_round(v, 1) for v in loudness["timeline"]],
+            "analysis_seconds": round(time.perf_counter() - start, 3),
             "success": True,
         }
     except Exception as e:
@@ -84,29 +121,31 @@ def analyze_audio_file(file_path: Path) -> dict:
             "file": file_path.name,
             "path": str(file_path),
             "error": str(e),
+            "analysis_seconds": round(time.perf_counter() - start, 3),
             "success": False,
         }
 
 
-def calculate_recommended_volume(dbfs: float, category: str, key: str = None) -> float:
+def calculate_recommended_volume(lufs: float, category: str, key: str = None) -> float:
     """
-    dBFSと目標カテゴリから推奨音量を計算
+    統合ラウドネス（LUFS）と目標カテゴリから推奨音量を計算
     
     ロジック:
-    - dBFSが高い（0に近い）→ 音量を下げる
-    - dBFSが低い（-30等）→ 音量を上げる
-    - 基準点: -18 dBFS を中央値として扱う
+    - ラウドネスが高い（0に近い）→ 音量を下げる
+    - ラウドネスが低い（-30等）→ 音量を上げる
+    - 基準点: REFERENCE_LUFS (-18 LUFS) を中央値として扱う
+    - 無音（-inf）のファイルは None
     """
+    if lufs is None or math.isinf(lufs):
+        return None
+    
     target_min, target_max = CATEGORY_TARGETS.get(category, (0.4, 0.6))
     target_mid = (target_min + target_max) / 2
     
-    # 基準dBFS（この値のファイルは目標音量の中央値になる）
-    reference_dbfs = -18.0
-    
-    # dBFSの差から補正係数を計算
+    # ラウドネスの差から補正係数を計算
     # 6dBの差は音量を約2倍にする感覚なので、3dBごとに10%調整
-    dbfs_diff = reference_dbfs - dbfs
-    adjustment = dbfs_diff / 30.0  # ±30dBで±1.0の調整
+    lufs_diff = REFERENCE_LUFS - lufs
+    adjustment = lufs_diff / 30.0  # ±30LUで±1.0の調整
     
     # 推奨音量を計算
     recommended = target_mid + (adjustment * (target_max - target_min))
@@ -121,69 +160,138 @@ def calculate_recommended_volume(dbfs: float, category: str, key: str = None) ->
     return round(recommended, 2)
 
 
-def main():
+def collect_audio_files():
+    """(カテゴリ, パス) のリスト（BGM → SE の順、各フォルダ内は名前順）"""
+    files = []
+    for category, directory in [("bgm", BGM_DIR), ("se", SE_DIR)]:
+        if directory.exists():
+            for audio_file in sorted(directory.iterdir()):
+                if audio_file.suffix.lower() in AUDIO_EXTENSIONS:
+                    files.append((category, audio_file))
+    return files
+
+
+def load_audio_map(game_js=GAME_JS):
+    """
+    game.js の AudioManager.AUDIO_MAP を読む
+    戻り値: {キー: {"path": 音声ファイルの Path, "volume": 音量, "loop": ループするか}}（定義順）
+    """
+    source = Path(game_js).read_text(encoding="utf-8")
+    block = source[source.index("static AUDIO_MAP = {"):]
+    block = block[:block.index("};")]
+    audio_map = {}
+    for m in re.finditer(r"(\w+):\s*\{\s*path:\s*'([^']+)',\s*volume:\s*([\d.]+)([^}]*)\}", block):
+        key, path, volume, rest = m.groups()
+        audio_map[key] = {
+            "path": PROJECT_ROOT / path.lstrip("./"),
+            "volume": float(volume),
+            "loop": "loop: true" in rest,
+        }
+    return audio_map
+
+
+def format_volume(volume):
+    return "無音" if volume is None else f"{volume:.2f}"
+
+
+def analyze_with_cache(files, jobs=None, force=False, cache=None, prune=False):
+    """
+    ファイルを解析（キャッシュにあるものはデコードしない）
+    prune=True なら files 以外の解析結果をキャッシュから捨てる（全ファイルを解析するときだけ）
+    戻り値: [(結果, キャッシュから取ったか)]（files と同じ順）
+    """
+    cache = cache or BuildCache(CACHE_NAME)
+    keys = [make_key("analyze_audio", ANALYZER_VERSION, cache.digest(f)) for f in files]
+    
+    outputs = [None] * len(files)
+    pending = []
+    for i, (audio_file, key) in enumerate(zip(files, keys)):
+        cached = None if force else cache.lookup(key)
+        if cached is not None:
+            # 同じ内容のファイルは名前・場所が違っても結果を共有する
+            outputs[i] = (dict(cached, file=audio_file.name,
+                               path=str(audio_file.relative_to(PROJECT_ROOT))), True)
+        else:
+            pending.append(i)
+    
+    results = map_ordered(analyze_audio_file, [(files[i],) for i in pending], jobs)
+    for i, (result, error) in zip(pending, results):
+        if error:
+            result = {"file": files[i].name, "path": str(files[i]), "error": error, "success": False}
+        if result["success"]:
+            # エラーはキャッシュしない（pydub を入れ直したら解析できるように）
+            cache.store(keys[i], {k: v for k, v in result.items() if k not in ("file", "path")})
+        outputs[i] = (result, False)
+    
+    # 消えた・変わったファイルの結果は捨てる
+    if prune:
+        cache.prune_results(keys)
+    cache.save()
+    return outputs
+
+
+def main(jobs=None, force=False):
     print("=" * 60)
-    print("音声ファイル ラウドネス測定")
+    print("音声ファイル ラウドネス測定（BS.1770 / LUFS）")
     print("=" * 60)
     
+    jobs = jobs or default_jobs()
     results = {
         "bgm": [],
         "se": [],
     }
     
-    # BGMファイルを分析
-    print("\n📀 BGM ファイル分析中...")
-    if BGM_DIR.exists():
-        for audio_file in sorted(BGM_DIR.iterdir()):
-            if audio_file.suffix.lower() in [".mp3", ".wav", ".ogg"]:
-                result = analyze_audio_file(audio_file)
-                if result["success"]:
-                    result["recommended_volume"] = calculate_recommended_volume(
-                        result["dBFS"], "bgm"
-                    )
-                results["bgm"].append(result)
-                status = "✓" if result["success"] else "✗"
-                print(f"  {status} {result['file']}")
+    # 全ファイルをまとめて並列解析（結果はフォルダ・名前順）
+    files = collect_audio_files()
+    print(f"\n🎧 {len(files)}ファイルを解析中...（{jobs} workers）")
+    start = time.perf_counter()
+    outputs = analyze_with_cache([f for _, f in files], jobs, force, prune=True)
+    elapsed = time.perf_counter() - start
+    decoded = sum(1 for _, from_cache in outputs if not from_cache)
     
-    # SEファイルを分析
-    print("\n🔊 SE ファイル分析中...")
-    if SE_DIR.exists():
-        for audio_file in sorted(SE_DIR.iterdir()):
-            if audio_file.suffix.lower() in [".mp3", ".wav", ".ogg"]:
-                result = analyze_audio_file(audio_file)
-                if result["success"]:
-                    # SEはデフォルトでgameplay_seカテゴリとして計算
-                    result["recommended_volume"] = calculate_recommended_volume(
-                        result["dBFS"], "gameplay_se"
-                    )
-                results["se"].append(result)
-                status = "✓" if result["success"] else "✗"
-                print(f"  {status} {result['file']}")
+    current = None
+    for (category, audio_file), (result, from_cache) in zip(files, outputs):
+        if result["success"]:
+            # SEはデフォルトでgameplay_seカテゴリとして計算
+            result["recommended_volume"] = calculate_recommended_volume(
+                result["lufs_integrated"], "bgm" if category == "bgm" else "gameplay_se"
+            )
+        results[category].append(result)
+        
+        if category != current:
+            current = category
+            print("\n📀 BGM:" if category == "bgm" else "\n🔊 SE:")
+        status = "✓" if result["success"] else "✗"
+        timing = "  cache" if from_cache else f"{result.get('analysis_seconds', 0):6.2f}s"
+        print(f"  {status} {result['file']:<40} {timing}")
+    print(f"\n⏱ 解析時間: {elapsed:.2f}s（デコード {decoded} / キャッシュ {len(files) - decoded}）")
     
     # 統計情報
     print("\n" + "=" * 60)
     print("📊 統計情報")
     print("=" * 60)
     
-    all_dbfs = []
+    all_lufs = []
     for category in ["bgm", "se"]:
-        category_dbfs = [r["dBFS"] for r in results[category] if r.get("success")]
-        if category_dbfs:
-            avg = sum(category_dbfs) / len(category_dbfs)
-            min_dbfs = min(category_dbfs)
-            max_dbfs = max(category_dbfs)
-            all_dbfs.extend(category_dbfs)
+        # 無音ファイル（-inf）は統計から除く
+        category_lufs = [r["lufs_integrated"] for r in results[category]
+                         if r.get("success") and not math.isinf(r["lufs_integrated"])]
+        if category_lufs:
+            avg = sum(category_lufs) / len(category_lufs)
+            min_lufs = min(category_lufs)
+            max_lufs = max(category_lufs)
+            all_lufs.extend(category_lufs)
             print(f"\n{category.upper()}:")
-            print(f"  ファイル数: {len(category_dbfs)}")
-            print(f"  平均 dBFS: {avg:.2f}")
-            print(f"  最小 dBFS: {min_dbfs:.2f}")
-            print(f"  最大 dBFS: {max_dbfs:.2f}")
-            print(f"  差分: {max_dbfs - min_dbfs:.2f} dB")
+            print(f"  ファイル数: {len(category_lufs)}")
+            print(f"  平均 LUFS: {avg:.2f}")
+            print(f"  最小 LUFS: {min_lufs:.2f}")
+            print(f"  最大 LUFS: {max_lufs:.2f}")
+            print(f"  差分: {max_lufs - min_lufs:.2f} LU")
     
-    if all_dbfs:
+    if all_lufs:
         print(f"\n全体:")
-        print(f"  平均 dBFS: {sum(all_dbfs) / len(all_dbfs):.2f}")
-        print(f"  範囲: {min(all_dbfs):.2f} ~ {max(all_dbfs):.2f}")
+        print(f"  平均 LUFS: {sum(all_lufs) / len(all_lufs):.2f}")
+        print(f"  範囲: {min(all_lufs):.2f} ~ {max(all_lufs):.2f}")
     
     # 詳細結果を表示
     print("\n" + "=" * 60)
@@ -193,9 +301,11 @@ def main():
     for category in ["bgm", "se"]:
         print(f"\n{category.upper()}:")
         print("-" * 50)
-        for r in sorted(results[category], key=lambda x: x.get("dBFS", -100)):
+        for r in sorted(results[category], key=lambda x: x.get("lufs_integrated", -100)):
             if r["success"]:
-                print(f"  {r['file']:<40} {r['dBFS']:>7.2f} dBFS → 推奨: {r['recommended_volume']:.2f}")
+                print(f"  {r['file']:<40} {r['lufs_integrated']:>7.2f} LUFS "
+                      f"(短期最大 {r['lufs_short_term_max']:>7.2f}, TP {r['true_peak_dbtp']:>6.2f} dBTP) "
+                      f"→ 推奨: {format_volume(r['recommended_volume'])}")
             else:
                 print(f"  {r['file']:<40} エラー: {r.get('error', 'Unknown')}")
     
@@ -235,20 +345,21 @@ def main():
         "sfx_medal": "se_clear_v2_pikon.mp3",
     }
     
-    print("\n// 推奨音量設定（dBFSに基づく自動計算）")
+    print("\n// 推奨音量設定（LUFSに基づく自動計算）")
     recommended_settings = {}
     for key, filename in audio_map_files.items():
         category = KEY_CATEGORY_MAP.get(key, "gameplay_se")
         if filename in file_to_result:
-            dbfs = file_to_result[filename]["dBFS"]
-            volume = calculate_recommended_volume(dbfs, category, key)
+            lufs = file_to_result[filename]["lufs_integrated"]
+            volume = calculate_recommended_volume(lufs, category, key)
             recommended_settings[key] = {
                 "file": filename,
-                "dBFS": dbfs,
+                "dBFS": file_to_result[filename]["dBFS"],
+                "lufs_integrated": lufs,
                 "category": category,
                 "volume": volume,
             }
-            print(f"{key}: {volume:.2f}  // {filename} ({dbfs:.2f} dBFS)")
+            print(f"{key}: {format_volume(volume)}  // {filename} ({lufs:.2f} LUFS)")
         else:
             print(f"{key}: ファイル未検出 ({filename})")
     
@@ -266,4 +377,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    main(jobs=parse_jobs(sys.argv), force="--force" in sys.argv)
@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+"""
+その場で上書きするスクリプト（中央配置・キンピカ化・色変換・無音カット）共通のバックアップ置き場
+- 中身は内容ハッシュ（SHA-256）ごとに1回だけ保存する（blobs/<先頭2文字>/<ハッシュ>）
+- 実行ごとに「どのファイルがどのハッシュだったか」だけの小さいマニフェストを残す（runs/<実行ID>.json）
+  → 前回と同じ中身のファイルはバックアップしてもバイト数が増えない
+     （毎回タイムスタンプのフォルダに全部コピーしていたのをやめる）
+- ファイルのハッシュはビルドキャッシュ（.asset_cache/backup_store.json）に (サイズ, 更新時刻) つきでメモするので、
+  変わっていないファイルは stat だけ
+- 復元も今の中身とハッシュが同じファイルは書かない（変わったファイルだけコピー）
+- どのマニフェストからも参照されていない中身は --gc で削除（--keep N でツールごとに新しい N 回分だけ残す）
+- 実行ID は "<日時>_<ツール名>"。--restore には日時だけ（前方一致）でも渡せる
+
+置き場: assets/_backup_store/（"_" フォルダなので同期・最適化などの対象外）
+
+使い方:
+    python backup_store.py --list
+    python backup_store.py --restore 20260129_060629_center_paws
+    python backup_store.py --restore 20260129_060629 --dry-run
+    python backup_store.py --gc --keep 5
+    python backup_store.py --import ../assets/nikukyu/_backup_originals/20260129_060629 \\
+        --target ../assets/nikukyu/individual --tool center_paws
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from build_cache import BuildCache, HASH_CHUNK
+from parallel import map_ordered
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+STORE_DIR = PROJECT_ROOT / "assets" / "_backup_store"
+BLOB_FOLDER = "blobs"
+RUN_FOLDER = "runs"
+CACHE_NAME = "backup_store"
+
+
+def format_bytes(size):
+    if size >= 1024 * 1024:
+        return f"{size / 1024 / 1024:.1f}MB"
+    return f"{size / 1024:.1f}KB"
+
+
+class BackupStore:
+    """
+    内容ハッシュで重複を除いたバックアップ置き場
+
+    blobs/<sha[:2]>/<sha>: ファイルの中身（同じ中身は1つだけ）
+    runs/<実行ID>.json:    {"id", "tool", "created", "new_bytes",
+                            "files": {相対パス: {"sha256", "size"}}}
+    相対パスは PROJECT_ROOT から（外のファイルは絶対パス）
+    """
+
+    def __init__(self, root=STORE_DIR, cache=None):
+        self.root = Path(root)
+        self.cache = cache or BuildCache(CACHE_NAME)
+        self._lock = threading.Lock()
+
+    # ---------- 中身 ----------
+
+    def blob_path(self, sha):
+        return self.root / BLOB_FOLDER / sha[:2] / sha
+
+    def _put_blob(self, path, sha):
+        """
+        中身を保存（同じハッシュがあれば何もしない）
+        コピーしながらハッシュを取り直し、メモと違えば（直前に書き換わった）実際のハッシュで保存
+        戻り値: (ハッシュ, 新しく保存したバイト数)
+        """
+        if self.blob_path(sha).exists():
+            return sha, 0
+        tmp_dir = self.root / BLOB_FOLDER / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = tmp_dir / uuid.uuid4().hex
+        h = hashlib.sha256()
+        size = 0
+        with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+            for chunk in iter(lambda: src.read(HASH_CHUNK), b""):
+                h.update(chunk)
+                dst.write(chunk)
+                size += len(chunk)
+        actual = h.hexdigest()
+        target = self.blob_path(actual)
+        if target.exists():
+            tmp_path.unlink()
+            return actual, 0
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, target)
+        return actual, size
+
+    # ---------- 実行（マニフェスト） ----------
+
+    def _run_path(self, run_id):
+        return self.root / RUN_FOLDER / f"{run_id}.json"
+
+    def _new_run_id(self, tool):
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        run_id = f"{stamp}_{tool}"
+        number = 2
+        while self._run_path(run_id).exists():
+            run_id = f"{stamp}_{tool}_{number}"
+            number += 1
+        return run_id
+
+    def _write_run(self, manifest):
+        path = self._run_path(manifest["id"])
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def backup(self, tool, paths, jobs=None, run_id=None):
+        """
+        paths の今の中身を1回分のバックアップとして記録
+        変わっていないファイルは stat だけ、中身が置き場にあればコピーもしない
+        戻り値: マニフェスト（対象が無ければ None）
+        """
+        paths = [Path(p) for p in paths if Path(p).is_file()]
+        if not paths:
+            return None
+        shas = map_ordered(self.cache.digest, [(p,) for p in paths], jobs, executor="thread")
+        stored = map_ordered(self._put_blob, [(p, sha) for p, (sha, _) in zip(paths, shas)],
+                             jobs, executor="thread")
+
+        files = {}
+        new_bytes = 0
+        for path, (result, error) in zip(paths, stored):
+            if error:
+                raise OSError(f"バックアップできません: {path}: {error}")
+            sha, added = result
+            new_bytes += added
+            files[BuildCache._rel(path)] = {"sha256": sha, "size": path.stat().st_size}
+
+        manifest = {
+            "id": run_id or self._new_run_id(tool),
+            "tool": tool,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "new_bytes": new_bytes,
+            "files": dict(sorted(files.items())),
+        }
+        self._write_run(manifest)
+        self.cache.save()
+        return manifest
+
+    def runs(self, tool=None):
+        """全実行のマニフェスト（古い順）"""
+        manifests = []
+        run_dir = self.root / RUN_FOLDER
+        if not run_dir.exists():
+            return manifests
+        for path in sorted(run_dir.glob("*.json")):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if tool is None or manifest.get("tool") == tool:
+                manifests.append(manifest)
+        manifests.sort(key=lambda m: (m.get("created", ""), m["id"]))
+        return manifests
+
+    def find_run(self, run_id, tool=None):
+        """実行ID（前方一致でもよい、複数あれば一番新しいもの）のマニフェスト。無ければ None"""
+        path = self._run_path(run_id)
+        if path.exists():
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        matches = [m for m in self.runs(tool) if m["id"].startswith(run_id)]
+        return matches[-1] if matches else None
+
+    def drop(self, run_id):
+        """マニフェストを削除（中身は gc で消える）"""
+        self._run_path(run_id).unlink()
+
+    # ---------- 復元 ----------
+
+    @staticmethod
+    def _target(rel):
+        path = Path(rel)
+        return path if path.is_absolute() else PROJECT_ROOT / path
+
+    def _restore_one(self, rel, entry, dry_run):
+        target = self._target(rel)
+        if target.is_file() and self.cache.digest(target) == entry["sha256"]:
+            return "same"
+        blob = self.blob_path(entry["sha256"])
+        if not blob.exists():
+            return "missing"
+        if not dry_run:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = target.with_name(target.name + ".restore_tmp")
+            shutil.copyfile(blob, tmp_path)
+            os.replace(tmp_path, target)
+        return "restored"
+
+    def restore(self, manifest, paths=None, dry_run=False, jobs=None):
+        """
+        マニフェストの内容に戻す（今の中身とハッシュが同じファイルは書かない）
+        paths を渡すとその中のファイルだけ
+        戻り値: {"restored": [...], "same": [...], "missing": [...]}（相対パス）
+        """
+        entries = manifest["files"]
+        if paths is not None:
+            wanted = {BuildCache._rel(p) for p in paths}
+            entries = {rel: entry for rel, entry in entries.items() if rel in wanted}
+        items = sorted(entries.items())
+        outcome = map_ordered(self._restore_one, [(rel, entry, dry_run) for rel, entry in items],
+                              jobs, executor="thread")
+
+        report = {"restored": [], "same": [], "missing": []}
+        for (rel, _), (state, error) in zip(items, outcome):
+            if error:
+                raise OSError(f"復元できません: {rel}: {error}")
+            report[state].append(rel)
+        if not dry_run:
+            self.cache.save()
+        return report
+
+    # ---------- 容量・掃除 ----------
+
+    def costs(self, manifests=None):
+        """
+        実行ごとのバイト数 [(マニフェスト, 合計, 単独)]
+        合計: その実行のファイルの大きさの和（重複除去前）
+        単独: その実行からしか参照されていない中身の大きさ（その実行を消すと空く分）
+        """
+        manifests = self.runs() if manifests is None else manifests
+        refs = {}
+        for manifest in manifests:
+            for entry in manifest["files"].values():
+                refs.setdefault(entry["sha256"], set()).add(manifest["id"])
+
+        result = []
+        for manifest in manifests:
+            seen = {}
+            for entry in manifest["files"].values():
+                seen[entry["sha256"]] = entry["size"]
+            total = sum(entry["size"] for entry in manifest["files"].values())
+            own = sum(size for sha, size in seen.items() if refs[sha] == {manifest["id"]})
+            result.append((manifest, total, own))
+        return result
+
+    def stored_bytes(self):
+        """置き場の中身の合計バイト数と個数"""
+        blob_dir = self.root / BLOB_FOLDER
+        if not blob_dir.exists():
+            return 0, 0
+        blobs = [p for p in blob_dir.glob("??/*") if p.is_file()]
+        return sum(p.stat().st_size for p in blobs), len(blobs)
+
+    def gc(self, keep=None, dry_run=False):
+        """
+        keep を指定するとツールごとに新しい keep 回分だけマニフェストを残す
+        その後どのマニフェストからも参照されていない中身を削除
+        戻り値: (削除した実行ID, 削除した中身の個数, 空いたバイト数)
+        """
+        manifests = self.runs()
+        dropped = []
+        if keep is not None:
+            by_tool = {}
+            for manifest in manifests:
+                by_tool.setdefault(manifest["tool"], []).append(manifest)
+            for tool_runs in by_tool.values():
+                old = tool_runs[:-keep] if keep > 0 else tool_runs
+                dropped += [m["id"] for m in old]
+        live = {entry["sha256"] for m in manifests if m["id"] not in dropped
+                for entry in m["files"].values()}
+
+        removed = freed = 0
+        blob_dir = self.root / BLOB_FOLDER
+        for path in sorted(blob_dir.glob("??/*")) if blob_dir.exists() else []:
+            if path.name in live:
+                continue
+            removed += 1
+            freed += path.stat().st_size
+            if not dry_run:
+                path.unlink()
+        if not dry_run:
+            for run_id in dropped:
+                self.drop(run_id)
+            # 中断したコピーの残り
+            shutil.rmtree(blob_dir / "tmp", ignore_errors=True)
+        return dropped, removed, freed
+
+    # ---------- 旧形式の取り込み ----------
+
+    def import_folder(self, tool, folder, target_root, jobs=None):
+        """
+        旧形式のバックアップフォルダ（_backup_originals/<日時>/ など）を1回分の実行として取り込む
+        folder 内の相対パスを target_root 内の相対パスとみなす
+        フォルダ名が日時ならそれを実行IDに使う
+        """
+        folder, target_root = Path(folder), Path(target_root).resolve()
+        sources = sorted(p for p in folder.rglob("*") if p.is_file())
+        if not sources:
+            return None
+        shas = map_ordered(self.cache.digest, [(p,) for p in sources], jobs, executor="thread")
+        files = {}
+        new_bytes = 0
+        for path, (sha, error) in zip(sources, shas):
+            if error:
+                raise OSError(f"取り込めません: {path}: {error}")
+            sha, added = self._put_blob(path, sha)
+            new_bytes += added
+            target = target_root / path.relative_to(folder)
+            files[BuildCache._rel(target)] = {"sha256": sha, "size": path.stat().st_size}
+
+        try:
+            created = datetime.strptime(folder.name, "%Y%m%d_%H%M%S")
+            run_id = f"{folder.name}_{tool}"
+        except ValueError:
+            created = datetime.now()
+            run_id = self._new_run_id(tool)
+        manifest = {
+            "id": run_id,
+            "tool": tool,
+            "created": created.isoformat(timespec="seconds"),
+            "new_bytes": new_bytes,
+            "files": dict(sorted(files.items())),
+        }
+        self._write_run(manifest)
+        self.cache.save()
+        return manifest
+
+
+def backup_before_write(tool, paths, jobs=None):
+    """
+    上書きする前のファイルを記録して、1行で結果を表示（各スクリプトから呼ぶ）
+    戻り値: 実行ID（対象が無ければ None）
+    """
+    manifest = BackupStore().backup(tool, paths, jobs)
+    if manifest is None:
+        return None
+    print(f"💾 バックアップ: {manifest['id']}（{len(manifest['files'])}ファイル、"
+          f"新規 {format_bytes(manifest['new_bytes'])}）")
+    return manifest["id"]
+
+
+def restore_run(run_id, tool=None, paths=None, dry_run=False, jobs=None):
+    """実行ID（前方一致可）の内容に戻して結果を表示。戻り値: 見つかったか"""
+    store = BackupStore()
+    manifest = store.find_run(run_id, tool)
+    if manifest is None:
+        print(f"❌ バックアップが見つかりません: {run_id}")
+        return False
+    report = store.restore(manifest, paths, dry_run, jobs)
+    verb = "復元予定" if dry_run else "復元"
+    for rel in report["restored"]:
+        print(f"  ↩ {rel}")
+    for rel in report["missing"]:
+        print(f"  ✗ {rel}（中身がありません）")
+    print(f"✅ {manifest['id']}: {verb} {len(report['restored'])} / 変更なし {len(report['same'])}"
+          + (f" / 欠損 {len(report['missing'])}" if report["missing"] else ""))
+    return True
+
+
+def print_runs(store, tool=None):
+    manifests = store.runs(tool)
+    if not manifests:
+        print("バックアップはありません")
+        return
+    print(f"  {'実行ID':<40} {'ファイル':>8} {'合計':>10} {'単独':>10} {'新規':>10}")
+    for manifest, total, own in store.costs(manifests):
+        print(f"  {manifest['id']:<40} {len(manifest['files']):>8} {format_bytes(total):>10}"
+              f" {format_bytes(own):>10} {format_bytes(manifest.get('new_bytes', 0)):>10}")
+    stored, count = store.stored_bytes()
+    logical = sum(total for _, total, _ in store.costs(manifests))
+    print(f"\n📦 {len(manifests)}回分 / 中身 {count}個 {format_bytes(stored)}"
+          f"（重複込みなら {format_bytes(logical)}）")
+    print("  単独: その実行だけが持っている中身（消すと空く分） / 新規: 記録したときに増えた分")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重複を除いたバックアップ置き場の管理")
+    parser.add_argument("--list", action="store_true", help="実行の一覧とバイト数")
+    parser.add_argument("--tool", help="対象のツール名（--list / --restore / --import）")
+    parser.add_argument("--restore", metavar="RUN_ID", help="この実行の内容に戻す（前方一致可）")
+    parser.add_argument("paths", nargs="*", type=Path, help="--restore で戻すファイル（省略時は全部）")
+    parser.add_argument("--gc", action="store_true", help="参照されていない中身を削除")
+    parser.add_argument("--keep", type=int, default=None, help="--gc でツールごとに残す回数")
+    parser.add_argument("--import", dest="import_folder", type=Path, metavar="FOLDER",
+                        help="旧形式のバックアップフォルダを取り込む")
+    parser.add_argument("--target", type=Path, help="--import のファイルの元の場所（フォルダ）")
+    parser.add_argument("--dry-run", action="store_true", help="書き込まない")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="スレッド数")
+    args = parser.parse_args()
+
+    store = BackupStore()
+    if args.restore:
+        if not restore_run(args.restore, args.tool, args.paths or None, args.dry_run, args.jobs):
+            sys.exit(1)
+    elif args.gc:
+        dropped, removed, freed = store.gc(args.keep, args.dry_run)
+        for run_id in dropped:
+            print(f"  － {run_id}")
+        state = "（dry-run）" if args.dry_run else ""
+        print(f"🧹 実行 {len(dropped)}件 / 中身 {removed}個 {format_bytes(freed)} を削除{state}")
+    elif args.import_folder:
+        if not args.target or not args.tool:
+            parser.error("--import には --target と --tool が必要です")
+        manifest = store.import_folder(args.tool, args.import_folder, args.target, args.jobs)
+        if manifest is None:
+            print(f"ファイルがありません: {args.import_folder}")
+            return
+        print(f"📥 {manifest['id']}: {len(manifest['files'])}ファイル、"
+              f"新規 {format_bytes(manifest['new_bytes'])}")
+    else:
+        print_runs(store, args.tool)
+
+
+if __name__ == "__main__":
+    main()
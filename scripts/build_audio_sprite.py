@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+効果音のオーディオスプライト作成ツール（Phaser audioSprite 形式）
+- game.js の AUDIO_MAP で使っている SE（BGM 以外）を1本の音声につなげる
+  → 起動時のリクエスト数とデコーダーの数を SE の数から1つに減らす
+- クリップの間には無音のガード（GUARD_SECONDS）を入れる
+  （デコーダーの誤差で隣のクリップの頭が鳴らないように）
+- つなげる前に analyze_audio_volume.py の解析結果でカテゴリごとの目標ラウドネスに揃える
+  （ゲインの決め方は normalize_audio.py と同じ）
+- 同じファイルを使うキー（sfx_ui_tap / sfx_ui_toggle など）は同じ区間を指すマーカーにする
+- サンプルレート・チャンネル数はクリップの中で一番高いものに揃える
+
+出力: assets/audio/sprite/se_sprite.json / .ogg / .m4a（ffmpeg がなければ .wav のみ）
+読み込み例: this.load.audioSprite('se_sprite', 'assets/audio/sprite/se_sprite.json')
+          this.sound.playAudioSprite('se_sprite', 'sfx_connect', { volume })
+
+使い方:
+    python build_audio_sprite.py
+    python build_audio_sprite.py --guard 0.1 --fallback mp3
+    python build_audio_sprite.py --dry-run   # 配置とレポートだけ（書き出しなし）
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import time
+import wave
+
+import numpy as np
+
+from analyze_audio_volume import CACHE_NAME, KEY_CATEGORY_MAP, PROJECT_ROOT, analyze_with_cache, load_audio_map
+from build_cache import BuildCache
+from loudness import load_audio
+from normalize_audio import (
+    CATEGORY_BITRATES,
+    FALLBACK_CODECS,
+    OPUS_CODEC,
+    encode_one,
+    normalize_gain,
+)
+from parallel import map_ordered
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+OUTPUT_DIR = PROJECT_ROOT / "assets" / "audio" / "sprite"
+SPRITE_NAME = "se_sprite"
+GUARD_SECONDS = 0.05   # クリップ間の無音
+SPRITE_BITRATE_CATEGORY = "result_se"  # スプライト全体のビットレート（SE で一番高いカテゴリ）
+
+
+# ========================================
+# クリップの読み込み・整形
+# ========================================
+
+def se_clips(audio_map):
+    """
+    スプライトに入れる SE を {ファイル: [キー, ...]} で返す（定義順）
+    BGM（ループ再生・bgm カテゴリ）は対象外
+    """
+    clips = {}
+    for key, meta in audio_map.items():
+        if meta["loop"] or KEY_CATEGORY_MAP.get(key) == "bgm":
+            continue
+        clips.setdefault(meta["path"], []).append(key)
+    return clips
+
+
+def resample(samples, src_rate, dst_rate):
+    """FFT でサンプルレートを変換（短い SE 用）"""
+    if src_rate == dst_rate or samples.shape[0] == 0:
+        return samples
+    n_out = int(round(samples.shape[0] * dst_rate / src_rate))
+    spectrum = np.fft.rfft(samples, axis=0)
+    return np.fft.irfft(spectrum, n_out, axis=0) * (n_out / samples.shape[0])
+
+
+def match_channels(samples, channels):
+    if samples.shape[1] == channels:
+        return samples
+    if channels == 1:
+        return samples.mean(axis=1, keepdims=True)
+    return np.repeat(samples[:, :1], channels, axis=1)
+
+
+# ========================================
+# スプライト作成
+# ========================================
+
+def layout(clips, guard_seconds=GUARD_SECONDS):
+    """
+    クリップを並べる
+    clips: [(ファイル, キー一覧, サンプル, ゲインdB)]
+    戻り値: (つないだサンプル, {キー: (開始秒, 終了秒)}, サンプルレート)
+    """
+    rate = max(c[2][1] for c in clips)
+    channels = max(c[2][0].shape[1] for c in clips)
+    guard = np.zeros((int(round(guard_seconds * rate)), channels))
+
+    parts, markers, position = [guard], {}, guard.shape[0]
+    for _, keys, (samples, src_rate), gain_db in clips:
+        clip = match_channels(resample(samples, src_rate, rate), channels) * 10 ** (gain_db / 20)
+        start, end = position / rate, (position + clip.shape[0]) / rate
+        for key in keys:
+            markers[key] = (round(start, 4), round(end, 4))
+        parts.extend([clip, guard])
+        position += clip.shape[0] + guard.shape[0]
+    return np.concatenate(parts), markers, rate
+
+
+def write_wav(path, samples, rate):
+    """16bit PCM WAV で保存（エンコードの元）"""
+    pcm = np.clip(np.round(samples * 32767), -32768, 32767).astype("<i2")
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(samples.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(pcm.tobytes())
+
+
+def spritemap_json(resources, markers):
+    """Phaser の audioSprite JSON"""
+    return {
+        "resources": resources,
+        "spritemap": {
+            key: {"start": start, "end": end, "loop": False}
+            for key, (start, end) in markers.items()
+        },
+    }
+
+
+def build(fallback="aac", guard_seconds=GUARD_SECONDS, jobs=None, dry_run=False):
+    audio_map = load_audio_map()
+    clips = se_clips(audio_map)
+    for path in [p for p in clips if not p.exists()]:
+        keys = clips.pop(path)
+        print(f"⚠ ファイル未検出（スキップ）: {path.relative_to(PROJECT_ROOT).as_posix()}（{', '.join(keys)}）")
+    files = list(clips)
+    print(f"🔊 SE: {sum(len(k) for k in clips.values())}キー / {len(files)}ファイル")
+
+    # 1. 解析結果（キャッシュ）からクリップごとのゲインを決める
+    analyses = analyze_with_cache(files, jobs, cache=BuildCache(CACHE_NAME))
+    decoded = map_ordered(load_audio, [(f,) for f in files], jobs)
+
+    packed, skipped = [], []
+    for path, (analysis, _), (clip, error) in zip(files, analyses, decoded):
+        keys = clips[path]
+        if error or not analysis["success"]:
+            skipped.append((path, keys, error or analysis.get("error")))
+            continue
+        gain, limited = normalize_gain(analysis, KEY_CATEGORY_MAP.get(keys[0], "gameplay_se"))
+        packed.append((path, keys, clip, gain))
+        note = "（ピーク制限）" if limited else ""
+        print(f"  ✓ {path.name:<32} {analysis['lufs_integrated']:>7.2f} LUFS  gain {gain:+6.2f} dB{note}"
+              f"  → {', '.join(keys)}")
+    for path, keys, error in skipped:
+        print(f"  ✗ {path.name:<32} {error}（{', '.join(keys)} は個別ファイルのまま）")
+    if not packed:
+        print("❌ スプライトに入れられる SE がありません")
+        return None
+
+    # 2. つなげる
+    samples, markers, rate = layout(packed, guard_seconds)
+    print(f"\n📏 {samples.shape[0] / rate:.2f}秒 / {rate}Hz / {samples.shape[1]}ch / ガード {guard_seconds}s")
+
+    before_bytes = sum(p.stat().st_size for p, _, _, _ in packed)
+    before_requests = sum(len(keys) for _, keys, _, _ in packed)
+    if dry_run:
+        for key, (start, end) in markers.items():
+            print(f"  {key:<22} {start:8.3f} - {end:8.3f}")
+        return markers
+
+    # 3. 書き出し（WAV → Opus / フォールバック）
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    wav_path = OUTPUT_DIR / f"{SPRITE_NAME}.wav"
+    write_wav(wav_path, samples, rate)
+
+    outputs = {}
+    if shutil.which("ffmpeg"):
+        opus_rate, fallback_rate = CATEGORY_BITRATES[SPRITE_BITRATE_CATEGORY]
+        targets = {
+            "opus": (OUTPUT_DIR / f"{SPRITE_NAME}{OPUS_CODEC[0]}", OPUS_CODEC[1], opus_rate),
+            fallback: (OUTPUT_DIR / f"{SPRITE_NAME}{FALLBACK_CODECS[fallback][0]}",
+                       FALLBACK_CODECS[fallback][1], fallback_rate),
+        }
+        results = map_ordered(encode_one, [(wav_path, out, 0.0, args, br) for out, args, br in targets.values()],
+                              jobs, executor="thread")
+        for (fmt, (out, _, _)), (result, error) in zip(targets.items(), results):
+            if error:
+                print(f"  ✗ {fmt}: {error}")
+            else:
+                outputs[fmt] = (out, result["bytes"])
+        if outputs:
+            wav_path.unlink()
+        else:
+            # どちらも変換できなかったときは WAV を残してそれを使う
+            print("⚠ 変換に失敗したので WAV のまま出力します")
+            outputs["wav"] = (wav_path, wav_path.stat().st_size)
+    else:
+        print("⚠ ffmpeg が見つからないので WAV のまま出力します")
+        outputs["wav"] = (wav_path, wav_path.stat().st_size)
+
+    resources = [f"./{out.relative_to(PROJECT_ROOT).as_posix()}" for out, _ in outputs.values()]
+    json_path = OUTPUT_DIR / f"{SPRITE_NAME}.json"
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(spritemap_json(resources, markers), f, ensure_ascii=False, indent=2)
+
+    # 4. レポート
+    print("\n" + "=" * 60)
+    print("📊 スプライト化の結果")
+    print("=" * 60)
+    print(f"  リクエスト: {before_requests} → 2（JSON + 音声1本、形式はブラウザが選ぶ）")
+    print(f"  デコード:   {before_requests} → 1")
+    for fmt, (out, size) in outputs.items():
+        ratio = size / before_bytes * 100 if before_bytes else 0
+        print(f"  {fmt:<5} {before_bytes / 1024:8.1f}KB → {size / 1024:8.1f}KB ({ratio:.0f}%)  {out.name}")
+    print(f"\n💾 {json_path}")
+    return markers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="効果音のオーディオスプライト作成")
+    parser.add_argument("--guard", type=float, default=GUARD_SECONDS, help="クリップ間の無音（秒）")
+    parser.add_argument("--fallback", choices=list(FALLBACK_CODECS), default="aac",
+                        help="Opus に対応していないブラウザ向けの形式")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="ワーカー数")
+    parser.add_argument("--dry-run", action="store_true", help="配置とレポートだけ（書き出しなし）")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    build(args.fallback, args.guard, args.jobs, args.dry_run)
+    print(f"\n⏱ {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
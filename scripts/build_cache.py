@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+アセットパイプライン用ビルドキャッシュ
+- 出力ファイルごとに「どのステージが、どのキーで作ったか」と最終的な内容ハッシュを記録
+- キー = 入力の内容ハッシュ + パラメータ + ツールバージョン から作るハッシュ
+- キーが同じで出力ファイルも記録時のままなら、そのステージはスキップできる
+- 同じファイルを複数ステージが上書きする場合（切り抜き → 中央配置）も、
+  ステージごとのキーと最終ハッシュを持つので両方スキップできる
+- ファイルハッシュは (サイズ, 更新時刻) が変わっていなければ再計算しない
+  → 変更なしの再ビルドは stat だけで終わる
+- 出力ファイルを作らない解析ステージ（音声のラウドネス測定など）は
+  キー → 結果 のメモ（lookup / store）に解析結果そのものを保存できる
+
+キャッシュは PROJECT_ROOT/.asset_cache/<name>.json に保存（git 管理外）
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CACHE_DIR = PROJECT_ROOT / ".asset_cache"
+
+HASH_CHUNK = 1024 * 1024
+
+
+def file_sha256(path):
+    """ファイル内容の SHA-256"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def make_key(*parts):
+    """パラメータ（JSON化できる値）からキャッシュキーを作る"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class BuildCache:
+    """
+    出力ファイル単位のビルドキャッシュ
+
+    entries: { 相対パス: {"stages": {ステージ名: キー}, "sha256": 最終ハッシュ} }
+    files:   { 相対パス: {"size", "mtime_ns", "sha256"} }  # ハッシュのメモ
+    results: { キー: 解析結果（JSON化できる値） }             # 解析結果のメモ
+    """
+
+    def __init__(self, name, cache_dir=CACHE_DIR):
+        self.path = Path(cache_dir) / f"{name}.json"
+        self.entries = {}
+        self.files = {}
+        self.results = {}
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self.entries = data.get("entries", {})
+                self.files = data.get("files", {})
+                self.results = data.get("results", {})
+            except (OSError, ValueError):
+                # 壊れたキャッシュは捨てて作り直す
+                self.entries = {}
+                self.files = {}
+                self.results = {}
+
+    @staticmethod
+    def _rel(path):
+        path = Path(path).resolve()
+        try:
+            return path.relative_to(PROJECT_ROOT).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+    def digest(self, path):
+        """ファイルの SHA-256（サイズと更新時刻が同じならメモを使う）"""
+        rel = self._rel(path)
+        st = os.stat(path)
+        with self._lock:
+            memo = self.files.get(rel)
+            if memo and memo["size"] == st.st_size and memo["mtime_ns"] == st.st_mtime_ns:
+                return memo["sha256"]
+
+        sha = file_sha256(path)
+        with self._lock:
+            self.files[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha}
+        return sha
+
+    def is_fresh(self, path, stage, key):
+        """stage が同じキーで作った出力がそのまま残っているか"""
+        entry = self.entries.get(self._rel(path))
+        if not entry or entry["stages"].get(stage) != key:
+            return False
+        if not Path(path).exists():
+            return False
+        return self.digest(path) == entry["sha256"]
+
+    def stage_key(self, path, stage):
+        """記録されている stage のキー（なければ None）"""
+        entry = self.entries.get(self._rel(path))
+        return entry["stages"].get(stage) if entry else None
+
+    def record(self, path, stage, key, reset=False):
+        """
+        stage が path を書き出したことを記録
+        reset=True なら他のステージの記録を消す（ファイルを作り直した場合）
+        """
+        rel = self._rel(path)
+        sha = self.digest(path)
+        with self._lock:
+            entry = self.entries.get(rel)
+            if reset or entry is None:
+                entry = {"stages": {}}
+            entry["stages"][stage] = key
+            entry["sha256"] = sha
+            self.entries[rel] = entry
+
+    def invalidate(self, path):
+        """path の記録を削除（次回必ず作り直す）"""
+        with self._lock:
+            self.entries.pop(self._rel(path), None)
+
+    def lookup(self, key):
+        """key で保存した解析結果（なければ None）"""
+        with self._lock:
+            return self.results.get(key)
+
+    def store(self, key, value):
+        """解析結果を key で保存"""
+        with self._lock:
+            self.results[key] = value
+
+    def prune_results(self, keep):
+        """keep に含まれないキーの解析結果を削除（消えた・変わったファイルの分）"""
+        keep = set(keep)
+        with self._lock:
+            self.results = {k: v for k, v in self.results.items() if k in keep}
+
+    def prune_files(self, keep):
+        """keep（パスのリスト）に含まれないファイルのハッシュのメモを削除（消えたファイルの分）"""
+        keep = {self._rel(path) for path in keep}
+        with self._lock:
+            self.files = {k: v for k, v in self.files.items() if k in keep}
+
+    def clear(self):
+        """全ての記録を削除"""
+        with self._lock:
+            self.entries = {}
+            self.files = {}
+            self.results = {}
+
+    def save(self):
+        """キャッシュを保存（書き込み途中で壊れないよう一時ファイル経由）"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with self._lock:
+            data = {"entries": self.entries, "files": self.files}
+            if self.results:
+                data["results"] = self.results
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
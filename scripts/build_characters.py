@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+キャラクター画像の差分ビルド
+1. slice_dogs.py / slice_new_dogs.py のマニフェストで切り抜き
+2. center_dogs.py で中央配置（512x512、@0.5x / @0.25x と density_manifest.json も）
+3. optimize_png.py で可逆再圧縮
+
+どのステージもビルドキャッシュ（build_cache.py）で
+シート内容・INSET_PX・ADJUSTMENTS・OUTPUT_SIZE・PADDING_RATIO・ツールバージョンが
+前回と同じ画像をスキップする。シート1枚を直したらその16枚だけ作り直し、
+何も変えていなければ stat だけで終わる。
+
+使い方:
+    python build_characters.py
+    python build_characters.py --jobs 8
+    python build_characters.py --force   # キャッシュを無視して全部作り直す
+"""
+
+import argparse
+import sys
+import time
+
+import sprite_slicer
+from build_cache import BuildCache
+from optimize_png import optimize_paths
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+SLICE_CONFIGS = ["scripts/slice_dogs.py", "scripts/slice_new_dogs.py"]
+CENTER_SCRIPT = "assets/characters/center_dogs.py"
+
+
+def build(jobs=None, force=False):
+    """切り抜き → 中央配置 → 再圧縮を差分で実行"""
+    start = time.perf_counter()
+    cache = BuildCache(sprite_slicer.CACHE_NAME)
+
+    print("=" * 60)
+    print("[1/3] 切り抜き")
+    print("=" * 60)
+    sheets = sprite_slicer.merge_manifests(
+        *(sprite_slicer.load_script(path).build_manifest() for path in SLICE_CONFIGS)
+    )
+    results = sprite_slicer.run(sheets, jobs, cache=cache, force=force)
+    sliced = sum(1 for r in results if not r["skipped"] and not r["error"])
+
+    print("\n" + "=" * 60)
+    print("[2/3] 中央配置")
+    print("=" * 60)
+    center_dogs = sprite_slicer.load_script(CENTER_SCRIPT)
+    center_dogs.process_all_dogs(force=force, cache=cache, jobs=jobs)
+
+    print("\n" + "=" * 60)
+    print("[3/3] PNG 再圧縮")
+    print("=" * 60)
+    outputs = [cell["output"] for sheet in sheets for cell in sheet["cells"] if cell["output"].exists()]
+    optimize_paths(outputs, jobs, cache=cache, force=force)
+
+    print(f"\n⏱ 合計 {time.perf_counter() - start:.2f}s（切り抜き {sliced}枚）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="キャラクター画像の差分ビルド")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="ワーカー数")
+    parser.add_argument("--force", action="store_true", help="キャッシュを無視して全部作り直す")
+    args = parser.parse_args()
+    build(args.jobs, args.force)
+
+
+if __name__ == "__main__":
+    main()
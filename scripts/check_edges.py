@@ -3,53 +3,184 @@
 """
 切り抜き画像の縁チェック
 非透過ピクセルが縁に接している画像をリストアップ
+
+- 縁の4辺（上下の行・左右の列）のアルファだけを配列で読んで判定
+  （パレット画像はインデックスの縁だけをアルファ表で引く → 全体の RGBA 変換はしない）
+- 辺ごとに「接しているピクセル数」と「範囲（最初〜最後の位置）」を出す
+- 対象: dog_* / legend_* / 着せ替え衣装 / 肉球 / アイコン（assets と public/assets の両方）
+- プロセスプールで並列実行、--json で結果を JSON 出力
+- 接している画像があれば終了コード 1（ビルドのチェックに使える）
+
+使い方:
+    python check_edges.py
+    python check_edges.py --threshold 16 --json edges.json
+    python check_edges.py --only characters icons -j 8
 """
 
+import argparse
+import json
+import sys
+import time
 from pathlib import Path
+
+import numpy as np
 from PIL import Image
 
-BASE_DIR = Path(r"C:\Users\janne\Documents\APP-KEROFEN\inusanpo")
-CHAR_DIR = BASE_DIR / "assets" / "characters"
+from parallel import map_ordered
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+ASSET_ROOTS = [BASE_DIR / "assets", BASE_DIR / "public" / "assets"]
+
+# グループ名 → アセットルートからの glob パターン
+GROUPS = {
+    "characters": ["characters/dog_*/*.png", "characters/legend_*/*.png"],
+    "costumes": ["kisekae/isyou/*.png"],
+    "paws": ["nikukyu/individual/*.png"],
+    "icons": ["icon/*/*.png"],
+}
 
+ALPHA_THRESHOLD = 0  # このアルファ値より大きいピクセルを「接している」とみなす
 
-def edge_contacts(image_path):
-    img = Image.open(image_path).convert("RGBA")
+
+def border_alpha(img):
+    """
+    4辺のアルファ値 {辺: 1次元配列} を返す
+    アルファを持たない画像は全て 255（不透明）扱い
+    """
     w, h = img.size
-    pixels = img.load()
-    edges = set()
 
-    for x in range(w):
-        if pixels[x, 0][3] > 0:
-            edges.add("top")
-        if pixels[x, h - 1][3] > 0:
-            edges.add("bottom")
-    for y in range(h):
-        if pixels[0, y][3] > 0:
-            edges.add("left")
-        if pixels[w - 1, y][3] > 0:
-            edges.add("right")
+    if img.mode == "P":
+        indices = np.asarray(img)
+        table = np.full(256, 255, dtype=np.uint8)
+        transparency = img.info.get("transparency")
+        if img.palette is not None and "A" in img.palette.mode:
+            alphas = np.frombuffer(bytes(img.getpalette("RGBA")), dtype=np.uint8)[3::4][:256]
+            table[:len(alphas)] = alphas
+        elif isinstance(transparency, int):
+            table[transparency] = 0
+        elif transparency:
+            alphas = np.frombuffer(bytes(transparency), dtype=np.uint8)[:256]
+            table[:len(alphas)] = alphas
+        edges = {
+            "top": indices[0], "bottom": indices[h - 1],
+            "left": indices[:, 0], "right": indices[:, w - 1],
+        }
+        return {side: table[values] for side, values in edges.items()}
+
+    if "A" in img.getbands():
+        alpha = np.asarray(img.getchannel("A"))
+    elif "transparency" in img.info:
+        alpha = np.asarray(img.convert("RGBA").getchannel("A"))
+    else:
+        return {"top": np.full(w, 255, np.uint8), "bottom": np.full(w, 255, np.uint8),
+                "left": np.full(h, 255, np.uint8), "right": np.full(h, 255, np.uint8)}
+
+    return {"top": alpha[0], "bottom": alpha[h - 1], "left": alpha[:, 0], "right": alpha[:, w - 1]}
+
+
+def edge_contacts(image_path, threshold=ALPHA_THRESHOLD):
+    """
+    縁に接している辺を返す
+    {辺: {"count": ピクセル数, "start": 最初の位置, "end": 最後の位置}}（接していない辺は含まない）
+    """
+    with Image.open(image_path) as img:
+        return image_contacts(img, threshold)
 
-    return edges
+
+def image_contacts(img, threshold=ALPHA_THRESHOLD):
+    """edge_contacts の画像版"""
+    contacts = {}
+    for side, alpha in border_alpha(img).items():
+        hits = np.flatnonzero(alpha > threshold)
+        if hits.size:
+            contacts[side] = {"count": int(hits.size), "start": int(hits[0]), "end": int(hits[-1])}
+    return contacts
+
+
+def audit_file(image_path, threshold):
+    """1枚をチェック（ワーカープロセスで実行）"""
+    with Image.open(image_path) as img:
+        return {"size": list(img.size), "edges": image_contacts(img, threshold)}
+
+
+def collect_images(groups, roots=ASSET_ROOTS):
+    """(グループ名, パス) のリスト（_backup などの "_" フォルダは除外）"""
+    images = []
+    for group in groups:
+        for root in roots:
+            if not root.exists():
+                continue
+            for pattern in GROUPS[group]:
+                for path in sorted(root.glob(pattern)):
+                    if not any(part.startswith("_") for part in path.relative_to(root).parts):
+                        images.append((group, path))
+    return images
+
+
+def audit(groups=None, threshold=ALPHA_THRESHOLD, jobs=None, roots=ASSET_ROOTS):
+    """全画像をチェックして結果リストを返す（グループ・パス順）"""
+    images = collect_images(groups or list(GROUPS), roots)
+    outputs = map_ordered(audit_file, [(path, threshold) for _, path in images], jobs)
+
+    results = []
+    for (group, path), (output, error) in zip(images, outputs):
+        result = {"group": group, "path": path.relative_to(BASE_DIR).as_posix(),
+                  "size": None, "edges": {}, "error": error}
+        if output:
+            result.update(output)
+        results.append(result)
+    return results
 
 
 def main():
-    suspects = []
-    for folder in sorted(CHAR_DIR.iterdir()):
-        if not folder.is_dir() or not folder.name.startswith("dog_"):
-            continue
-        for image_path in sorted(folder.glob("*.png")):
-            edges = edge_contacts(image_path)
-            if edges:
-                suspects.append((str(image_path), edges))
+    parser = argparse.ArgumentParser(description="切り抜き画像の縁チェック")
+    parser.add_argument("--only", nargs="+", choices=list(GROUPS), help="チェックするグループ")
+    parser.add_argument("--threshold", type=int, default=ALPHA_THRESHOLD,
+                        help="このアルファ値より大きいピクセルを接触とみなす")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="ワーカー数")
+    parser.add_argument("--json", type=Path, help="結果を JSON で保存（- なら標準出力）")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = audit(args.only, args.threshold, args.jobs)
+    elapsed = time.perf_counter() - start
+    suspects = [r for r in results if r["edges"]]
+    errors = [r for r in results if r["error"]]
+
+    if args.json:
+        report = {
+            "threshold": args.threshold,
+            "checked": len(results),
+            "suspects": len(suspects),
+            "errors": len(errors),
+            "results": results,
+        }
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        if str(args.json) == "-":
+            print(text)
+            sys.exit(1 if suspects or errors else 0)
+        args.json.write_text(text, encoding="utf-8")
+
+    for r in errors:
+        print(f" ✗ {r['path']}: {r['error']}")
 
     if not suspects:
-        print("Edge check: OK (no edge-touching pixels found)")
-        return
+        print(f"Edge check: OK (no edge-touching pixels found, {len(results)} images, {elapsed:.2f}s)")
+    else:
+        print("Edge check: Possible clipping candidates:")
+        for r in suspects:
+            details = ", ".join(
+                f"{side} {e['count']}px @{e['start']}-{e['end']}"
+                for side, e in r["edges"].items()
+            )
+            print(f" - {r['path']}  [{details}]")
+        print(f"\n{len(suspects)}/{len(results)} images touch an edge ({elapsed:.2f}s)")
 
-    print("Edge check: Possible clipping candidates:")
-    for path, edges in suspects:
-        edge_list = ", ".join(sorted(edges))
-        print(f" - {path}  [{edge_list}]")
+    sys.exit(1 if suspects or errors else 0)
 
 
 if __name__ == "__main__":
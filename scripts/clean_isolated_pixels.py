@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+孤立ピクセル（ゴミ）除去スクリプト - NumPy高速版
+- fix_garbage.remove_bottom_artifacts と同じ判定
+  （(2*search_range+1)^2 の窓内の不透明ピクセル数が閾値未満なら透明化）
+- 近傍数は積分画像（summed-area table）から O(画素数) で計算
+- 画像全体 / 下部の帯 / 任意の矩形に適用可能
+- フォルダ一括処理、旧実装とのベンチマーク付き
+
+使い方:
+    python clean_isolated_pixels.py ../assets/characters/dog_03_toypoodle
+    python clean_isolated_pixels.py ../assets/characters --recursive --bottom 0.15
+    python clean_isolated_pixels.py --benchmark
+    python clean_isolated_pixels.py --benchmark --bottom 1.0  # 画像全体で比較
+"""
+
+import argparse
+import importlib.util
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CHAR_DIR = PROJECT_ROOT / "assets" / "characters"
+
+# fix_garbage.py と同じ既定値
+SEARCH_RANGE = 8       # 窓の半径（8 → 17x17）
+NEIGHBOR_THRESHOLD = 80  # この数未満なら孤立とみなす
+BOTTOM_PERCENT = 0.15  # 下から15%
+
+# ベンチマーク対象（fix_garbage.py の修正対象と同じトイプードル）
+BENCHMARK_DIR = CHAR_DIR / "dog_03_toypoodle"
+
+
+def count_opaque_neighbors(opaque, search_range=SEARCH_RANGE):
+    """
+    各ピクセルの (2r+1)x(2r+1) 窓内にある不透明ピクセル数を返す
+    - 窓は画像の端でクリップ（画像外は透明扱い）
+    - 自分自身もカウントに含む（旧実装と同じ）
+    """
+    h, w = opaque.shape
+    r = search_range
+
+    # 積分画像（先頭に0の行・列を追加）
+    sat = np.zeros((h + 1, w + 1), dtype=np.int32)
+    np.cumsum(np.cumsum(opaque, axis=0, dtype=np.int32), axis=1, out=sat[1:, 1:])
+
+    ys = np.arange(h)
+    xs = np.arange(w)
+    y0 = np.clip(ys - r, 0, h)
+    y1 = np.clip(ys + r + 1, 0, h)
+    x0 = np.clip(xs - r, 0, w)
+    x1 = np.clip(xs + r + 1, 0, w)
+
+    return (sat[y1][:, x1] - sat[y0][:, x1]
+            - sat[y1][:, x0] + sat[y0][:, x0])
+
+
+def find_isolated_pixels(alpha, box=None, threshold=NEIGHBOR_THRESHOLD,
+                         search_range=SEARCH_RANGE):
+    """
+    孤立ピクセルのマスク（True = 除去対象）を返す
+    - alpha: (h, w) のアルファ配列
+    - box: 判定する範囲 (left, top, right, bottom)。None なら画像全体
+      近傍数は範囲外のピクセルも含めて数える
+    """
+    opaque = alpha > 0
+    neighbors = count_opaque_neighbors(opaque, search_range)
+    isolated = opaque & (neighbors < threshold)
+
+    if box is not None:
+        left, top, right, bottom = box
+        region = np.zeros_like(isolated)
+        region[top:bottom, left:right] = True
+        isolated &= region
+
+    return isolated
+
+
+def bottom_band(size, bottom_percent=BOTTOM_PERCENT):
+    """画像下部の帯 (left, top, right, bottom) を返す（fix_garbage と同じ計算）"""
+    width, height = size
+    return (0, int(height * (1 - bottom_percent)), width, height)
+
+
+def remove_isolated_pixels(img, box=None, threshold=NEIGHBOR_THRESHOLD,
+                           search_range=SEARCH_RANGE):
+    """
+    孤立ピクセルを透明化した新しい画像と除去数を返す
+
+    注意: 旧実装はラスター順に書き換えながら判定するため、
+    先に消えたピクセルが後続の近傍数に影響する。こちらは元画像に対して
+    一括判定するので、孤立群の境界付近で数ピクセル差が出ることがある。
+    """
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+
+    data = np.array(img)
+    isolated = find_isolated_pixels(data[:, :, 3], box, threshold, search_range)
+    data[isolated] = 0
+
+    return Image.fromarray(data, 'RGBA'), int(isolated.sum())
+
+
+def remove_bottom_artifacts(img, bottom_percent=BOTTOM_PERCENT):
+    """
+    fix_garbage.remove_bottom_artifacts の置き換え（同じ引数・戻り値）
+    """
+    result, _ = remove_isolated_pixels(img, bottom_band(img.size, bottom_percent))
+    return result
+
+
+def clean_directory(directory, bottom_percent=None, recursive=False,
+                    threshold=NEIGHBOR_THRESHOLD, search_range=SEARCH_RANGE,
+                    dry_run=False):
+    """
+    フォルダ内の PNG を一括処理
+    - bottom_percent: None なら画像全体、指定時は下部の帯のみ
+    - dry_run: True なら保存せずに除去数だけ数える
+    """
+    directory = Path(directory)
+    pattern = "**/*.png" if recursive else "*.png"
+    results = []
+
+    for img_path in sorted(directory.glob(pattern)):
+        # バックアップ・プレビューは対象外
+        if any(part.startswith("_") for part in img_path.relative_to(directory).parts):
+            continue
+
+        img = Image.open(img_path)
+        box = bottom_band(img.size, bottom_percent) if bottom_percent else None
+        result, removed = remove_isolated_pixels(img, box, threshold, search_range)
+
+        if removed and not dry_run:
+            result.save(img_path, 'PNG', optimize=True)
+
+        rel = img_path.relative_to(directory)
+        print(f"  {'✓' if removed else '-'} {rel}: {removed}px")
+        results.append({"path": str(img_path), "removed": removed})
+
+    return results
+
+
+def _load_fix_garbage():
+    """assets/characters/fix_garbage.py を読み込む（ベンチマーク用）"""
+    path = CHAR_DIR / "fix_garbage.py"
+    spec = importlib.util.spec_from_file_location("fix_garbage", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def benchmark(directory=BENCHMARK_DIR, bottom_percent=BOTTOM_PERCENT):
+    """
+    旧実装（ピクセルループ）との速度・結果比較
+    """
+    fix_garbage = _load_fix_garbage()
+
+    print("=" * 60)
+    print("孤立ピクセル除去 ベンチマーク")
+    print(f"対象: {directory}")
+    print("=" * 60)
+
+    total_slow = 0.0
+    total_fast = 0.0
+
+    for img_path in sorted(Path(directory).glob("*.png")):
+        img = Image.open(img_path).convert('RGBA')
+
+        start = time.perf_counter()
+        slow = fix_garbage.remove_bottom_artifacts_legacy(img.copy(), bottom_percent)
+        slow_sec = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fast = remove_bottom_artifacts(img.copy(), bottom_percent)
+        fast_sec = time.perf_counter() - start
+
+        slow_alpha = np.array(slow)[:, :, 3]
+        fast_alpha = np.array(fast)[:, :, 3]
+        diff = int(np.count_nonzero(slow_alpha != fast_alpha))
+
+        total_slow += slow_sec
+        total_fast += fast_sec
+        print(f"  {img_path.name:<14} 旧: {slow_sec:8.3f}s  新: {fast_sec * 1000:7.1f}ms  "
+              f"x{slow_sec / fast_sec:7.0f}  差分: {diff}px")
+
+    if total_fast > 0:
+        print("-" * 60)
+        print(f"  合計           旧: {total_slow:8.3f}s  新: {total_fast * 1000:7.1f}ms  "
+              f"x{total_slow / total_fast:7.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="孤立ピクセル（ゴミ）除去 - NumPy高速版")
+    parser.add_argument("directories", nargs="*", type=Path, help="処理するフォルダ")
+    parser.add_argument("--bottom", type=float, default=None,
+                        help="下部の帯のみ処理（例: 0.15）。省略時は画像全体")
+    parser.add_argument("--threshold", type=int, default=NEIGHBOR_THRESHOLD)
+    parser.add_argument("--search-range", type=int, default=SEARCH_RANGE)
+    parser.add_argument("--recursive", action="store_true", help="サブフォルダも処理")
+    parser.add_argument("--dry-run", action="store_true", help="保存せずに除去数だけ表示")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="トイプードル画像で旧実装と比較")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(bottom_percent=args.bottom or BOTTOM_PERCENT)
+        return
+
+    if not args.directories:
+        parser.print_help()
+        return
+
+    total = 0
+    for directory in args.directories:
+        print(f"\n📁 {directory}")
+        results = clean_directory(directory, args.bottom, args.recursive,
+                                  args.threshold, args.search_range, args.dry_run)
+        total += sum(r["removed"] for r in results)
+
+    print(f"\n✅ 完了: {total}px 除去" + ("（dry-run）" if args.dry_run else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,10 @@ inuicon.png から個別のアイコンを切り抜くスクリプト
 4x4グリッド配置のアイコンを背景透過のまま保存
 """
 
-from PIL import Image
 import os
 
+import sprite_slicer
+
 # 入力ファイル
 INPUT_FILE = "../assets/icon/menu/inuicon.png"
 OUTPUT_DIR = "../assets/icon/menu"
@@ -35,46 +36,23 @@ ICON_MAP = {
     (3, 3): "treasure",    # 宝箱
 }
 
-def crop_icons():
+def build_manifest():
+    """切り抜きマニフェストを作成（sprite_slicer 用）"""
     script_dir = os.path.dirname(os.path.abspath(__file__))
     input_path = os.path.join(script_dir, INPUT_FILE)
     output_dir = os.path.join(script_dir, OUTPUT_DIR)
     
-    # 出力フォルダ作成
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # 画像読み込み
-    img = Image.open(input_path)
-    print(f"入力画像サイズ: {img.width}x{img.height}")
-    print(f"モード: {img.mode}")
-    
-    # グリッドサイズ計算
-    cols, rows = 4, 4
-    cell_width = img.width // cols
-    cell_height = img.height // rows
-    print(f"セルサイズ: {cell_width}x{cell_height}")
-    
-    # 各アイコンを切り抜き
-    for (row, col), name in ICON_MAP.items():
-        left = col * cell_width
-        upper = row * cell_height
-        right = left + cell_width
-        lower = upper + cell_height
-        
-        # 切り抜き
-        icon = img.crop((left, upper, right, lower))
-        
-        # 透明部分をトリミング（getbbox）
-        bbox = icon.getbbox()
-        if bbox:
-            icon = icon.crop(bbox)
-        
-        # 保存
-        output_path = os.path.join(output_dir, f"{name}.png")
-        icon.save(output_path, "PNG")
-        print(f"保存: {name}.png ({icon.width}x{icon.height})")
-    
-    print(f"\n完了！ {len(ICON_MAP)}個のアイコンを保存しました。")
+    cells = [
+        sprite_slicer.cell(row, col, os.path.join(output_dir, f"{name}.png"))
+        for (row, col), name in ICON_MAP.items()
+    ]
+    # 透明部分をトリミング（余白なし）
+    return [sprite_slicer.sheet(input_path, 4, 4, cells, content_padding=0)]
+
+
+def crop_icons(jobs=None):
+    results = sprite_slicer.run(build_manifest(), jobs)
+    print(f"\n完了！ {sum(1 for r in results if not r['error'])}個のアイコンを保存しました。")
 
 if __name__ == "__main__":
     crop_icons()
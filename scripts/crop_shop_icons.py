@@ -3,40 +3,39 @@
 2x2グリッドの画像から個別アイコンを抽出
 """
 
-from PIL import Image
 import os
 
-def crop_shop_icons():
-    # 入力ファイル
-    input_path = r"c:\Users\janne\Documents\APP-KEROFEN\inusanpo\assets\icon\shop\freepik__22ui__20155 (1).png"
-    output_dir = r"c:\Users\janne\Documents\APP-KEROFEN\inusanpo\assets\icon\shop"
-    
-    # 画像を開く
-    img = Image.open(input_path)
-    width, height = img.size
-    print(f"元画像サイズ: {width}x{height}")
-    
-    # 2x2グリッドなので、半分に分割
-    half_w = width // 2
-    half_h = height // 2
+import sprite_slicer
+
+# 入力ファイル
+INPUT_FILE = "../assets/icon/shop/freepik__22ui__20155 (1).png"
+OUTPUT_DIR = "../assets/icon/shop"
+
+# 各アイコンの位置（row, col）→ 出力ファイル名
+ICON_MAP = {
+    (0, 0): "pack_premium.png",    # 左上：王冠
+    (0, 1): "pack_customize.png",  # 右上：パレット
+    (1, 0): "pack_noads.png",      # 左下：NO ADS
+    (1, 1): "pack_dog.png",        # 右下：箱入り犬
+}
+
+def build_manifest():
+    """切り抜きマニフェストを作成（sprite_slicer 用）"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    input_path = os.path.join(script_dir, INPUT_FILE)
+    output_dir = os.path.join(script_dir, OUTPUT_DIR)
     
-    # 各アイコンの位置と出力ファイル名
-    icons = [
-        # (left, top, right, bottom), filename
-        ((0, 0, half_w, half_h), "pack_premium.png"),        # 左上：王冠
-        ((half_w, 0, width, half_h), "pack_customize.png"),   # 右上：パレット
-        ((0, half_h, half_w, height), "pack_noads.png"),      # 左下：NO ADS
-        ((half_w, half_h, width, height), "pack_dog.png"),    # 右下：箱入り犬
+    cells = [
+        sprite_slicer.cell(row, col, os.path.join(output_dir, filename))
+        for (row, col), filename in ICON_MAP.items()
     ]
-    
-    for (box, filename) in icons:
-        # 切り抜き
-        cropped = img.crop(box)
-        
-        # 透過を維持して保存
-        output_path = os.path.join(output_dir, filename)
-        cropped.save(output_path, "PNG")
-        print(f"保存完了: {filename} ({cropped.size[0]}x{cropped.size[1]})")
+    # 2x2グリッド、透過を維持してそのまま保存
+    # 右・下のアイコンは画像の端まで（幅・高さが奇数でも最後の1px を落とさない）
+    return [sprite_slicer.sheet(input_path, 2, 2, cells, extend_edges=True)]
+
+
+def crop_shop_icons(jobs=None):
+    sprite_slicer.run(build_manifest(), jobs)
 
 if __name__ == "__main__":
     crop_shop_icons()
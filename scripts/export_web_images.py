@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+WebP / AVIF 書き出しステージ（PNG はフォールバックとして残す）
+- 透明のある画像（スプライト・アイコン）: 可逆 WebP
+- 不透明な画像（kisekae/kouen のテーマ背景・mainmenu・titlehaikei など）:
+  非可逆 WebP / AVIF。画質は PSNR のゲート（PSNR_GATE_DB）を満たす一番低い quality を二分探索で選ぶ
+  - 背景はパレット PNG（ディザあり）なので、PSNR は 2x2 平均で比べる（ディザの粒は見えないので数えない）
+  - 探索は速い設定でエンコードし、決まった quality で本番の設定のエンコードをもう一度確認する
+- PNG より小さくならない形式は書き出さない
+- game.js の this.load.image のテクスチャキーごとに、使える形式を小さい順に並べたマニフェストを書く
+    assets/image_formats.json
+    { "textures": { "title_bg": [ {"format": "avif", "path": "./assets/title/titlehaikei.avif", "bytes": ...},
+                                  {"format": "webp", ...},
+                                  {"format": "png",  ...} ], ... } }
+  ゲーム側はブラウザが対応している最初の形式を読む（最後は必ず png）
+- フォルダごとの PNG → 最良形式の削減量をレポート
+- ビルドキャッシュで、PNG と設定が前回と同じ画像はエンコードしない
+
+使い方:
+    python export_web_images.py
+    python export_web_images.py --gate 40 -j 4
+    python export_web_images.py --formats webp      # AVIF なし
+    python export_web_images.py --dry-run           # 書き出さずにサイズだけ調べる
+"""
+
+import argparse
+import io
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, features
+
+from build_cache import BuildCache, make_key
+from pack_atlas import GAME_JS, PROJECT_ROOT, character_frames, image_frames
+from parallel import map_ordered
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+MANIFEST_FILE = PROJECT_ROOT / "assets" / "image_formats.json"
+
+# エンコード方法を変えたら上げる（キャッシュを無効化するため）
+EXPORT_VERSION = 2
+CACHE_NAME = "web_images"
+
+FORMATS = ["avif", "webp"]
+PSNR_GATE_DB = 38.0      # 非可逆の最低画質（元の PNG との 2x2 平均 PSNR）
+QUALITY_MIN = 40
+QUALITY_MAX = 95
+QUALITY_STEP = 5         # 本番の設定でゲートを割ったときに上げる幅
+WEBP_METHOD = 6          # 0（速い）〜 6（小さい）
+WEBP_SEARCH_METHOD = 4
+# 可逆 WebP の圧縮の努力（quality=100, method=6 は 512px のスプライト1枚に 7 秒以上かかるのに 7% しか縮まない）
+WEBP_LOSSLESS_QUALITY = 80
+WEBP_LOSSLESS_METHOD = 4
+AVIF_SPEED = 6           # 0（小さい）〜 10（速い）
+AVIF_SEARCH_SPEED = 9
+
+
+# ========================================
+# game.js からテクスチャ一覧を作る
+# ========================================
+
+def paw_frames(source):
+    """PAW_COLORS の imageKey → 肉球画像（preload と同じ規則）"""
+    block = source[source.index("const PAW_COLORS = {"):]
+    block = block[:block.index("\n};")]
+    frames = {}
+    for key, body in re.findall(r"^\s*(\w+):\s*\{([^}]*)\}", block, re.MULTILINE):
+        image_key = re.search(r"imageKey:\s*'([^']+)'", body)
+        suffix = re.search(r"suffix:\s*'([^']+)'", body)
+        if image_key and suffix:
+            frames[image_key.group(1)] = (
+                PROJECT_ROOT / "assets" / "nikukyu" / "individual" / f"paw_{key}_{suffix.group(1)}.png"
+            )
+    return frames
+
+
+def collect_textures(game_js=GAME_JS):
+    """テクスチャキー → PNG のパス（preload の定義順）"""
+    source = Path(game_js).read_text(encoding="utf-8")
+    textures = {}
+    textures.update(character_frames(source))
+    textures.update(image_frames(source, "./assets/"))
+    textures.update(paw_frames(source))
+    return textures
+
+
+# ========================================
+# エンコード
+# ========================================
+
+def has_alpha(img):
+    """1ピクセルでも透明（アルファ < 255）があるか"""
+    if img.mode not in ("RGBA", "LA", "PA") and "transparency" not in img.info:
+        return False
+    return np.asarray(img.convert("RGBA"))[..., 3].min() < 255
+
+
+def box2(pixels):
+    """2x2 平均で半分の大きさにする（float32 の H x W x C）"""
+    h, w = pixels.shape[0] // 2 * 2, pixels.shape[1] // 2 * 2
+    p = pixels[:h, :w]
+    return (p[0::2, 0::2] + p[1::2, 0::2] + p[0::2, 1::2] + p[1::2, 1::2]) * 0.25
+
+
+def psnr(reference, data):
+    """
+    2x2 平均した RGB の PSNR（dB）。完全一致なら inf
+    reference は box2 済みの配列
+    """
+    decoded = box2(np.asarray(Image.open(io.BytesIO(data)).convert("RGB"), dtype=np.float32))
+    mse = np.mean((decoded - reference) ** 2)
+    return float("inf") if mse == 0 else float(10 * np.log10(255.0 ** 2 / mse))
+
+
+def encode(img, fmt, quality=None, fast=False):
+    """quality=None なら可逆。fast=True は quality 探索用の速い設定"""
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        if quality is None:
+            img.save(buffer, "WEBP", lossless=True, quality=WEBP_LOSSLESS_QUALITY, method=WEBP_LOSSLESS_METHOD)
+        else:
+            img.save(buffer, "WEBP", quality=quality, method=WEBP_SEARCH_METHOD if fast else WEBP_METHOD)
+    elif fmt == "avif":
+        img.save(buffer, "AVIF", quality=quality, speed=AVIF_SEARCH_SPEED if fast else AVIF_SPEED)
+    else:
+        raise ValueError(f"未対応の形式: {fmt}")
+    return buffer.getvalue()
+
+
+def gated_encode(img, fmt, gate_db, reference):
+    """
+    ゲートを満たす一番低い quality で非可逆エンコード
+    速い設定で二分探索 → 本番の設定でエンコードして確認（割ったら QUALITY_STEP ずつ上げる）
+    戻り値: (データ, quality, PSNR)。QUALITY_MAX でも満たせなければ None
+    """
+    found = None
+    lo, hi = QUALITY_MIN, QUALITY_MAX
+    while lo <= hi:
+        quality = (lo + hi) // 2
+        if psnr(reference, encode(img, fmt, quality, fast=True)) >= gate_db:
+            found = quality
+            hi = quality - 1
+        else:
+            lo = quality + 1
+    if found is None:
+        return None
+
+    for quality in list(range(found, QUALITY_MAX, QUALITY_STEP)) + [QUALITY_MAX]:
+        data = encode(img, fmt, quality)
+        score = psnr(reference, data)
+        if score >= gate_db:
+            return data, quality, score
+    return None
+
+
+def output_path(png_path, fmt):
+    return Path(png_path).with_suffix(f".{fmt}")
+
+
+def export_file(png_path, formats, gate_db, dry_run=False):
+    """
+    1枚を書き出す（ワーカープロセスで実行）
+    戻り値: {"alpha", "png": バイト数, "outputs": {形式: {"bytes", "quality", "psnr"}}}
+    PNG より小さくならなかった形式は outputs に入れない（古いファイルは消す）
+    """
+    png_path = Path(png_path)
+    img = Image.open(png_path)
+    img.load()
+    alpha = has_alpha(img)
+    img = img.convert("RGBA" if alpha else "RGB")
+    png_bytes = png_path.stat().st_size
+
+    outputs = {}
+    for fmt in formats:
+        if alpha:
+            # 透明のある画像は可逆 WebP だけ（輪郭のにじみを出さない）
+            if fmt != "webp":
+                continue
+            data, quality, score = encode(img, fmt), None, None
+        else:
+            encoded = gated_encode(img, fmt, gate_db, box2(np.asarray(img, dtype=np.float32)))
+            if encoded is None:
+                continue
+            data, quality, score = encoded
+        if len(data) >= png_bytes:
+            continue
+        outputs[fmt] = {"bytes": len(data), "quality": quality,
+                        "psnr": None if score is None else round(score, 2)}
+        if not dry_run:
+            output_path(png_path, fmt).write_bytes(data)
+
+    if not dry_run:
+        for fmt in FORMATS:
+            stale = output_path(png_path, fmt)
+            if fmt not in outputs and stale.exists():
+                stale.unlink()
+    return {"alpha": bool(alpha), "png": png_bytes, "outputs": outputs}
+
+
+def available_formats(formats):
+    """この Pillow でエンコードできる形式だけ残す"""
+    usable = [fmt for fmt in formats if features.check(fmt)]
+    for fmt in formats:
+        if fmt not in usable:
+            print(f"⚠ この Pillow は {fmt} に対応していないのでスキップします")
+    return usable
+
+
+def is_cached(result, png_path):
+    """キャッシュの結果の出力ファイルがそのまま残っているか"""
+    return result is not None and all(
+        output_path(png_path, fmt).exists() and output_path(png_path, fmt).stat().st_size == out["bytes"]
+        for fmt, out in result["outputs"].items()
+    )
+
+
+def export_all(textures, formats=FORMATS, gate_db=PSNR_GATE_DB, jobs=None, force=False,
+               dry_run=False, cache=None):
+    """
+    テクスチャの PNG をまとめて書き出す（同じファイルを指すキーは1回だけ）
+    戻り値: {PNG のパス: 結果 or None（エラー）}
+    """
+    cache = cache or BuildCache(CACHE_NAME)
+    files = list(dict.fromkeys(p for p in textures.values() if p.exists()))
+    for key, path in textures.items():
+        if not path.exists():
+            print(f"  ⚠ {key}: {path.relative_to(PROJECT_ROOT).as_posix()} が見つかりません")
+
+    results, tasks = {}, []
+    for path in files:
+        key = make_key(EXPORT_VERSION, cache.digest(path), formats, gate_db, QUALITY_MIN, QUALITY_MAX,
+                       WEBP_METHOD, WEBP_SEARCH_METHOD, WEBP_LOSSLESS_QUALITY, WEBP_LOSSLESS_METHOD,
+                       AVIF_SPEED, AVIF_SEARCH_SPEED)
+        cached = cache.lookup(key)
+        # dry-run はサイズが分かればいいので、出力ファイルが無くてもキャッシュの結果を使う
+        if not force and (is_cached(cached, path) or (dry_run and cached is not None)):
+            results[path] = cached
+        else:
+            tasks.append((path, key))
+
+    print(f"🖼 {len(files)}枚（エンコード {len(tasks)}枚 / キャッシュ {len(files) - len(tasks)}枚）")
+    outputs = map_ordered(export_file, [(p, formats, gate_db, dry_run) for p, _ in tasks], jobs)
+    for (path, key), (result, error) in zip(tasks, outputs):
+        if error:
+            print(f"  ✗ {path.relative_to(PROJECT_ROOT).as_posix()}: {error}")
+            results[path] = None
+            continue
+        results[path] = result
+        # dry-run の結果も保存（次の dry-run で使う。出力ファイルが無いので本番では使われない）
+        cache.store(key, result)
+    cache.save()
+    return results
+
+
+# ========================================
+# マニフェスト・レポート
+# ========================================
+
+def web_path(path):
+    return f"./{path.relative_to(PROJECT_ROOT).as_posix()}"
+
+
+def texture_sources(png_path, result):
+    """使える形式を小さい順に（png は必ず最後）"""
+    sources = [
+        {"format": fmt, "path": web_path(output_path(png_path, fmt)), "bytes": out["bytes"]}
+        for fmt, out in sorted(result["outputs"].items(), key=lambda item: item[1]["bytes"])
+    ] if result else []
+    png_bytes = result["png"] if result else png_path.stat().st_size
+    sources.append({"format": "png", "path": web_path(png_path), "bytes": png_bytes})
+    return sources
+
+
+def write_manifest(textures, results, manifest_path=MANIFEST_FILE):
+    manifest = {
+        "formats": FORMATS + ["png"],
+        "textures": {
+            key: texture_sources(path, results.get(path))
+            for key, path in textures.items() if path.exists()
+        },
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+
+def print_report(results):
+    """フォルダごとの PNG → 最良形式のバイト数"""
+    folders = {}
+    for path, result in results.items():
+        if result is None:
+            continue
+        best = min([result["png"]] + [out["bytes"] for out in result["outputs"].values()])
+        folder = folders.setdefault(path.parent.relative_to(PROJECT_ROOT).as_posix(), [0, 0, 0, False])
+        folder[0] += 1
+        folder[1] += result["png"]
+        folder[2] += best
+        folder[3] |= not result["alpha"]
+
+    print(f"\n  {'フォルダ':<36} {'枚数':>4} {'PNG':>10} {'最良':>10} {'削減':>6}")
+    total_png = total_best = 0
+    for name, (count, png, best, lossy) in sorted(folders.items()):
+        saved = 1 - best / png if png else 0
+        mark = "非可逆" if lossy else "可逆"
+        print(f"  {name:<36} {count:>4} {png / 1024:>8.1f}KB {best / 1024:>8.1f}KB {saved * 100:>5.0f}%  {mark}")
+        total_png += png
+        total_best += best
+    if total_png:
+        print(f"\n💾 {total_png / 1024 / 1024:.2f}MB → {total_best / 1024 / 1024:.2f}MB "
+              f"(-{(total_png - total_best) / 1024 / 1024:.2f}MB, PNG はフォールバックとして残す)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebP / AVIF 書き出し（PNG フォールバック付き）")
+    parser.add_argument("--formats", nargs="+", choices=FORMATS, default=FORMATS, help="書き出す形式")
+    parser.add_argument("--gate", type=float, default=PSNR_GATE_DB, help="非可逆の最低 PSNR（dB）")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="ワーカー数")
+    parser.add_argument("--force", action="store_true", help="キャッシュを無視して全部エンコード")
+    parser.add_argument("--dry-run", action="store_true", help="書き出さずにサイズだけ調べる")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    formats = available_formats(args.formats)
+    textures = collect_textures()
+    results = export_all(textures, formats, args.gate, args.jobs, args.force, args.dry_run)
+    print_report(results)
+    if not args.dry_run:
+        write_manifest(textures, results)
+        print(f"📋 {MANIFEST_FILE.relative_to(PROJECT_ROOT).as_posix()}（{len(textures)}キー）")
+    print(f"\n⏱ {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
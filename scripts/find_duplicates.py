@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+画像アセットの重複・ほぼ重複（見た目が同じ）検出ツール
+- assets/ 以下の PNG ごとに知覚ハッシュ（192bit）を計算
+  - 輝度（アルファを掛けたもの）の pHash 64bit（32x32 の DCT の低周波 8x8 を中央値で2値化）
+  - 輝度の dHash 64bit（9x8 の横方向の差分）
+  - アルファの dHash 64bit（形＝シルエットの違いを拾う）
+- 輝度だけだと色違い（肉球の色バリエーションなど）が全部同じに見えるので、
+  2x2 のマスごとの不透明部分の平均色（COLOR_GRID）も持ち、差が COLOR_TOLERANCE を超える組は別物とする
+- ハッシュを BK 木に入れて、ハミング距離が --radius 以内の組を探し、つながった組をクラスタにする
+  （IMAGE_3_DOGS のような「画像2と同じデザイン」や、_alt の差分をまとめて見つける）
+- game.js で preload しているテクスチャには印を付ける（同じ見た目を2回読み込んでいないか）
+  無駄な preload として数えるのは、中身が同じか距離 WASTE_RADIUS 以内のものだけ
+  （--radius の距離では同じ犬の表情違いもまとまるので、それは数えない）
+- ハッシュはビルドキャッシュに内容ハッシュで保存するので、2回目以降はデコードしない
+- 対象外: "_" で始まるフォルダ（_backup など）と、密度バリアントの "@" フォルダ
+
+使い方:
+    python find_duplicates.py
+    python find_duplicates.py --radius 20 -j 4
+    python find_duplicates.py ../assets/characters --json dup.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from build_cache import BuildCache, make_key
+from export_web_images import collect_textures
+from optimize_png import collect_pngs
+from pack_atlas import PROJECT_ROOT
+from parallel import map_ordered
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+DEFAULT_TARGET = PROJECT_ROOT / "assets"
+
+# ハッシュの計算方法を変えたら上げる（キャッシュを無効化するため）
+HASH_VERSION = 2
+CACHE_NAME = "phash"
+
+DEFAULT_RADIUS = 8    # 192bit 中のハミング距離（これ以内を「ほぼ同じ」とみなす）
+WASTE_RADIUS = 2      # preload の無駄とみなす距離（表情違いは 3 以上）
+DCT_SIZE = 32
+HASH_SIZE = 8
+COLOR_GRID = 2        # 不透明部分の平均色を取るマス（COLOR_GRID x COLOR_GRID）
+COLOR_TOLERANCE = 24  # 平均色の差（0〜255）がこれを超えたら色違いとして別物
+
+
+# ========================================
+# 知覚ハッシュ
+# ========================================
+
+def _dct_matrix(n):
+    """DCT-II の基底行列（n x n）"""
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * x + 1) * k / (2 * n))
+
+
+DCT = _dct_matrix(DCT_SIZE)
+
+
+def _bits_to_int(bits):
+    value = 0
+    for bit in bits.ravel():
+        value = (value << 1) | int(bit)
+    return value
+
+
+def phash(gray):
+    """32x32 の輝度（float）→ 64bit"""
+    coeffs = DCT @ gray @ DCT.T
+    low = coeffs[:HASH_SIZE, :HASH_SIZE].ravel()
+    # 直流成分（明るさの平均）は中央値の計算から外す
+    return _bits_to_int(low > np.median(low[1:]))
+
+
+def dhash(channel):
+    """(HASH_SIZE) x (HASH_SIZE + 1) の配列 → 64bit（横方向の明暗の差）"""
+    return _bits_to_int(channel[:, 1:] > channel[:, :-1])
+
+
+def thumbnails(img):
+    """
+    (輝度 32x32, 輝度 9x8, アルファ 9x8, 平均色 COLOR_GRID x COLOR_GRID x RGB)
+    輝度は透明部分が黒になるようアルファを掛ける
+    平均色はマスの中の不透明部分だけの色（余白の広さで薄まらないように、アルファで割り戻す）
+    """
+    rgba = img.convert("RGBA")
+    alpha = rgba.getchannel("A")
+    black = Image.new("RGB", rgba.size, (0, 0, 0))
+    rgb = Image.composite(rgba.convert("RGB"), black, alpha)
+    gray = rgb.convert("L")
+
+    def small(channel, size):
+        return np.asarray(channel.resize(size, Image.Resampling.BOX), dtype=np.float32)
+
+    coverage = small(alpha, (COLOR_GRID, COLOR_GRID))[..., None]
+    color = small(rgb, (COLOR_GRID, COLOR_GRID)) * 255 / np.maximum(coverage, 1)
+    return (small(gray, (DCT_SIZE, DCT_SIZE)),
+            small(gray, (HASH_SIZE + 1, HASH_SIZE)),
+            small(alpha, (HASH_SIZE + 1, HASH_SIZE)),
+            np.minimum(color, 255))
+
+
+def image_hash(path):
+    """1枚の 192bit ハッシュと平均色（ワーカープロセスで実行、ハッシュは16進文字列で返す）"""
+    with Image.open(path) as img:
+        gray32, gray9, alpha9, color = thumbnails(img)
+        size = img.size
+    value = (phash(gray32) << 128) | (dhash(gray9) << 64) | dhash(alpha9)
+    return {"hash": f"{value:048x}", "color": np.round(color).astype(int).ravel().tolist(),
+            "size": list(size)}
+
+
+def same_color(a, b, tolerance=COLOR_TOLERANCE):
+    return max(abs(x - y) for x, y in zip(a, b)) <= tolerance
+
+
+def hamming(a, b):
+    return (a ^ b).bit_count()
+
+
+# ========================================
+# BK 木
+# ========================================
+
+class BKTree:
+    """
+    ハミング距離の BK 木
+    ノード = [ハッシュ, 項目, {距離: 子ノード}]
+    三角不等式で |d - 距離| > radius の枝を丸ごと飛ばす
+    """
+
+    def __init__(self):
+        self.root = None
+        self.size = 0
+
+    def add(self, value, item):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, item, {}]
+            return
+        node = self.root
+        while True:
+            d = hamming(value, node[0])
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, item, {}]
+                return
+            node = child
+
+    def query(self, value, radius):
+        """距離 radius 以内の [(距離, 項目)] を返す"""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            d = hamming(value, node[0])
+            if d <= radius:
+                found.append((d, node[1]))
+            for child_d, child in node[2].items():
+                if d - radius <= child_d <= d + radius:
+                    stack.append(child)
+        return found
+
+
+# ========================================
+# クラスタ
+# ========================================
+
+def hash_files(files, jobs=None, force=False, cache=None):
+    """
+    ファイルのハッシュ（キャッシュにあるものはデコードしない）
+    戻り値: [(結果 or None, エラー or None)]（files と同じ順）、キャッシュから取った枚数
+    """
+    cache = cache or BuildCache(CACHE_NAME)
+    keys = [make_key("phash", HASH_VERSION, DCT_SIZE, HASH_SIZE, COLOR_GRID, cache.digest(f)) for f in files]
+    results = [None if force else cache.lookup(k) for k in keys]
+    todo = [i for i, r in enumerate(results) if r is None]
+
+    outputs = [(r, None) for r in results]
+    for i, output in zip(todo, map_ordered(image_hash, [(files[i],) for i in todo], jobs)):
+        outputs[i] = output
+        if output[0] is not None:
+            cache.store(keys[i], output[0])
+    cache.prune_results(keys)
+    cache.save()
+    return outputs, len(files) - len(todo)
+
+
+def find_clusters(hashes, radius=DEFAULT_RADIUS, colors=None, tolerance=COLOR_TOLERANCE):
+    """
+    hashes: [(項目, ハッシュの int)]、colors: hashes と同じ順の平均色（省略時は色を見ない）
+    距離 radius 以内（かつ平均色が近い）でつながる項目をまとめる（Union-Find）
+    戻り値: [[(項目, 代表との距離), ...], ...]（2件以上のクラスタだけ、大きい順）
+    """
+    tree = BKTree()
+    for index, (_, value) in enumerate(hashes):
+        tree.add(value, index)
+
+    parent = list(range(len(hashes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for index, (_, value) in enumerate(hashes):
+        for _, other in tree.query(value, radius):
+            if other == index:
+                continue
+            if colors is not None and not same_color(colors[index], colors[other], tolerance):
+                continue
+            parent[find(other)] = find(index)
+
+    groups = {}
+    for index in range(len(hashes)):
+        groups.setdefault(find(index), []).append(index)
+
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        members.sort()
+        head = hashes[members[0]][1]
+        clusters.append([(hashes[i][0], hamming(head, hashes[i][1])) for i in members])
+    clusters.sort(key=lambda c: (-len(c), c[0][0]))
+    return clusters
+
+
+def collect_images(targets):
+    """PNG を集める（"_" フォルダに加えて密度バリアントの "@" フォルダも除外）"""
+    files = []
+    for path in collect_pngs(targets):
+        if not any(part.startswith("@") for part in path.relative_to(PROJECT_ROOT).parts):
+            files.append(path)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="画像アセットの重複・ほぼ重複検出")
+    parser.add_argument("targets", nargs="*", type=Path, default=[DEFAULT_TARGET],
+                        help="対象のファイル/フォルダ（省略時は assets/）")
+    parser.add_argument("--radius", type=int, default=DEFAULT_RADIUS,
+                        help="ほぼ同じとみなすハミング距離（192bit 中）")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="ワーカー数")
+    parser.add_argument("--force", action="store_true", help="キャッシュを無視して全部ハッシュする")
+    parser.add_argument("--json", type=Path, help="クラスタを JSON で保存")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    files = collect_images(args.targets)
+    cache = BuildCache(CACHE_NAME)
+    outputs, cached = hash_files(files, args.jobs, args.force, cache)
+
+    hashes, colors = [], []
+    for path, (result, error) in zip(files, outputs):
+        if error:
+            print(f"  ✗ {path.relative_to(PROJECT_ROOT).as_posix()}: {error}")
+            continue
+        hashes.append((path, int(result["hash"], 16)))
+        colors.append(result["color"])
+    clusters = find_clusters(hashes, args.radius, colors)
+    elapsed = time.perf_counter() - start
+
+    # game.js で preload しているテクスチャ（パス → キー）
+    preloaded = {}
+    for key, path in collect_textures().items():
+        preloaded.setdefault(path.resolve(), []).append(key)
+
+    print(f"🔍 {len(hashes)}枚（キャッシュ {cached}枚）/ 半径 {args.radius}bit / {elapsed:.2f}s\n")
+    values = dict(hashes)
+    wasted_preloads = 0
+    for number, cluster in enumerate(clusters, 1):
+        print(f"[{number}] {len(cluster)}枚")
+        loaded = []  # preload しているメンバーの (ハッシュ, 内容ハッシュ)
+        # 中身まで同じファイルの判定（内容ハッシュはキャッシュのメモから）
+        head_sha = cache.digest(cluster[0][0])
+        for index, (path, distance) in enumerate(cluster):
+            keys = preloaded.get(path.resolve(), [])
+            sha = cache.digest(path)
+            if keys:
+                # 先に preload しているものと同じ絵なら無駄（表情違いなどは数えない）
+                value = values[path]
+                if any(sha == other_sha or hamming(value, other) <= WASTE_RADIUS for other, other_sha in loaded):
+                    wasted_preloads += 1
+                loaded.append((value, sha))
+            if index == 0:
+                mark = "基準  "
+            elif sha == head_sha:
+                mark = "同一  "
+            else:
+                mark = f"d={distance:3d}"
+            note = f"  ← preload: {', '.join(keys)}" if keys else ""
+            print(f"    {mark}  {path.relative_to(PROJECT_ROOT).as_posix()}{note}")
+
+    print(f"\n📊 クラスタ {len(clusters)}件 / {sum(len(c) for c in clusters)}枚")
+    if wasted_preloads:
+        print(f"⚠ 同じ絵のテクスチャの preload: {wasted_preloads}枚（中身が同じか距離 {WASTE_RADIUS} 以内、"
+              f"1枚にまとめられる）")
+
+    if args.json:
+        report = {
+            "radius": args.radius,
+            "images": len(hashes),
+            "clusters": [
+                [{"path": path.relative_to(PROJECT_ROOT).as_posix(), "distance": distance,
+                  "preload": preloaded.get(path.resolve(), [])} for path, distance in cluster]
+                for cluster in clusters
+            ],
+        }
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"💾 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,8 @@
 from PIL import Image
 from pathlib import Path
 
+from sprite_keying import key_image
+
 BASE_DIR = Path(r"C:\Users\janne\Documents\APP-KEROFEN\inusanpo")
 SOURCE_DIR = BASE_DIR / "assets" / "gazou" / "wanko"
 OUTPUT_DIR = BASE_DIR / "assets" / "characters" / "dog_07_dalmatian"
@@ -15,18 +17,7 @@ EXPRESSIONS = ["neutral", "happy", "sad", "excited"]
 
 def remove_black_background(img, threshold=30):
     """黒背景を透過に変換"""
-    img = img.convert("RGBA")
-    datas = list(img.getdata())
-    new_data = []
-    
-    for item in datas:
-        if item[0] < threshold and item[1] < threshold and item[2] < threshold:
-            new_data.append((0, 0, 0, 0))
-        else:
-            new_data.append(item)
-    
-    img.putdata(new_data)
-    return img
+    return key_image(img, mode="hard", key_color=(0, 0, 0), threshold=threshold)
 
 def crop_to_content(img, padding=10):
     """透過部分を除いた実際のコンテンツ領域にクロップ"""
@@ -46,6 +37,9 @@ def main():
     source_path = SOURCE_DIR / "2-2.png"
     img = Image.open(source_path)
     
+    # シート全体を1回だけキーイングしてから切り抜く
+    img = remove_black_background(img)
+    
     width, height = img.size
     cell_width = width // 4
     cell_height = height // 4
@@ -61,7 +55,6 @@ def main():
         bottom = top + cell_height - 30
         
         cell = img.crop((left, top, right, bottom))
-        cell = remove_black_background(cell)
         cell = crop_to_content(cell, padding=10)
         
         output_path = OUTPUT_DIR / f"{expression}.png"
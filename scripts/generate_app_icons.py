@@ -1,14 +1,31 @@
 #!/usr/bin/env python3
 """
 アプリアイコン生成スクリプト
-既存の1024x1024アイコンからiOS/Android向け全サイズを生成する
+既存の1024x1024アイコンからiOS/Android/Web向け全サイズを生成する
+
+- 元画像は1回だけデコードし、必要なサイズごとに1回だけ縮小する（縮小ピラミッド）
+  各サイズは「すでに作った一番近い大きいサイズ」から縮小する（毎回1024pxから縮小しない）
+- Android の前景（ic_launcher_foreground）もピラミッドの画像を透明キャンバスに貼るだけ
+- PNG のエンコードはスレッドで並列実行
+- 内容が同じ出力（ic_launcher / ic_launcher_round、512px のストア用と PWA 用など）は
+  1回だけエンコードして1か所に書き、残りはコピー
+- 既存ファイルと同じ内容なら書き換えない
+
+使い方:
+    python scripts/generate_app_icons.py
+    python scripts/generate_app_icons.py -j 4
 """
 
 import os
+import sys
 import json
 import shutil
+import time
+from io import BytesIO
 from PIL import Image
 
+from parallel import map_ordered, parse_jobs
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SOURCE_ICON = os.path.join(
     BASE_DIR, "ios", "App", "App", "Assets.xcassets",
@@ -54,92 +71,159 @@ ANDROID_SIZES = {
     "mipmap-xxxhdpi": 192,
 }
 
+ANDROID_LAUNCHER_NAMES = ["ic_launcher.png", "ic_launcher_round.png"]
 ANDROID_PLAYSTORE_SIZE = 512
 
+# --- Web/PWA ---
+WEB_OUTPUT_DIR = os.path.join(BASE_DIR, "public")
 
-def resize_icon(source_img, size, output_path):
-    """高品質リサイズでアイコンを生成"""
-    resized = source_img.resize((size, size), Image.LANCZOS)
-    resized.save(output_path, "PNG", optimize=True)
-    print(f"  Created: {os.path.basename(output_path)} ({size}x{size})")
-
-
-def generate_ios_icons(source_img):
-    """iOS用アイコンを生成"""
-    print("\n=== iOS Icons ===")
-    os.makedirs(IOS_OUTPUT_DIR, exist_ok=True)
+WEB_SIZES = {
+    "favicon.png": 32,
+    "icon-192.png": 192,
+    "icon-512.png": 512,
+}
 
-    for filename, size in IOS_SIZES.items():
-        output_path = os.path.join(IOS_OUTPUT_DIR, filename)
-        resize_icon(source_img, size, output_path)
 
-    contents_path = os.path.join(IOS_OUTPUT_DIR, "Contents.json")
-    with open(contents_path, "w") as f:
-        json.dump(IOS_CONTENTS_JSON, f, indent=2)
-    print(f"  Updated: Contents.json")
+def foreground_size(size):
+    """アダプティブアイコンの前景キャンバスの大きさ（108dp 中の 48dp にアイコンを置く）"""
+    return int(size * 108 / 48)
 
 
-def generate_android_icons(source_img):
-    """Android用アイコンを生成"""
-    print("\n=== Android Icons ===")
+def plan_outputs():
+    """
+    出力の一覧を [(出力パス, 種類, サイズ)] で返す
+    種類: "icon"（そのまま） / "foreground"（透明キャンバスの中央に配置）
+    """
+    outputs = []
+    for filename, size in IOS_SIZES.items():
+        outputs.append((os.path.join(IOS_OUTPUT_DIR, filename), "icon", size))
 
     for folder, size in ANDROID_SIZES.items():
         folder_path = os.path.join(ANDROID_RES_DIR, folder)
-        os.makedirs(folder_path, exist_ok=True)
-
-        for name in ["ic_launcher.png", "ic_launcher_round.png"]:
-            output_path = os.path.join(folder_path, name)
-            resize_icon(source_img, size, output_path)
-
-        fg_path = os.path.join(folder_path, "ic_launcher_foreground.png")
-        fg_size = int(size * 108 / 48)
+        for name in ANDROID_LAUNCHER_NAMES:
+            outputs.append((os.path.join(folder_path, name), "icon", size))
+        outputs.append((os.path.join(folder_path, "ic_launcher_foreground.png"), "foreground", size))
+
+    playstore_dir = os.path.normpath(os.path.join(ANDROID_RES_DIR, "..", "playstore"))
+    outputs.append((os.path.join(playstore_dir, "ic_launcher-playstore.png"), "icon", ANDROID_PLAYSTORE_SIZE))
+
+    for filename, size in WEB_SIZES.items():
+        outputs.append((os.path.join(WEB_OUTPUT_DIR, filename), "icon", size))
+    return outputs
+
+
+def build_pyramid(source_img, sizes):
+    """
+    必要なサイズの縮小画像を {サイズ: 画像} で返す
+    大きい順に作り、それぞれ一番近い大きいレベルから LANCZOS で縮小する
+    """
+    pyramid = {source_img.size[0]: source_img}
+    for size in sorted(set(sizes), reverse=True):
+        if size in pyramid:
+            continue
+        parent = min(s for s in pyramid if s > size)
+        pyramid[size] = pyramid[parent].resize((size, size), Image.LANCZOS)
+    return pyramid
+
+
+def render_png(image, kind, size):
+    """1つの出力を PNG のバイト列にする（スレッドで実行）"""
+    if kind == "foreground":
+        fg_size = foreground_size(size)
         canvas = Image.new("RGBA", (fg_size, fg_size), (0, 0, 0, 0))
-        dog_resized = source_img.resize((size, size), Image.LANCZOS)
         offset = (fg_size - size) // 2
-        canvas.paste(dog_resized, (offset, offset))
-        canvas.save(fg_path, "PNG", optimize=True)
-        print(f"  Created: {folder}/ic_launcher_foreground.png ({fg_size}x{fg_size})")
-
-    playstore_dir = os.path.join(ANDROID_RES_DIR, "..", "playstore")
-    os.makedirs(playstore_dir, exist_ok=True)
-    playstore_path = os.path.join(playstore_dir, "ic_launcher-playstore.png")
-    resize_icon(source_img, ANDROID_PLAYSTORE_SIZE, playstore_path)
-
-
-def generate_web_icons(source_img):
-    """Web/PWA用アイコンも生成"""
-    print("\n=== Web/PWA Icons ===")
-    public_dir = os.path.join(BASE_DIR, "public")
-    os.makedirs(public_dir, exist_ok=True)
-
-    web_sizes = {
-        "favicon.png": 32,
-        "icon-192.png": 192,
-        "icon-512.png": 512,
-    }
-    for filename, size in web_sizes.items():
-        output_path = os.path.join(public_dir, filename)
-        resize_icon(source_img, size, output_path)
+        canvas.paste(image, (offset, offset))
+        image = canvas
+    buffer = BytesIO()
+    image.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def write_if_changed(path, data):
+    """内容が同じなら書かない。戻り値: 書いたか"""
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return True
+
+
+def files_equal(path_a, path_b):
+    if os.path.getsize(path_a) != os.path.getsize(path_b):
+        return False
+    with open(path_a, "rb") as a, open(path_b, "rb") as b:
+        return a.read() == b.read()
+
+
+def generate_icons(source_img, jobs=None):
+    """全出力を生成。戻り値: {出力パス: 状態}（"created" / "copied" / "unchanged"）"""
+    outputs = plan_outputs()
+    pyramid = build_pyramid(source_img, [size for _, _, size in outputs])
+    print(f"Pyramid: {' → '.join(str(s) for s in sorted(pyramid, reverse=True))}")
+
+    # 1. (種類, サイズ) ごとに1回だけエンコード
+    renders = list(dict.fromkeys((kind, size) for _, kind, size in outputs))
+    encoded = map_ordered(render_png, [(pyramid[size], kind, size) for kind, size in renders],
+                          jobs, executor="thread")
+    for (kind, size), (_, error) in zip(renders, encoded):
+        if error:
+            raise RuntimeError(f"{kind} {size}px: {error}")
+
+    # 2. 同じバイト列の出力をまとめ、1か所に書いて残りはコピー
+    groups = {}
+    data_by_render = {key: data for key, (data, _) in zip(renders, encoded)}
+    for path, kind, size in outputs:
+        groups.setdefault(data_by_render[(kind, size)], []).append(path)
+
+    status = {}
+    for data, paths in groups.items():
+        first, rest = paths[0], paths[1:]
+        status[first] = "created" if write_if_changed(first, data) else "unchanged"
+        for path in rest:
+            if os.path.exists(path) and files_equal(first, path):
+                status[path] = "unchanged"
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(first, path)
+            status[path] = "copied"
+
+    for path, kind, size in outputs:
+        shown = foreground_size(size) if kind == "foreground" else size
+        print(f"  {status[path]:<9} {os.path.relpath(path, BASE_DIR)} ({shown}x{shown})")
+    print(f"  Encoded: {len(renders)} / Files: {len(outputs)} / Distinct: {len(groups)}")
+    return status
+
+
+def write_ios_contents():
+    contents_path = os.path.join(IOS_OUTPUT_DIR, "Contents.json")
+    os.makedirs(IOS_OUTPUT_DIR, exist_ok=True)
+    with open(contents_path, "w") as f:
+        json.dump(IOS_CONTENTS_JSON, f, indent=2)
+    print(f"  Updated: Contents.json")
 
 
-def main():
+def main(jobs=None):
     if not os.path.exists(SOURCE_ICON):
         print(f"Error: Source icon not found: {SOURCE_ICON}")
         return
 
+    start = time.perf_counter()
     print(f"Source: {SOURCE_ICON}")
     source_img = Image.open(SOURCE_ICON).convert("RGBA")
     print(f"Size: {source_img.size[0]}x{source_img.size[1]}")
 
-    generate_ios_icons(source_img)
-    generate_android_icons(source_img)
-    generate_web_icons(source_img)
+    print("\n=== Icons (iOS / Android / Web) ===")
+    generate_icons(source_img, jobs)
+    write_ios_contents()
 
-    print("\n=== Done! ===")
+    print(f"\n=== Done! ({time.perf_counter() - start:.2f}s) ===")
     print(f"iOS icons:     {IOS_OUTPUT_DIR}")
     print(f"Android icons: {ANDROID_RES_DIR}")
-    print(f"Web icons:     {os.path.join(BASE_DIR, 'public')}")
+    print(f"Web icons:     {WEB_OUTPUT_DIR}")
 
 
 if __name__ == "__main__":
-    main()
+    main(jobs=parse_jobs(sys.argv))
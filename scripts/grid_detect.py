@@ -0,0 +1,334 @@
+# -*- coding: utf-8 -*-
+"""
+スプライトシートのグリッド（セルの境目）の自動検出
+- 切り抜きは全部「幅 // 4」の固定グリッドで、ずれは slice_dogs.ADJUSTMENTS の手調整
+  （トイプードル 16px、チワワ下 32px など）や fix_dalmatian.py の「下を 30px カット」で補っている
+- シートの不透明マスクから積分画像（summed-area table）を1回だけ作り、
+  そこから行・列の投影プロファイル（1行/1列あたりの不透明画素数）を全部差分で取り出す
+  1. 列の境目: シート全体の列プロファイルで、固定グリッドの線の前後 SEARCH_RATIO の範囲にある
+     一番「空いている」（画素数が最小の）区間の真ん中
+  2. 行の境目: 列の帯ごとの行プロファイルで同じように探す
+     （チワワの耳のように、帯によって境目の高さが違うため）
+  → セルの枠 = 境目と境目の間（隣のスプライトが入らない一番大きい枠）
+- 最小でも不透明画素が残る境目（スプライト同士が重なっていて直線では分けられない）は ink として報告
+- GUTTER_NOISE 画素以下の列/行は空とみなす（境目に落ちた数画素のゴミで外れないように）
+- 空いている区間が探索範囲の外まで続くときは、その真ん中で切る（前後1セル分まで）
+  それでも前の境目が次の探索範囲を越えたとき（search を大きくした場合など）は、
+  残りの帯を等分する（split として報告）
+- アルファの無いシートは四隅の色を背景とみなしてマスクを作る
+- 切り抜きに使うとき: sprite_slicer.sheet(..., grid="detect") または sprite_slicer.py --detect-grid
+  （検出した枠を使うので、固定グリッド用の trim は使わない。inset はそのまま）
+
+使い方:
+    python grid_detect.py --only dogs           # 検出結果と固定グリッドの比較
+    python grid_detect.py --all --json grid.json
+    python grid_detect.py ../assets/kisekae/isyou/isyou.png --grid 4 4
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+ALPHA_THRESHOLD = 16  # これより大きいアルファを不透明とみなす
+BG_TOLERANCE = 24     # アルファが無いとき、背景色との差がこれを超えたら前景
+SEARCH_RATIO = 0.25   # 固定グリッドの線からセル幅のこの割合までを探す
+GUTTER_NOISE = 3      # 1列/1行あたりこの画素数以下は空とみなす
+# 検出のアルゴリズムを変えたら上げる（sprite_slicer.py のキャッシュを無効化するため）
+GRID_DETECT_VERSION = 2
+
+
+def cache_params():
+    """検出結果を決めるパラメータ（キャッシュキー用）"""
+    return [GRID_DETECT_VERSION, ALPHA_THRESHOLD, BG_TOLERANCE, SEARCH_RATIO, GUTTER_NOISE]
+
+
+# ========================================
+# マスク・積分画像
+# ========================================
+
+def foreground_mask(img):
+    """不透明（前景）の bool 配列 (高さ, 幅)"""
+    if img.mode == "P" and "transparency" in img.info:
+        img = img.convert("RGBA")
+    if "A" in img.getbands():
+        return np.asarray(img.getchannel("A")) > ALPHA_THRESHOLD
+
+    rgb = np.asarray(img.convert("RGB"), dtype=np.int16)
+    corners = np.stack([rgb[0, 0], rgb[0, -1], rgb[-1, 0], rgb[-1, -1]])
+    background = np.median(corners, axis=0)
+    return np.abs(rgb - background).max(axis=2) > BG_TOLERANCE
+
+
+def summed_area(mask):
+    """積分画像（上と左に0の行・列を足した (高さ+1, 幅+1)）。箱の中の画素数が4点の差で取れる"""
+    sat = np.zeros((mask.shape[0] + 1, mask.shape[1] + 1), dtype=np.int32)
+    np.cumsum(mask, axis=0, dtype=np.int32, out=sat[1:, 1:])
+    np.cumsum(sat[1:, 1:], axis=1, out=sat[1:, 1:])
+    return sat
+
+
+def box_ink(sat, box):
+    """箱 (left, top, right, bottom) の中の不透明画素数"""
+    left, top, right, bottom = box
+    if right <= left or bottom <= top:
+        return 0
+    return int(sat[bottom, right] - sat[top, right] - sat[bottom, left] + sat[top, left])
+
+
+def row_profile(sat, left, right):
+    """列 left..right の帯の行プロファイル（各行の不透明画素数）"""
+    return np.diff(sat[:, right] - sat[:, left])
+
+
+def col_profile(sat, top, bottom):
+    """行 top..bottom の帯の列プロファイル（各列の不透明画素数）"""
+    return np.diff(sat[bottom, :] - sat[top, :])
+
+
+# ========================================
+# 境目の検出
+# ========================================
+
+def find_gutters(profile, count, search=SEARCH_RATIO, noise=GUTTER_NOISE):
+    """
+    プロファイルを count 個に分ける境目を探す
+    戻り値: (線の位置 [0, ..., len]（count + 1 個）, 境目の情報 [{"at", "width", "ink", "split"}])
+      at: 切る位置（空いている区間の真ん中）、width: 空いている区間の幅、ink: その区間の最小画素数
+      split: 前の境目が探索範囲を越えていたので、残りを等分した位置
+    """
+    size = len(profile)
+    step = size / count
+    quiet = np.where(profile <= noise, 0, profile)
+    lines = [0]
+    gutters = []
+    for k in range(1, count):
+        expected = k * step
+        lo = max(lines[-1] + 1, int(round(expected - step * search)))
+        hi = min(size - 1, int(round(expected + step * search)))
+        if lo > hi:
+            # 前の境目が探索範囲を越えている → 残りの帯を残りのセル数で等分
+            base, rest = lines[-1], count - k + 1
+            for j in range(1, rest):
+                at = base + (size - base) * j // rest
+                lines.append(at)
+                gutters.append({"at": at, "width": 0, "ink": int(profile[min(at, size - 1)]), "split": True})
+            break
+        window = quiet[lo:hi + 1]
+        low = window.min()
+
+        # 最小値が続く区間（[start, end)）のうち、一番長いもの（同じなら固定グリッドの線に近いもの）
+        flags = np.concatenate(([0], (window == low).astype(np.int8), [0]))
+        edges = np.flatnonzero(np.diff(flags))
+        starts, ends = edges[0::2] + lo, edges[1::2] + lo
+        order = np.lexsort((np.abs((starts + ends) / 2 - expected), -(ends - starts)))
+        start, end = int(starts[order[0]]), int(ends[order[0]])
+
+        # 探索範囲の外まで空いていれば、空いている区間全体の真ん中で切る
+        # （ただし前後1セル分まで。未使用のセルが続く帯で線が次のセルまで飛ばないように）
+        before = np.flatnonzero(quiet[:start] != low)
+        after = np.flatnonzero(quiet[end:] != low)
+        start = max(int(before[-1]) + 1 if len(before) else 0, int(expected - step))
+        end = min(end + int(after[0]) if len(after) else size, int(round(expected + step)))
+        at = max(lines[-1] + 1, min((start + end) // 2, size - 1))
+
+        lines.append(at)
+        gutters.append({"at": at, "width": end - start, "ink": int(profile[start:end].min()), "split": False})
+    lines.append(size)
+    return lines, gutters
+
+
+def detect_grid(img, rows, cols, search=SEARCH_RATIO):
+    """
+    シートのセルの枠を検出
+    戻り値: {
+      "size": (幅, 高さ),
+      "col_lines": [x0, ..., x_cols], "col_gutters": [...],
+      "row_lines": {列: [y0, ..., y_rows]}, "row_gutters": {列: [...]},
+      "boxes": {(行, 列): (left, top, right, bottom)},   # 境目から境目まで
+      "content": {(行, 列): (left, top, right, bottom) or None},  # 枠の中の不透明部分
+      "sat": 積分画像,
+    }
+    """
+    mask = foreground_mask(img)
+    sat = summed_area(mask)
+    height, width = mask.shape
+
+    col_lines, col_gutters = find_gutters(col_profile(sat, 0, height), cols, search)
+    row_lines, row_gutters, boxes, content = {}, {}, {}, {}
+    for col in range(cols):
+        left, right = col_lines[col], col_lines[col + 1]
+        row_lines[col], row_gutters[col] = find_gutters(row_profile(sat, left, right), rows, search)
+        for row in range(rows):
+            top, bottom = row_lines[col][row], row_lines[col][row + 1]
+            box = (left, top, right, bottom)
+            boxes[(row, col)] = box
+            content[(row, col)] = content_box(sat, box)
+
+    return {
+        "size": (width, height),
+        "col_lines": col_lines, "col_gutters": col_gutters,
+        "row_lines": row_lines, "row_gutters": row_gutters,
+        "boxes": boxes, "content": content, "sat": sat,
+    }
+
+
+def content_box(sat, box):
+    """枠の中の不透明部分の外接矩形（無ければ None）"""
+    left, top, right, bottom = box
+    rows = np.flatnonzero(np.diff(sat[top:bottom + 1, right] - sat[top:bottom + 1, left]))
+    cols = np.flatnonzero(np.diff(sat[bottom, left:right + 1] - sat[top, left:right + 1]))
+    if len(rows) == 0 or len(cols) == 0:
+        return None
+    return (left + int(cols[0]), top + int(rows[0]), left + int(cols[-1]) + 1, top + int(rows[-1]) + 1)
+
+
+def detect_boxes(img, rows, cols):
+    """切り抜き用: {(行, 列): 枠}"""
+    return detect_grid(img, rows, cols)["boxes"]
+
+
+# ========================================
+# 固定グリッドとの比較
+# ========================================
+
+def compare_cell(sat, fixed, detected, base=None):
+    """
+    今の切り抜き枠（固定グリッド + trim）と検出した枠の比較
+    intrusion: 今の枠に入っている、このセル以外の不透明画素（隣の混入）
+    clipped:   検出した枠にあるのに今の枠から外れる不透明画素（切れてしまう分）
+    trim:      検出した枠を固定グリッドの枠（base、省略時は fixed）に対する trim で表したもの
+               （sprite_slicer.cell の trim と同じ向き）
+    """
+    base = base or fixed
+    overlap = (max(fixed[0], detected[0]), max(fixed[1], detected[1]),
+               min(fixed[2], detected[2]), min(fixed[3], detected[3]))
+    shared = box_ink(sat, overlap)
+    return {
+        "intrusion": box_ink(sat, fixed) - shared,
+        "clipped": box_ink(sat, detected) - shared,
+        "trim": {
+            "left": detected[0] - base[0],
+            "top": detected[1] - base[1],
+            "right": base[2] - detected[2],
+            "bottom": base[3] - detected[3],
+        },
+    }
+
+
+def format_trim(trim):
+    if not trim or not any(trim.values()):
+        return "-"
+    return " ".join(f"{side[0].upper()}{trim.get(side, 0):+d}"
+                    for side in ("left", "top", "right", "bottom") if trim.get(side, 0))
+
+
+def report_sheet(sheet_spec, img):
+    """
+    1シートの検出結果と固定グリッドの比較を表示
+    戻り値: JSON 用の辞書
+    """
+    import sprite_slicer
+
+    rows, cols = sheet_spec["rows"], sheet_spec["cols"]
+    grid = detect_grid(img, rows, cols)
+    sat = grid["sat"]
+    width, height = grid["size"]
+    fixed_cols = [c * (width // cols) for c in range(cols)] + [width]
+
+    print(f"\n[Sheet] {sheet_spec['name']} ({width}x{height}, {rows}x{cols})")
+    print(f"  列の境目: {' '.join(str(x) for x in grid['col_lines'][1:-1])}"
+          f"（固定 {' '.join(str(x) for x in fixed_cols[1:-1])}）")
+    for gutter in grid["col_gutters"]:
+        if gutter["split"]:
+            print(f"  ・ x={gutter['at']} は前の境目が探索範囲を越えたので等分")
+        if gutter["ink"]:
+            print(f"  ⚠ x={gutter['at']} に空いた列がありません（最小 {gutter['ink']}px）")
+    for col in range(cols):
+        for gutter in grid["row_gutters"][col]:
+            if gutter["split"]:
+                print(f"  ・ 列{col} y={gutter['at']} は前の境目が探索範囲を越えたので等分")
+            if gutter["ink"]:
+                print(f"  ⚠ 列{col} y={gutter['at']} に空いた行がありません（最小 {gutter['ink']}px）")
+
+    trims = {(c["row"], c["col"]): c["trim"] for c in sheet_spec["cells"]}
+    names = {(c["row"], c["col"]): c["output"] for c in sheet_spec["cells"]}
+    cells = []
+    for (row, col), box in sorted(grid["boxes"].items()):
+        # 切り抜きと同じく、どちらの枠も inset だけ内側で比べる
+        box = sprite_slicer.inset_box(box, sheet_spec["inset"])
+        current = trims.get((row, col), {})
+        extend = sheet_spec["extend_edges"]
+        base = sprite_slicer.cell_box((width, height), rows, cols, row, col, sheet_spec["inset"],
+                                      extend_edges=extend)
+        fixed = sprite_slicer.cell_box((width, height), rows, cols, row, col, sheet_spec["inset"], current, extend)
+        compared = compare_cell(sat, fixed, box, base)
+        mark = "✓" if not compared["intrusion"] and not compared["clipped"] else "△"
+        name = names.get((row, col))
+        label = f"{name.parent.name}/{name.name}" if name else "(未使用)"
+        print(f"  {mark} ({row},{col}) {label:<34} 枠 {box}"
+              f"  混入 {compared['intrusion']:>5}px / 切れ {compared['clipped']:>5}px"
+              f"  検出 trim [{format_trim(compared['trim'])}] 今の trim [{format_trim(current)}]")
+        cells.append({
+            "row": row, "col": col, "output": str(name) if name else None,
+            "box": list(box), "fixed": list(fixed),
+            "content": list(grid["content"][(row, col)]) if grid["content"][(row, col)] else None,
+            **compared, "current_trim": current,
+        })
+
+    return {
+        "sheet": sheet_spec["name"], "size": [width, height], "rows": rows, "cols": cols,
+        "col_lines": grid["col_lines"],
+        "row_lines": {str(col): lines for col, lines in grid["row_lines"].items()},
+        "cells": cells,
+    }
+
+
+def main():
+    import sprite_slicer
+    from sheet_cache import SheetCache
+
+    parser = argparse.ArgumentParser(description="スプライトシートのグリッド自動検出と固定グリッドとの比較")
+    parser.add_argument("images", nargs="*", type=Path, help="シート画像（--grid で行数・列数を指定）")
+    parser.add_argument("--grid", nargs=2, type=int, default=[4, 4], metavar=("ROWS", "COLS"),
+                        help="画像を直接渡すときの行数・列数")
+    parser.add_argument("--all", action="store_true", help="sprite_slicer の全ての設定のシート")
+    parser.add_argument("--only", nargs="+", choices=list(sprite_slicer.SLICE_CONFIGS),
+                        help="指定した設定のシートだけ")
+    parser.add_argument("--json", type=Path, help="検出した枠を JSON で保存")
+    args = parser.parse_args()
+
+    if args.all or args.only:
+        sheets = sprite_slicer.build_all(args.only)
+    else:
+        sheets = [sprite_slicer.sheet(path, args.grid[0], args.grid[1], []) for path in args.images]
+    if not sheets:
+        parser.error("シート画像か --all / --only を指定してください")
+
+    sheet_cache = SheetCache()
+    report = []
+    for sheet_spec in sheets:
+        if not sheet_spec["source"].exists():
+            print(f"  ⚠ ファイルが見つかりません: {sheet_spec['source']}")
+            continue
+        img = sprite_slicer.load_sheet(sheet_spec, sheet_cache)
+        report.append(report_sheet(sheet_spec, img))
+    sheet_cache.save()
+
+    moved = sum(1 for sheet in report for c in sheet["cells"] if c["intrusion"] or c["clipped"])
+    total = sum(len(sheet["cells"]) for sheet in report)
+    print(f"\n📊 {len(report)}シート / {total}セル中 {moved}セルで固定グリッドが混入・切れあり")
+
+    if args.json:
+        args.json.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"💾 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
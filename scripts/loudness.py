@@ -0,0 +1,410 @@
+# -*- coding: utf-8 -*-
+"""
+ITU-R BS.1770-4 / EBU R128 ラウドネス測定（NumPy）
+- K 特性フィルタ（高域シェルフ + 高域通過）を FIR 化して FFT で畳み込む
+  （IIR の再帰は Python では遅いので、インパルス応答が十分減衰するところで打ち切る）
+- 統合ラウドネス: 400ms ブロック / 75% 重なり、絶対ゲート -70 LUFS + 相対ゲート -10 LU
+- 短期ラウドネス（3秒窓）・瞬時ラウドネス（400ms 窓）の最大値
+- トゥルーピーク: 4倍オーバーサンプリング（12タップ/位相の窓付き sinc）
+- ストリーミング測定（LoudnessMeter）: PCM を一定サイズのブロックで読みながら
+  フィルタ状態（直前の入力）と 100ms ごとのパワーだけを持つ → 曲の長さに関係なくメモリ一定
+  （400ms / 3秒窓・1秒ごとのラウドネス推移は 100ms パワーの和から作る）
+- ファイルが窓より短い場合（短い SE など）は全体を1つの窓として扱う
+
+使い方:
+    from loudness import measure_file
+    result = measure_file(path)       # {"integrated", "short_term_max", "true_peak", "timeline", ...}
+
+    from loudness import load_audio, measure
+    samples, rate = load_audio(path)  # メモリに全部読む場合
+    result = measure(samples, rate)
+"""
+
+import json
+import math
+import subprocess
+import wave
+from functools import lru_cache
+
+import numpy as np
+
+ABSOLUTE_GATE = -70.0     # LUFS
+RELATIVE_GATE = -10.0     # LU
+BLOCK_SECONDS = 0.4       # ゲーティングブロック / 瞬時ラウドネス
+SHORT_TERM_SECONDS = 3.0  # 短期ラウドネス
+STEP_SECONDS = 0.1        # 窓をずらす間隔（75% 重なり）
+OVERSAMPLE = 4            # トゥルーピークのオーバーサンプリング倍率
+TAPS_PER_PHASE = 12
+FIR_TOLERANCE = 1e-10     # K 特性 FIR の打ち切り（残りのエネルギー比）
+TIMELINE_SECONDS = 1.0    # ラウドネス推移の間隔
+CHUNK_FRAMES = 1 << 16    # ストリーミング時に一度に読むフレーム数（44.1kHz で約1.5秒）
+
+
+# ========================================
+# 読み込み
+# ========================================
+
+def load_audio(path):
+    """
+    音声ファイルを (サンプル (n, チャンネル) float64 [-1, 1), サンプルレート) で読む
+    PCM WAV は標準ライブラリで、それ以外（mp3/ogg）は pydub（ffmpeg）で読む
+    """
+    path = str(path)
+    if path.lower().endswith(".wav"):
+        try:
+            return _load_wav(path)
+        except (wave.Error, ValueError):
+            pass  # 浮動小数点 WAV などは pydub に任せる
+
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(path)
+    samples = np.array(audio.get_array_of_samples(), dtype=np.float64)
+    samples = samples.reshape(-1, audio.channels) / float(1 << (8 * audio.sample_width - 1))
+    return samples, audio.frame_rate
+
+
+def stream_audio(path, chunk_frames=CHUNK_FRAMES):
+    """
+    音声ファイルをブロックごとに読む
+    戻り値: (サンプルレート, チャンネル数, (n, チャンネル) float64 のブロックを返すイテレータ)
+    PCM WAV は標準ライブラリで、それ以外は ffmpeg のパイプで読む（全体をメモリに載せない）
+    """
+    path = str(path)
+    if path.lower().endswith(".wav"):
+        try:
+            f = wave.open(path, "rb")
+        except (wave.Error, EOFError):
+            pass  # 浮動小数点 WAV などは ffmpeg に任せる
+        else:
+            return f.getframerate(), f.getnchannels(), _wav_chunks(f, chunk_frames)
+
+    rate, channels = _probe(path)
+    return rate, channels, _ffmpeg_chunks(path, channels, chunk_frames)
+
+
+def _wav_chunks(f, chunk_frames):
+    with f:
+        width, channels = f.getsampwidth(), f.getnchannels()
+        while True:
+            raw = f.readframes(chunk_frames)
+            if not raw:
+                break
+            yield pcm_to_float(raw, width, channels)
+
+
+def _probe(path):
+    """ffprobe で (サンプルレート, チャンネル数) を調べる"""
+    out = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "a:0",
+         "-show_entries", "stream=sample_rate,channels", "-of", "json", path],
+        capture_output=True, check=True,
+    ).stdout
+    streams = json.loads(out).get("streams")
+    if not streams:
+        raise ValueError(f"音声ストリームがありません: {path}")
+    return int(streams[0]["sample_rate"]), int(streams[0]["channels"])
+
+
+def _ffmpeg_chunks(path, channels, chunk_frames):
+    """ffmpeg で 16bit PCM にデコードしながら読む"""
+    proc = subprocess.Popen(
+        ["ffmpeg", "-v", "error", "-i", path, "-f", "s16le", "-acodec", "pcm_s16le", "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    frame_bytes = 2 * channels
+    try:
+        while True:
+            raw = proc.stdout.read(chunk_frames * frame_bytes)
+            raw = raw[:len(raw) - len(raw) % frame_bytes]
+            if not raw:
+                break
+            yield pcm_to_float(raw, 2, channels)
+    finally:
+        proc.stdout.close()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg のデコードに失敗しました: {path}")
+
+
+def _load_wav(path):
+    with wave.open(path, "rb") as f:
+        channels, width, rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        raw = f.readframes(f.getnframes())
+    return pcm_to_float(raw, width, channels), rate
+
+
+def pcm_to_float(raw, width, channels):
+    """リトルエンディアン PCM バイト列 → (n, チャンネル) float64"""
+    if width == 1:
+        data = np.frombuffer(raw, dtype=np.uint8).astype(np.float64) - 128.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        data = ((b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)) << 8 >> 8).astype(np.float64)
+    elif width in (2, 4):
+        data = np.frombuffer(raw, dtype=f"<i{width}").astype(np.float64)
+    else:
+        raise ValueError(f"未対応のサンプル幅: {width}")
+    return data.reshape(-1, channels) / float(1 << (8 * width - 1))
+
+
+# ========================================
+# K 特性フィルタ
+# ========================================
+
+def k_weighting_biquads(rate):
+    """
+    K 特性の2段のバイクアッド係数 [(b, a), (b, a)]
+    （48kHz の規格値をアナログ原型から任意のサンプルレートへ変換したもの）
+    """
+    # 1段目: 高域シェルフ（頭部の音響効果）
+    f0, gain, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / rate)
+    vh = 10 ** (gain / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = (
+        [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0],
+        [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0],
+    )
+
+    # 2段目: 高域通過（RLB 特性）
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / rate)
+    a0 = 1 + k / q + k * k
+    highpass = (
+        [1.0, -2.0, 1.0],
+        [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0],
+    )
+    return [shelf, highpass]
+
+
+@lru_cache(maxsize=None)
+def k_weighting_fir(rate, tolerance=FIR_TOLERANCE):
+    """
+    K 特性フィルタのインパルス応答（残りのエネルギーが tolerance 未満になるまで）
+    サンプルレートごとに1回だけ計算する
+    """
+    length = 1 << 12
+    while True:
+        h = np.zeros(length)
+        h[0] = 1.0
+        for b, a in k_weighting_biquads(rate):
+            h = _biquad(h, b, a)
+        energy = np.cumsum((h ** 2)[::-1])[::-1]
+        tail = np.flatnonzero(energy < energy[0] * tolerance)
+        if tail.size or length >= 1 << 18:
+            return h[:tail[0]] if tail.size else h
+        length <<= 1
+
+
+def _biquad(x, b, a):
+    """バイクアッド（直接形 II 転置）。インパルス応答の計算用"""
+    y = np.empty_like(x)
+    z1 = z2 = 0.0
+    b0, b1, b2 = b
+    _, a1, a2 = a
+    for i, v in enumerate(x.tolist()):
+        out = b0 * v + z1
+        z1 = b1 * v - a1 * out + z2
+        z2 = b2 * v - a2 * out
+        y[i] = out
+    return y
+
+
+def fft_convolve(x, h):
+    """x (n, ch) と h (m,) の線形畳み込みの先頭 n サンプル"""
+    n = x.shape[0]
+    size = 1 << max(n + len(h) - 1, 1).bit_length()
+    spectrum = np.fft.rfft(x, size, axis=0) * np.fft.rfft(h, size)[:, None]
+    return np.fft.irfft(spectrum, size, axis=0)[:n]
+
+
+def k_filter(samples, rate):
+    """K 特性をかけたサンプル (n, ch)"""
+    return fft_convolve(samples, k_weighting_fir(rate))
+
+
+# ========================================
+# ラウドネス
+# ========================================
+
+def channel_weights(channels):
+    """チャンネルの重み（L/R/C = 1.0、5.1 のサラウンド = 1.41、LFE = 0）"""
+    if channels == 6:
+        return np.array([1.0, 1.0, 1.0, 0.0, 1.41, 1.41])
+    return np.ones(channels)
+
+
+def to_lufs(power):
+    """重み付き平均二乗 → LUFS（0 なら -inf）"""
+    power = np.asarray(power, dtype=np.float64)
+    with np.errstate(divide="ignore"):
+        return -0.691 + 10 * np.log10(power)
+
+
+def window_powers(step_powers, steps, total, frames, step):
+    """
+    100ms ごとのパワー（重み付き二乗和）から steps 個分の窓の平均二乗を並べる
+    ファイルが窓より短ければ全体（total / frames）を1つの窓にする
+    """
+    if frames == 0:
+        return np.zeros(0)
+    if len(step_powers) < steps:
+        return np.array([total / frames])
+    csum = np.concatenate([[0.0], np.cumsum(step_powers)])
+    return (csum[steps:] - csum[:-steps]) / (steps * step)
+
+
+def gated_loudness(powers):
+    """ブロックのパワーから統合ラウドネス（絶対・相対ゲート付き）"""
+    powers = np.asarray(powers)
+    loud = to_lufs(powers)
+    above = powers[loud > ABSOLUTE_GATE]
+    if above.size == 0:
+        return -math.inf
+    threshold = float(to_lufs(above.mean())) + RELATIVE_GATE
+    gated = above[to_lufs(above) > threshold]
+    return float(to_lufs(gated.mean()))
+
+
+def true_peak_filter():
+    """オーバーサンプリング用の窓付き sinc（位相ごとに並べた (倍率, タップ数)）"""
+    taps = OVERSAMPLE * TAPS_PER_PHASE
+    n = np.arange(taps) - (taps - 1) / 2
+    h = np.sinc(n / OVERSAMPLE) * np.kaiser(taps, 8.0)
+    h *= OVERSAMPLE / h.sum()
+    return h.reshape(TAPS_PER_PHASE, OVERSAMPLE).T
+
+
+class LoudnessMeter:
+    """
+    ストリーミングのラウドネス測定
+    add() でブロックを順に渡し、最後に result() を呼ぶ
+    保持するのはフィルタの直前の入力と 100ms ごとのパワー（と 1 秒ごとの推移）だけ
+    """
+
+    def __init__(self, rate, channels):
+        self.rate = rate
+        self.channels = channels
+        self.fir = k_weighting_fir(rate)
+        self.weights = channel_weights(channels)
+        self.step = max(1, int(round(STEP_SECONDS * rate)))
+        self.block_steps = max(1, int(round(BLOCK_SECONDS / STEP_SECONDS)))
+        self.short_term_steps = max(1, int(round(SHORT_TERM_SECONDS / STEP_SECONDS)))
+        self.timeline_steps = max(1, int(round(TIMELINE_SECONDS / STEP_SECONDS)))
+
+        # フィルタの状態（直前の入力）
+        self.fir_history = np.zeros((len(self.fir) - 1, channels))
+        self.peak_filter = true_peak_filter()
+        self.peak_history = np.zeros((TAPS_PER_PHASE - 1, channels))
+
+        # 累積値
+        self.step_powers = []        # 100ms ごとの重み付き二乗和
+        self.partial_power = 0.0     # 途中の 100ms の分
+        self.partial_frames = 0
+        self.frames = 0
+        self.total_power = 0.0       # K 特性後の重み付き二乗和（全体）
+        self.sum_squares = 0.0       # 元の信号の二乗和（dBFS 用）
+        self.sample_peak = 0.0
+        self.true_peak = 0.0
+
+    def add(self, chunk):
+        chunk = np.asarray(chunk, dtype=np.float64).reshape(-1, self.channels)
+        if chunk.shape[0] == 0:
+            return
+        self.frames += chunk.shape[0]
+        self.sum_squares += float((chunk ** 2).sum())
+        self.sample_peak = max(self.sample_peak, float(np.abs(chunk).max()))
+        self._add_true_peak(chunk)
+
+        # K 特性（直前の入力をつないで畳み込み、つないだ分の出力は捨てる）
+        buffer = np.concatenate([self.fir_history, chunk])
+        filtered = fft_convolve(buffer, self.fir)[len(self.fir_history):]
+        if len(self.fir_history):
+            self.fir_history = buffer[-len(self.fir_history):]
+        power = (filtered ** 2) @ self.weights
+        self.total_power += float(power.sum())
+
+        # 100ms ごとに区切る（途中の分は次のブロックへ持ち越す）
+        head = min(len(power), self.step - self.partial_frames)
+        self.partial_power += float(power[:head].sum())
+        self.partial_frames += head
+        if self.partial_frames < self.step:
+            return
+        self.step_powers.append(self.partial_power)
+        rest = power[head:]
+        whole = len(rest) // self.step * self.step
+        self.step_powers.extend(rest[:whole].reshape(-1, self.step).sum(axis=1).tolist())
+        self.partial_power = float(rest[whole:].sum())
+        self.partial_frames = len(rest) - whole
+
+    def _add_true_peak(self, chunk, flush=False):
+        buffer = np.concatenate([self.peak_history, chunk])
+        for phase in self.peak_filter:
+            for ch in range(self.channels):
+                interpolated = np.convolve(buffer[:, ch], phase, mode="valid")
+                if interpolated.size:
+                    self.true_peak = max(self.true_peak, float(np.abs(interpolated).max()))
+        if not flush:
+            self.peak_history = buffer[-len(self.peak_history):]
+
+    def timeline(self):
+        """TIMELINE_SECONDS ごとのラウドネス（LUFS、最後の端数も含む）"""
+        steps = np.array(self.step_powers)
+        whole = len(steps) // self.timeline_steps * self.timeline_steps
+        sums = steps[:whole].reshape(-1, self.timeline_steps).sum(axis=1)
+        powers = list(sums / (self.timeline_steps * self.step))
+        rest_frames = (len(steps) - whole) * self.step + self.partial_frames
+        if rest_frames:
+            powers.append((steps[whole:].sum() + self.partial_power) / rest_frames)
+        return [float(v) for v in to_lufs(powers)]
+
+    def result(self):
+        """
+        integrated / short_term_max / momentary_max (LUFS), true_peak / sample_peak (dBTP/dBFS),
+        rms_dbfs（pydub の dBFS と同じ定義）, duration_ms, timeline（1秒ごとの LUFS）
+        """
+        # トゥルーピークのフィルタの残り（末尾）を出し切る
+        self._add_true_peak(np.zeros((TAPS_PER_PHASE - 1, self.channels)), flush=True)
+
+        totals = (self.total_power, self.frames, self.step)
+        blocks = window_powers(self.step_powers, self.block_steps, *totals)
+        short_term = window_powers(self.step_powers, self.short_term_steps, *totals)
+
+        def db(value):
+            return 20 * math.log10(value) if value > 0 else -math.inf
+
+        samples = self.frames * self.channels
+        return {
+            "integrated": gated_loudness(blocks),
+            "short_term_max": float(to_lufs(short_term.max())) if short_term.size else -math.inf,
+            "momentary_max": float(to_lufs(blocks.max())) if blocks.size else -math.inf,
+            "true_peak": db(max(self.true_peak, self.sample_peak)),
+            "sample_peak": db(self.sample_peak),
+            "rms_dbfs": db(math.sqrt(self.sum_squares / samples)) if samples else -math.inf,
+            "duration_ms": int(round(1000 * self.frames / self.rate)),
+            "timeline": self.timeline(),
+        }
+
+
+def measure(samples, rate):
+    """メモリ上のサンプル (n, ch) を測定（LoudnessMeter.result() と同じ項目）"""
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    meter = LoudnessMeter(rate, samples.shape[1])
+    for start in range(0, samples.shape[0], CHUNK_FRAMES):
+        meter.add(samples[start:start + CHUNK_FRAMES])
+    return meter.result()
+
+
+def measure_file(path, chunk_frames=CHUNK_FRAMES):
+    """ファイルをブロックごとに読みながら測定（メモリは曲の長さによらず一定）"""
+    rate, channels, chunks = stream_audio(path, chunk_frames)
+    meter = LoudnessMeter(rate, channels)
+    for chunk in chunks:
+        meter.add(chunk)
+    result = meter.result()
+    result["sample_rate"] = rate
+    result["channels"] = channels
+    return result
@@ -1,20 +1,27 @@
 # -*- coding: utf-8 -*-
 """
 ゴールデンワンコをキンピカにするスクリプト
+- 変換本体は recolor.py の gold プリセット（NumPy の LUT 1パス）
+- 旧処理は make_golden_sparkle_legacy として残している（recolor.py --verify で一致確認用）
+- 変換前の画像は backup_store.py の置き場にバックアップ（何回実行しても本当の元画像が残る）
+  戻すとき: python backup_store.py --restore <実行ID>
 """
 
 from PIL import Image, ImageEnhance, ImageFilter
 import os
 import sys
 
+from backup_store import backup_before_write
+from recolor import recolor_image
+
 if sys.platform == 'win32':
     import io
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
 
 # パス設定
-BASE_DIR = r"C:\Users\janne\Documents\APP-KEROFEN\inusanpo"
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 GOLDEN_DIR = os.path.join(BASE_DIR, "assets", "characters", "dog_29_goldenwanko")
-BACKUP_DIR = os.path.join(GOLDEN_DIR, "_backup")
+BACKUP_TOOL = "make_golden"  # バックアップ置き場での名前
 
 EXPRESSIONS = ["neutral", "happy", "sad", "excited"]
 
@@ -22,6 +29,14 @@ EXPRESSIONS = ["neutral", "happy", "sad", "excited"]
 def make_golden_sparkle(img):
     """
     画像をキンピカのゴールドに変換
+    （make_golden_sparkle_legacy と同じ結果を LUT 1パスで計算）
+    """
+    return recolor_image(img, "gold")
+
+
+def make_golden_sparkle_legacy(img):
+    """
+    画像をキンピカのゴールドに変換（旧処理: ImageEnhance / point を順番にかける）
     """
     if img.mode != 'RGBA':
         img = img.convert('RGBA')
@@ -88,21 +103,20 @@ def process_golden_wanko():
     print("✨ ゴールデンワンコ キンピカ化 ✨")
     print("=" * 50)
     
-    # バックアップフォルダ作成
-    os.makedirs(BACKUP_DIR, exist_ok=True)
-    
+    paths = []
     for expr in EXPRESSIONS:
         img_path = os.path.join(GOLDEN_DIR, f"{expr}.png")
-        
-        if not os.path.exists(img_path):
+        if os.path.exists(img_path):
+            paths.append(img_path)
+        else:
             print(f"  ⚠ {expr}.png not found")
-            continue
-        
-        # バックアップ
-        backup_path = os.path.join(BACKUP_DIR, f"{expr}.png")
+    
+    # バックアップ（上書きする前にまとめて）
+    backup_before_write(BACKUP_TOOL, paths)
+    
+    for img_path in paths:
+        expr = os.path.splitext(os.path.basename(img_path))[0]
         img = Image.open(img_path)
-        img.save(backup_path, 'PNG')
-        print(f"  📦 Backup: {expr}.png")
         
         # キンピカ変換
         golden_img = add_sparkle_effect(img)
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+"""
+ゲーム音声のラウドネス正規化 + 圧縮変換
+- game.js の AUDIO_MAP で使っている音声を、カテゴリごとの目標ラウドネス（LUFS）に合わせて
+  ゲインを焼き込み、OGG/Opus と AAC（または MP3）のフォールバックに変換する
+  → 実行時の volume はほぼ一律（SPECIAL_ADJUSTMENTS の分だけ）で済む
+- ラウドネスは analyze_audio_volume.py の解析結果（キャッシュ）を使う
+- 同じ名前の .wav マスターがあればそちらから変換する（mp3 の再圧縮を避ける）
+- トゥルーピークが TRUE_PEAK_CEILING を超えないようにゲインを抑える
+- 変換済みで入力・設定が変わっていないファイルはスキップ（.asset_cache/audio_encode.json）
+- 変換後のファイルも測り直して、サイズと最終ラウドネスを JSON に出力
+
+出力: assets/audio/encoded/<bgm|se>/<元の名前>.ogg / .m4a（--fallback mp3 なら .mp3）
+レポート: scripts/audio_encode_report.json
+
+必要: ffmpeg（libopus / aac または libmp3lame）
+
+使い方:
+    python normalize_audio.py
+    python normalize_audio.py --fallback mp3 -j 4
+    python normalize_audio.py --dry-run    # ゲインの計画だけ表示（変換しない）
+"""
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from analyze_audio_volume import (
+    CACHE_NAME,
+    KEY_CATEGORY_MAP,
+    PROJECT_ROOT,
+    SPECIAL_ADJUSTMENTS,
+    analyze_with_cache,
+    load_audio_map,
+)
+from build_cache import BuildCache, make_key
+from loudness import measure_file
+from parallel import map_ordered
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+OUTPUT_DIR = PROJECT_ROOT / "assets" / "audio" / "encoded"
+REPORT_PATH = PROJECT_ROOT / "scripts" / "audio_encode_report.json"
+
+ENCODER_VERSION = 1
+ENCODE_CACHE_NAME = "audio_encode"
+CACHE_STAGE = "encode"
+
+# カテゴリごとの目標ラウドネス（LUFS）
+# BGM は SE の後ろで鳴るので控えめ、結果・特別 SE は目立たせる
+CATEGORY_LOUDNESS = {
+    "bgm": -20.0,
+    "ui_se": -22.0,
+    "gameplay_se": -18.0,
+    "result_se": -16.0,
+    "special_se": -16.0,
+}
+
+# カテゴリごとのビットレート（Opus, フォールバック）
+CATEGORY_BITRATES = {
+    "bgm": ("96k", "128k"),
+    "ui_se": ("48k", "64k"),
+    "gameplay_se": ("48k", "64k"),
+    "result_se": ("64k", "96k"),
+    "special_se": ("64k", "96k"),
+}
+
+TRUE_PEAK_CEILING = -1.0  # dBTP（非可逆圧縮でピークが少し上がる分の余裕）
+
+# フォールバック形式 → (拡張子, ffmpeg のエンコーダ)
+FALLBACK_CODECS = {
+    "aac": (".m4a", ["-c:a", "aac"]),
+    "mp3": (".mp3", ["-c:a", "libmp3lame"]),
+}
+OPUS_CODEC = (".ogg", ["-c:a", "libopus", "-vbr", "on", "-application", "audio"])
+
+
+# ========================================
+# 計画（どのファイルをどれだけ持ち上げるか）
+# ========================================
+
+def source_for(path):
+    """
+    変換元: 同じ名前の .wav マスターがあればそれ、なければ game.js のファイル
+    どちらも無ければ None
+    """
+    master = path.with_suffix(".wav")
+    if master.exists():
+        return master
+    return path if path.exists() else None
+
+
+def plan_jobs(audio_map):
+    """
+    AUDIO_MAP から変換するファイルの一覧を作る（同じファイルを使うキーはまとめる）
+    変換元が見つからないファイルは警告して除外する
+    戻り値: ([{"path", "source", "category", "keys"}]（定義順）, [{"file", "keys"}]（見つからないファイル）)
+    """
+    jobs, missing = {}, {}
+    for key, meta in audio_map.items():
+        source = source_for(meta["path"])
+        if source is None:
+            file = meta["path"].relative_to(PROJECT_ROOT).as_posix()
+            if file not in missing:
+                print(f"⚠ ファイル未検出（スキップ）: {file}")
+            missing.setdefault(file, {"file": file, "keys": []})["keys"].append(key)
+            continue
+        job = jobs.setdefault(meta["path"], {
+            "path": meta["path"],
+            "source": source,
+            # 最初に使っているキーのカテゴリで揃える
+            "category": KEY_CATEGORY_MAP.get(key, "gameplay_se"),
+            "keys": [],
+        })
+        job["keys"].append(key)
+    return list(jobs.values()), list(missing.values())
+
+
+def normalize_gain(loudness, category):
+    """
+    目標ラウドネスまでのゲイン（dB）と、ピークで制限されたかどうか
+    無音のファイルは 0dB
+    """
+    integrated, peak = loudness["lufs_integrated"], loudness["true_peak_dbtp"]
+    if integrated == float("-inf"):
+        return 0.0, False
+    gain = CATEGORY_LOUDNESS[category] - integrated
+    limit = TRUE_PEAK_CEILING - peak
+    if gain > limit:
+        return round(limit, 2), True
+    return round(gain, 2), False
+
+
+def output_paths(job, fallback):
+    sub = "bgm" if job["category"] == "bgm" else "se"
+    stem = job["path"].stem
+    return {
+        "opus": OUTPUT_DIR / sub / f"{stem}{OPUS_CODEC[0]}",
+        fallback: OUTPUT_DIR / sub / f"{stem}{FALLBACK_CODECS[fallback][0]}",
+    }
+
+
+# ========================================
+# 変換（ワーカー）
+# ========================================
+
+def encode_one(source, output, gain_db, codec_args, bitrate):
+    """ffmpeg でゲインをかけて変換し、変換後のラウドネスを測る"""
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output.with_name(output.stem + ".tmp" + output.suffix)
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-i", str(source), "-map_metadata", "-1",
+         "-af", f"volume={gain_db}dB", *codec_args, "-b:a", bitrate, str(tmp_path)],
+        check=True, capture_output=True,
+    )
+    tmp_path.replace(output)
+    loudness = measure_file(output)
+    return {
+        "bytes": output.stat().st_size,
+        "lufs_integrated": round(loudness["integrated"], 2),
+        "true_peak_dbtp": round(loudness["true_peak"], 2),
+    }
+
+
+# ========================================
+# メイン
+# ========================================
+
+def normalize(fallback="aac", jobs=None, force=False, dry_run=False, report_path=REPORT_PATH):
+    audio_map = load_audio_map()
+    plan, missing = plan_jobs(audio_map)
+
+    # 1. ラウドネス解析（キャッシュ済みならデコードなし）
+    analyses = analyze_with_cache([job["source"] for job in plan], jobs, cache=BuildCache(CACHE_NAME))
+    cache = BuildCache(ENCODE_CACHE_NAME)
+
+    # 2. ゲインと変換タスクを決める
+    tasks, targets, entries = [], [], []
+    for job, (analysis, _) in zip(plan, analyses):
+        entry = {
+            "file": job["path"].relative_to(PROJECT_ROOT).as_posix(),
+            "source": job["source"].relative_to(PROJECT_ROOT).as_posix(),
+            "keys": job["keys"],
+            "category": job["category"],
+            "source_bytes": job["source"].stat().st_size,
+            # .wav マスターだけあって game.js のファイルがまだ無い場合は 0
+            "shipped_bytes": job["path"].stat().st_size if job["path"].exists() else 0,
+            "outputs": {},
+        }
+        entries.append(entry)
+        if not analysis["success"]:
+            entry["error"] = analysis.get("error")
+            continue
+
+        gain, limited = normalize_gain(analysis, job["category"])
+        entry.update({
+            "input_lufs": analysis["lufs_integrated"],
+            "input_true_peak": analysis["true_peak_dbtp"],
+            "target_lufs": CATEGORY_LOUDNESS[job["category"]],
+            "gain_db": gain,
+            "peak_limited": limited,
+        })
+
+        opus_rate, fallback_rate = CATEGORY_BITRATES[job["category"]]
+        formats = {
+            "opus": (OPUS_CODEC[1], opus_rate),
+            fallback: (FALLBACK_CODECS[fallback][1], fallback_rate),
+        }
+        source_sha = cache.digest(job["source"])
+        for fmt, output in output_paths(job, fallback).items():
+            codec_args, bitrate = formats[fmt]
+            key = make_key(CACHE_STAGE, ENCODER_VERSION, source_sha, gain, codec_args, bitrate)
+            entry["outputs"][fmt] = {"path": output.relative_to(PROJECT_ROOT).as_posix(), "bitrate": bitrate}
+            if not force and cache.is_fresh(output, CACHE_STAGE, key):
+                previous = cache.lookup(key)
+                if previous:
+                    entry["outputs"][fmt].update(previous)
+                    continue
+            tasks.append((job["source"], output, gain, codec_args, bitrate))
+            targets.append((entry, fmt, output, key))
+
+    if dry_run:
+        print_plan(entries, missing)
+        return entries
+
+    # 3. 変換（ffmpeg は別プロセスなのでスレッドで並列に起動）
+    if tasks and not shutil.which("ffmpeg"):
+        print("❌ ffmpeg が見つかりません（変換には ffmpeg が必要です）")
+        sys.exit(1)
+    print(f"\n🎛 変換: {len(tasks)}ファイル（スキップ {sum(len(e['outputs']) for e in entries) - len(tasks)}）")
+    results = map_ordered(encode_one, tasks, jobs, executor="thread")
+    for (entry, fmt, output, key), (result, error) in zip(targets, results):
+        if error:
+            entry["outputs"][fmt]["error"] = error
+            continue
+        entry["outputs"][fmt].update(result)
+        cache.record(output, CACHE_STAGE, key, reset=True)
+        cache.store(key, result)
+    cache.save()
+
+    write_report(entries, missing, audio_map, fallback, report_path)
+    print_summary(entries, missing, audio_map, fallback)
+    return entries
+
+
+def runtime_volumes(audio_map):
+    """正規化後の AUDIO_MAP の volume（カテゴリの差は焼き込み済みなので特別調整だけ）"""
+    return {key: SPECIAL_ADJUSTMENTS.get(key, 1.0) for key in audio_map}
+
+
+def write_report(entries, missing, audio_map, fallback, report_path):
+    totals = {"shipped_bytes": 0, "opus_bytes": 0, f"{fallback}_bytes": 0}
+    for entry in entries:
+        totals["shipped_bytes"] += entry["shipped_bytes"]
+        for fmt, output in entry["outputs"].items():
+            totals[f"{fmt}_bytes"] += output.get("bytes", 0)
+    report = {
+        "targets_lufs": CATEGORY_LOUDNESS,
+        "true_peak_ceiling": TRUE_PEAK_CEILING,
+        "fallback": fallback,
+        "totals": totals,
+        "files": entries,
+        "missing": missing,
+        "runtime_volumes": runtime_volumes(audio_map),
+    }
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 レポートを保存: {report_path}")
+
+
+def print_missing(missing):
+    for item in missing:
+        print(f"  ⚠ {item['file']}: ファイル未検出（{', '.join(item['keys'])}）")
+
+
+def print_plan(entries, missing):
+    print("\n📋 正規化の計画（--dry-run）")
+    print_missing(missing)
+    for entry in entries:
+        if "error" in entry:
+            print(f"  ✗ {entry['file']}: {entry['error']}")
+            continue
+        note = "（ピーク制限）" if entry["peak_limited"] else ""
+        print(f"  {entry['file']:<48} {entry['input_lufs']:>7.2f} → {entry['target_lufs']:>6.1f} LUFS"
+              f"  gain {entry['gain_db']:+6.2f} dB{note}")
+
+
+def print_summary(entries, missing, audio_map, fallback):
+    print("\n" + "=" * 60)
+    print("📊 変換結果")
+    print("=" * 60)
+    print_missing(missing)
+    shipped = encoded_opus = encoded_fallback = 0
+    for entry in entries:
+        shipped += entry["shipped_bytes"]
+        if "error" in entry:
+            print(f"  ✗ {entry['file']}: {entry['error']}")
+            continue
+        cols = []
+        for fmt, output in entry["outputs"].items():
+            if "error" in output:
+                cols.append(f"{fmt} ✗ {output['error']}")
+            else:
+                cols.append(f"{fmt} {output['bytes'] / 1024:7.1f}KB {output['lufs_integrated']:6.1f}LUFS")
+        encoded_opus += entry["outputs"].get("opus", {}).get("bytes", 0)
+        encoded_fallback += entry["outputs"].get(fallback, {}).get("bytes", 0)
+        print(f"  {Path(entry['file']).name:<36} {entry['shipped_bytes'] / 1024:7.1f}KB → " + " / ".join(cols))
+
+    print(f"\n  現在: {shipped / 1024:.1f}KB → opus {encoded_opus / 1024:.1f}KB"
+          f" / {fallback} {encoded_fallback / 1024:.1f}KB")
+
+    # game.js 用（Phaser は URL の配列から再生できる形式を選ぶ）
+    print("\n// 正規化後の AUDIO_MAP（volume はほぼ一律）")
+    by_file = {entry["file"]: entry for entry in entries}
+    volumes = runtime_volumes(audio_map)
+    for key, meta in audio_map.items():
+        entry = by_file.get(meta["path"].relative_to(PROJECT_ROOT).as_posix())
+        if entry is None:
+            # ファイル未検出
+            continue
+        if "error" in entry or any("error" in o for o in entry["outputs"].values()):
+            continue
+        urls = ", ".join(f"'./{o['path']}'" for o in entry["outputs"].values())
+        loop = ", loop: true" if meta["loop"] else ""
+        print(f"{key}: {{ path: [{urls}], volume: {volumes[key]:.2f}{loop} }},")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ゲーム音声のラウドネス正規化 + 圧縮変換")
+    parser.add_argument("--fallback", choices=list(FALLBACK_CODECS), default="aac",
+                        help="Opus に対応していないブラウザ向けの形式")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="ワーカー数")
+    parser.add_argument("--force", action="store_true", help="キャッシュを無視して全部変換し直す")
+    parser.add_argument("--dry-run", action="store_true", help="ゲインの計画だけ表示")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    normalize(args.fallback, args.jobs, args.force, args.dry_run)
+    print(f"\n⏱ {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+"""
+PNG 再圧縮ステージ（可逆）
+- 1枚ごとに複数のフィルタ × zlib 戦略でエンコードし、一番小さい結果を採用
+  - フィルタ: None / Sub / Up / Average / Paeth / 行ごとに最小を選ぶ adaptive（NumPy で一括計算）
+  - zlib: level 9 の DEFAULT / FILTERED / RLE
+  - 256色以下の RGBA/RGB はパレット（PLTE + tRNS）にしても試す
+  - Pillow の optimize=True も候補に入れる
+- 採用前にデコードして元の RGBA と完全一致するか確認（ピクセルは一切変えない）
+- 16bit の PNG は対象外（Pillow のデコードが 8bit に落とすので、一致の確認ができない）
+- 表示に関わるチャンク（gAMA / cHRM / sRGB）とテキスト（tEXt / zTXt / iTXt）は元のまま残す
+- 元より小さくならなければ書き換えない
+- プロセスプールで並列実行（--jobs N）
+- ビルドキャッシュで、前回最適化したあと内容が変わっていない画像はスキップ
+  （キャッシュは切り抜き・中央配置と共有。最適化後のハッシュを記録するので前段もスキップされる）
+- ファイルごとの before/after バイト数を JSON レポートに書き出す
+
+パイプラインの最後に呼ぶ:
+    from optimize_png import optimize_paths
+    optimize_paths(written_files, jobs=jobs, cache=cache)
+
+使い方:
+    python optimize_png.py                          # assets/ 以下全部
+    python optimize_png.py ../assets/characters -j 8
+    python optimize_png.py --force --report report.json
+"""
+
+import argparse
+import io
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from build_cache import BuildCache, make_key
+from parallel import default_jobs, map_ordered
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_TARGET = PROJECT_ROOT / "assets"
+REPORT_FILE = Path(__file__).resolve().parent / "png_optimize_report.json"
+
+# エンコード方法を変えたら上げる（キャッシュを無効化するため）
+OPTIMIZER_VERSION = 2
+CACHE_NAME = "sprites"  # sprite_slicer / center_dogs と共有
+CACHE_STAGE = "optimize"
+
+# 試す (フィルタ, zlib 戦略) の組み合わせ
+STRATEGIES = [
+    ("none", zlib.Z_DEFAULT_STRATEGY),
+    ("none", zlib.Z_RLE),
+    ("sub", zlib.Z_DEFAULT_STRATEGY),
+    ("up", zlib.Z_DEFAULT_STRATEGY),
+    ("paeth", zlib.Z_DEFAULT_STRATEGY),
+    ("adaptive", zlib.Z_DEFAULT_STRATEGY),
+    ("adaptive", zlib.Z_FILTERED),
+    ("adaptive", zlib.Z_RLE),
+]
+STRATEGY_NAMES = {
+    zlib.Z_DEFAULT_STRATEGY: "default",
+    zlib.Z_FILTERED: "filtered",
+    zlib.Z_RLE: "rle",
+}
+
+FILTER_TYPES = {"none": 0, "sub": 1, "up": 2, "average": 3, "paeth": 4}
+
+# 再エンコードしても元のまま残すチャンク（ブラウザの表示に関わるもの・テキスト）
+KEEP_CHUNKS = (b"gAMA", b"cHRM", b"sRGB", b"tEXt", b"zTXt", b"iTXt")
+
+# モード → (PNG カラータイプ, チャンネル数)
+COLOR_TYPES = {"L": (0, 1), "RGB": (2, 3), "P": (3, 1), "LA": (4, 2), "RGBA": (6, 4)}
+
+
+# ========================================
+# スキャンラインフィルタ（NumPy）
+# ========================================
+
+def filter_rows(raw, bpp):
+    """
+    raw: (h, stride) uint8 の生データ
+    5種類のフィルタをかけた結果 {フィルタ番号: (h, stride) uint8} を返す
+    PNG のフィルタは元データだけから計算できるので全行まとめて処理できる
+    """
+    x = raw.astype(np.int16)
+    a = np.zeros_like(x)
+    a[:, bpp:] = x[:, :-bpp]
+    b = np.zeros_like(x)
+    b[1:] = x[:-1]
+    c = np.zeros_like(x)
+    c[1:, bpp:] = x[:-1, :-bpp]
+
+    p = a + b - c
+    pa = np.abs(p - a)
+    pb = np.abs(p - b)
+    pc = np.abs(p - c)
+    paeth = np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+
+    return {
+        0: raw,
+        1: (x - a).astype(np.uint8),
+        2: (x - b).astype(np.uint8),
+        3: (x - ((a + b) >> 1)).astype(np.uint8),
+        4: (x - paeth).astype(np.uint8),
+    }
+
+
+def filtered_stream(raw, bpp, filter_name, filtered=None):
+    """
+    フィルタ済みの IDAT 圧縮前データ（各行の先頭にフィルタ番号）を返す
+    adaptive は行ごとに「符号付きバイトの絶対値の合計」が最小のフィルタを選ぶ
+    """
+    h = raw.shape[0]
+    filtered = filtered or filter_rows(raw, bpp)
+
+    if filter_name == "adaptive":
+        scores = np.stack([
+            np.abs(filtered[t].view(np.int8).astype(np.int32)).sum(axis=1)
+            for t in range(5)
+        ])
+        choice = scores.argmin(axis=0)
+        rows = np.stack([filtered[t] for t in range(5)])[choice, np.arange(h)]
+        types = choice.astype(np.uint8)
+    else:
+        t = FILTER_TYPES[filter_name]
+        rows = filtered[t]
+        types = np.full(h, t, dtype=np.uint8)
+
+    return np.concatenate([types[:, None], rows], axis=1).tobytes()
+
+
+# ========================================
+# PNG エンコード
+# ========================================
+
+def _chunk(tag, data):
+    return (struct.pack(">I", len(data)) + tag + data
+            + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+
+def png_bytes(width, height, color_type, idat, palette=None, trns=None, icc_profile=None, extra=()):
+    """
+    チャンクを組み立てて PNG ファイルのバイト列にする（8bit 固定）
+    extra: 元のファイルから残すチャンク（長さ・CRC 込みのバイト列、PLTE の前に入れる）
+    """
+    out = [b"\x89PNG\r\n\x1a\n",
+           _chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0))]
+    if icc_profile:
+        out.append(_chunk(b"iCCP", b"ICC profile\x00\x00" + zlib.compress(icc_profile, 9)))
+    out.extend(extra)
+    if palette is not None:
+        out.append(_chunk(b"PLTE", palette))
+    if trns:
+        out.append(_chunk(b"tRNS", trns))
+    out.append(_chunk(b"IDAT", idat))
+    out.append(_chunk(b"IEND", b""))
+    return b"".join(out)
+
+
+def read_chunks(data):
+    """
+    元の PNG のビット深度と、残すチャンク（KEEP_CHUNKS）を読む
+    戻り値: (ビット深度 or None, [チャンクのバイト列, ...])
+    """
+    depth, keep = None, []
+    pos = 8
+    while pos + 8 <= len(data):
+        length, tag = struct.unpack(">I4s", data[pos:pos + 8])
+        end = pos + 12 + length
+        if tag == b"IHDR":
+            depth = data[pos + 16]
+        elif tag in KEEP_CHUNKS:
+            keep.append(data[pos:end])
+        elif tag == b"IEND":
+            break
+        pos = end
+    return depth, keep
+
+
+def palette_of(img):
+    """P モード画像の (PLTE バイト列, tRNS バイト列 or None)"""
+    indices = np.asarray(img)
+    count = int(indices.max()) + 1 if indices.size else 1
+
+    if img.palette is not None and "A" in img.palette.mode:
+        # RGBA パレット（quantize した画像など）は透明度がパレット側にある
+        table = bytes(img.getpalette("RGBA")[:count * 4]).ljust(count * 4, b"\xff")
+        palette = b"".join(table[i:i + 3] for i in range(0, len(table), 4))
+        trns = table[3::4]
+    else:
+        palette = bytes(img.getpalette("RGB")[:count * 3]).ljust(count * 3, b"\x00")
+        transparency = img.info.get("transparency")
+        if isinstance(transparency, int):
+            trns = (b"\xff" * transparency + b"\x00")[:count]
+        elif transparency:
+            trns = bytes(transparency[:count])
+        else:
+            trns = None
+    if trns:
+        trns = trns.rstrip(b"\xff") or None  # 末尾の不透明は省略できる
+    return palette, trns
+
+
+def to_exact_palette(rgba):
+    """
+    256色以下の RGBA 配列を完全一致のパレット画像にする（超えるなら None）
+    透明度を持つ色を先頭に並べて tRNS を短くする
+    """
+    flat = rgba.reshape(-1, 4)
+    packed = flat.view(np.uint32).ravel()
+    colors, inverse = np.unique(packed, return_inverse=True)
+    if len(colors) > 256:
+        return None
+
+    table = colors.view(np.uint8).reshape(-1, 4)
+    order = np.lexsort((np.arange(len(table)), table[:, 3] == 255))
+    remap = np.empty(len(order), dtype=np.uint8)
+    remap[order] = np.arange(len(order), dtype=np.uint8)
+    table = table[order]
+
+    indices = remap[inverse].reshape(rgba.shape[:2])
+    palette = table[:, :3].tobytes()
+    alphas = table[:, 3].tobytes().rstrip(b"\xff")
+    return indices, palette, alphas or None
+
+
+def candidates(img, extra=()):
+    """
+    可逆な候補エンコードを作る → [(説明, PNG バイト列), ...]
+    extra: 元のファイルから残すチャンク（Pillow の保存では残せないので、あれば Pillow の候補は作らない）
+    """
+    results = []
+
+    if not extra:
+        buf = io.BytesIO()
+        img.save(buf, "PNG", optimize=True)
+        results.append(("pillow-optimize", buf.getvalue()))
+
+    if img.mode not in COLOR_TYPES:
+        return results
+
+    icc = img.info.get("icc_profile")
+    width, height = img.size
+    layouts = []
+
+    if img.mode == "P":
+        palette, trns = palette_of(img)
+        layouts.append(("P", 3, np.asarray(img), 1, palette, trns))
+    else:
+        color_type, channels = COLOR_TYPES[img.mode]
+        arr = np.asarray(img).reshape(height, width * channels)
+        layouts.append((img.mode, color_type, arr, channels, None, None))
+
+        if img.mode in ("RGB", "RGBA"):
+            exact = to_exact_palette(np.asarray(img.convert("RGBA")))
+            if exact is not None:
+                indices, palette, trns = exact
+                layouts.append(("P", 3, indices, 1, palette, trns))
+
+    for label, color_type, raw, bpp, palette, trns in layouts:
+        raw = np.ascontiguousarray(raw.reshape(height, -1))
+        filtered = filter_rows(raw, bpp)
+        streams = {}
+        for filter_name, strategy in STRATEGIES:
+            if filter_name not in streams:
+                streams[filter_name] = filtered_stream(raw, bpp, filter_name, filtered)
+            comp = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+            idat = comp.compress(streams[filter_name]) + comp.flush()
+            data = png_bytes(width, height, color_type, idat, palette, trns, icc, extra)
+            results.append((f"{label}/{filter_name}/{STRATEGY_NAMES[strategy]}", data))
+
+    return results
+
+
+def rgba_pixels(data_or_img):
+    """比較用の RGBA 配列"""
+    img = data_or_img if isinstance(data_or_img, Image.Image) else Image.open(io.BytesIO(data_or_img))
+    return np.asarray(img.convert("RGBA"))
+
+
+def optimize_file(path, dry_run=False):
+    """
+    1ファイルを再圧縮（ワーカープロセスで実行）
+    戻り値: {"before", "after", "strategy", "note"}（strategy が None なら元のまま）
+    """
+    path = Path(path)
+    original = path.read_bytes()
+    depth, extra = read_chunks(original)
+    if depth is None or depth > 8:
+        # 16bit は Pillow が 8bit でデコードするので、一致していても精度が落ちる
+        return {"before": len(original), "after": len(original), "strategy": None,
+                "note": f"{depth}bit のため対象外"}
+    img = Image.open(io.BytesIO(original))
+    img.load()
+    reference = rgba_pixels(img)
+
+    best_name, best_data = None, original
+    for name, data in sorted(candidates(img, extra), key=lambda c: len(c[1])):
+        if len(data) >= len(best_data):
+            break
+        # デコードして1ピクセルでも違えば不採用（次に小さい候補へ）
+        if np.array_equal(rgba_pixels(data), reference):
+            best_name, best_data = name, data
+            break
+
+    if best_name and not dry_run:
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_bytes(best_data)
+        os.replace(tmp_path, path)
+
+    return {"before": len(original), "after": len(best_data), "strategy": best_name, "note": None}
+
+
+# ========================================
+# まとめて実行
+# ========================================
+
+def collect_pngs(targets):
+    """対象パス（ファイル/フォルダ）から PNG を集める（_backup などの "_" フォルダは除外）"""
+    files = []
+    for target in targets:
+        target = Path(target).resolve()
+        if target.is_file():
+            files.append(target)
+            continue
+        for path in sorted(target.rglob("*.png")):
+            if not any(part.startswith("_") for part in path.relative_to(target).parts):
+                files.append(path)
+    return files
+
+
+def optimize_paths(paths, jobs=None, cache=None, force=False, dry_run=False,
+                   report_path=REPORT_FILE, verbose=True):
+    """
+    PNG ファイル群を再圧縮して結果リストを返す（入力の順番）
+    結果: {"path", "before", "after", "strategy", "note", "skipped", "error"}
+    """
+    jobs = jobs or default_jobs()
+    cache = cache or BuildCache(CACHE_NAME)
+    key = make_key(OPTIMIZER_VERSION, [(f, STRATEGY_NAMES[s]) for f, s in STRATEGIES])
+    start = time.perf_counter()
+
+    results = []
+    tasks = []
+    for path in paths:
+        path = Path(path)
+        result = {"path": cache._rel(path), "before": None, "after": None,
+                  "strategy": None, "note": None, "skipped": False, "error": None}
+        results.append(result)
+        if not force and cache.is_fresh(path, CACHE_STAGE, key):
+            size = path.stat().st_size
+            result.update(before=size, after=size, skipped=True)
+        else:
+            tasks.append((result, path))
+
+    outputs = map_ordered(optimize_file, [(str(p), dry_run) for _, p in tasks], jobs)
+    for (result, path), (output, error) in zip(tasks, outputs):
+        if error:
+            result["error"] = error
+            continue
+        result.update(output)
+        if not dry_run:
+            cache.record(path, CACHE_STAGE, key)
+
+    if not dry_run:
+        cache.save()
+    if report_path:
+        write_report(results, report_path)
+    if verbose:
+        print_summary(results, time.perf_counter() - start, jobs)
+    return results
+
+
+def write_report(results, report_path):
+    """ファイルごとの before/after を JSON で保存"""
+    before = sum(r["before"] or 0 for r in results)
+    after = sum(r["after"] or 0 for r in results)
+    report = {
+        "generated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "total_before": before,
+        "total_after": after,
+        "files": results,
+    }
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def print_summary(results, elapsed, jobs):
+    """再圧縮したファイルと合計を表示"""
+    for r in results:
+        if r["error"]:
+            print(f"  ✗ {r['path']}: {r['error']}")
+        elif r["note"]:
+            print(f"  ・ {r['path']}: {r['note']}")
+        elif not r["skipped"] and r["strategy"]:
+            saved = 1 - r["after"] / r["before"]
+            print(f"  ✓ {r['path']}: {r['before'] / 1024:.1f}KB → {r['after'] / 1024:.1f}KB "
+                  f"(-{saved * 100:.0f}%, {r['strategy']})")
+
+    done = [r for r in results if not r["skipped"] and not r["error"]]
+    improved = sum(1 for r in done if r["strategy"])
+    skipped = sum(1 for r in results if r["skipped"])
+    errors = sum(1 for r in results if r["error"])
+    before = sum(r["before"] for r in done)
+    after = sum(r["after"] for r in done)
+
+    print(f"\n✅ {len(done)}枚チェック（{improved}枚縮小） / ⏭ {skipped}枚最新 / ❌ {errors}エラー "
+          f"({elapsed:.2f}s, {jobs} workers)")
+    if before:
+        print(f"💾 {before / 1024 / 1024:.2f}MB → {after / 1024 / 1024:.2f}MB "
+              f"(-{(before - after) / 1024 / 1024:.2f}MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PNG 可逆再圧縮")
+    parser.add_argument("targets", nargs="*", type=Path, default=[DEFAULT_TARGET],
+                        help="対象のファイル/フォルダ（省略時は assets/）")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="ワーカー数")
+    parser.add_argument("--force", action="store_true", help="キャッシュを無視して全部試す")
+    parser.add_argument("--dry-run", action="store_true", help="書き換えずにサイズだけ調べる")
+    parser.add_argument("--report", type=Path, default=REPORT_FILE, help="レポートの出力先")
+    args = parser.parse_args()
+
+    files = collect_pngs(args.targets)
+    print(f"🗜 PNG 再圧縮: {len(files)}枚")
+    optimize_paths(files, args.jobs, force=args.force, dry_run=args.dry_run,
+                   report_path=args.report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+"""
+テクスチャアトラス作成ツール（Phaser JSON-hash 形式）
+- game.js の preload で1枚ずつ読んでいる画像をまとめて、2のべき乗サイズのページに詰める
+  - characters: DOG_ASSETS × 4表情（expressionMap も反映）
+  - costumes:   assets/kisekae/isyou（costume_*）
+  - icons:      assets/icon/inu1（icon_*）
+- フレーム名は game.js のテクスチャキーそのまま（dog_1_neutral, costume_beret, icon_play ...）
+- 透明な余白はトリムして詰め、spriteSourceSize / sourceSize で元のサイズに戻す
+- 同じ内容の画像（expressionMap で同じファイルを指す表情など）は1回だけ配置
+- 詰め方は MaxRects（Best Short Side Fit）
+- ページのデコード後サイズが元の画像の合計より大きくなるグループは、
+  警告して個別テクスチャのままにする（--allow-growth で詰める）
+
+出力: assets/atlas/<グループ>_<ページ番号>.png / .json
+読み込み例: this.load.atlas('characters_0', 'assets/atlas/characters_0.png', 'assets/atlas/characters_0.json')
+
+使い方:
+    python pack_atlas.py
+    python pack_atlas.py --only characters --max-size 4096
+    python pack_atlas.py --dry-run          # 配置とレポートだけ（書き出しなし）
+    python pack_atlas.py --allow-growth     # デコード後が大きくなるグループもアトラスにする
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+GAME_JS = PROJECT_ROOT / "game.js"
+OUTPUT_DIR = PROJECT_ROOT / "assets" / "atlas"
+
+MAX_PAGE_SIZE = 2048   # モバイル WebView で安全な最大テクスチャサイズ
+PADDING = 2            # フレーム間の余白（フィルタリングのにじみ対策）
+EXPRESSIONS = ["neutral", "happy", "sad", "excited"]
+
+# グループ名 → game.js の load.image でこのフォルダを読んでいるキーをまとめる
+IMAGE_GROUPS = {
+    "costumes": "./assets/kisekae/isyou/",
+    "icons": "./assets/icon/inu1/",
+}
+
+
+# ========================================
+# game.js からフレーム一覧を作る
+# ========================================
+
+def parse_dog_assets(source):
+    """DOG_ASSETS から {id: (folder, expressionMap)} を読む"""
+    block = source[source.index("const DOG_ASSETS = {"):]
+    block = block[:block.index("\n};")]
+    dogs = {}
+    for line in block.splitlines():
+        m = re.match(r"\s*(\d+):\s*\{\s*folder:\s*'([^']+)'(.*)", line)
+        if not m or "hasImage: true" not in m.group(3):
+            continue
+        expression_map = {}
+        em = re.search(r"expressionMap:\s*\{([^}]*)\}", m.group(3))
+        if em:
+            expression_map = dict(re.findall(r"(\w+):\s*'(\w+)'", em.group(1)))
+        dogs[int(m.group(1))] = (m.group(2), expression_map)
+    return dogs
+
+
+def character_frames(source):
+    """preload と同じ規則で dog_<id>_<表情> → ファイルパス"""
+    frames = {}
+    for dog_id, (folder, expression_map) in parse_dog_assets(source).items():
+        for expr in EXPRESSIONS:
+            actual = expression_map.get(expr, expr)
+            frames[f"dog_{dog_id}_{expr}"] = PROJECT_ROOT / "assets" / "characters" / folder / f"{actual}.png"
+    return frames
+
+
+def image_frames(source, prefix_path):
+    """this.load.image('キー', '<prefix_path>...') のキー → ファイルパス"""
+    pattern = r"this\.load\.image\('([^']+)',\s*'(" + re.escape(prefix_path) + r"[^']+)'\)"
+    return {key: PROJECT_ROOT / path for key, path in re.findall(pattern, source)}
+
+
+def collect_groups():
+    """グループ名 → {フレーム名: ファイルパス}"""
+    source = GAME_JS.read_text(encoding="utf-8")
+    groups = {"characters": character_frames(source)}
+    for name, prefix_path in IMAGE_GROUPS.items():
+        groups[name] = image_frames(source, prefix_path)
+    return groups
+
+
+# ========================================
+# MaxRects パッカー
+# ========================================
+
+class MaxRectsBin:
+    """
+    1ページ分の MaxRects ビン
+    空き領域を重なりありの矩形リストで持ち、置くたびに分割・包含除去する
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.free = [(0, 0, width, height)]
+        self.used_area = 0
+
+    def find(self, w, h):
+        """Best Short Side Fit で置ける位置 (x, y) を探す（なければ None）"""
+        best = None
+        best_score = None
+        for fx, fy, fw, fh in self.free:
+            if w <= fw and h <= fh:
+                score = (min(fw - w, fh - h), max(fw - w, fh - h))
+                if best_score is None or score < best_score:
+                    best, best_score = (fx, fy), score
+        return best
+
+    def place(self, x, y, w, h):
+        """(x, y, w, h) を使用済みにして空き領域を更新"""
+        new_free = []
+        for free in self.free:
+            new_free.extend(self._split(free, (x, y, w, h)))
+        self.free = self._prune(new_free)
+        self.used_area += w * h
+
+    @staticmethod
+    def _split(free, used):
+        fx, fy, fw, fh = free
+        ux, uy, uw, uh = used
+        if ux >= fx + fw or ux + uw <= fx or uy >= fy + fh or uy + uh <= fy:
+            return [free]
+        parts = []
+        if ux > fx:
+            parts.append((fx, fy, ux - fx, fh))
+        if ux + uw < fx + fw:
+            parts.append((ux + uw, fy, fx + fw - (ux + uw), fh))
+        if uy > fy:
+            parts.append((fx, fy, fw, uy - fy))
+        if uy + uh < fy + fh:
+            parts.append((fx, uy + uh, fw, fy + fh - (uy + uh)))
+        return parts
+
+    @staticmethod
+    def _prune(rects):
+        """他の空き矩形に完全に含まれる矩形を捨てる"""
+        rects = sorted(set(rects), key=lambda r: r[2] * r[3], reverse=True)
+        kept = []
+        for r in rects:
+            rx, ry, rw, rh = r
+            if not any(rx >= kx and ry >= ky and rx + rw <= kx + kw and ry + rh <= ky + kh
+                       for kx, ky, kw, kh in kept):
+                kept.append(r)
+        return kept
+
+
+def next_pow2(n):
+    """n 以上で最小の2のべき乗"""
+    p = 1
+    while p < n:
+        p *= 2
+    return p
+
+
+def pack(sizes, max_size=MAX_PAGE_SIZE, padding=PADDING):
+    """
+    sizes: [(w, h), ...] を max_size 四方のページに詰める
+    戻り値: (配置リスト [(page, x, y), ...], ページサイズ [(w, h), ...])
+    ページサイズは使った範囲を覆う最小の2のべき乗に縮める
+    """
+    order = sorted(range(len(sizes)), key=lambda i: (max(sizes[i]), sizes[i][0] * sizes[i][1]), reverse=True)
+    bins = []
+    placements = [None] * len(sizes)
+    extents = []
+
+    for i in order:
+        w, h = sizes[i][0] + padding, sizes[i][1] + padding
+        if w > max_size or h > max_size:
+            raise ValueError(f"{sizes[i][0]}x{sizes[i][1]} はページ ({max_size}px) に入りません")
+        for page, b in enumerate(bins):
+            pos = b.find(w, h)
+            if pos:
+                break
+        else:
+            bins.append(MaxRectsBin(max_size, max_size))
+            extents.append([0, 0])
+            page, b = len(bins) - 1, bins[-1]
+            pos = b.find(w, h)
+        b.place(pos[0], pos[1], w, h)
+        placements[i] = (page, pos[0], pos[1])
+        extents[page][0] = max(extents[page][0], pos[0] + sizes[i][0])
+        extents[page][1] = max(extents[page][1], pos[1] + sizes[i][1])
+
+    page_sizes = [(next_pow2(ew), next_pow2(eh)) for ew, eh in extents]
+
+    # 最後のページ（と1ページだけのグループ）はスカスカになりやすいので、
+    # もっと小さい2のべき乗サイズに入り直せないか試す
+    for page, b in enumerate(bins):
+        members = [i for i in order if placements[i][0] == page]
+        for pw, ph in _smaller_pages(page_sizes[page], b.used_area):
+            repacked = _pack_single(members, sizes, pw, ph, padding)
+            if repacked:
+                for i, (x, y) in repacked.items():
+                    placements[i] = (page, x, y)
+                page_sizes[page] = (pw, ph)
+                break
+
+    return placements, page_sizes
+
+
+def _smaller_pages(current, used_area):
+    """current より小さく、used_area が入りうる2のべき乗サイズ（面積の小さい順）"""
+    cw, ch = current
+    candidates = []
+    w = 1
+    while w <= cw:
+        h = 1
+        while h <= ch:
+            if w * h < cw * ch and w * h >= used_area and max(w, h) <= 2 * min(w, h):
+                candidates.append((w * h, max(w, h), w, h))
+            h *= 2
+        w *= 2
+    return [(w, h) for _, _, w, h in sorted(candidates)]
+
+
+def _pack_single(members, sizes, width, height, padding):
+    """members を width x height の1ページに全部詰める（入らなければ None）"""
+    b = MaxRectsBin(width + padding, height + padding)
+    positions = {}
+    for i in members:
+        w, h = sizes[i][0] + padding, sizes[i][1] + padding
+        pos = b.find(w, h)
+        if pos is None:
+            return None
+        b.place(pos[0], pos[1], w, h)
+        positions[i] = pos
+    return positions
+
+
+# ========================================
+# アトラス作成
+# ========================================
+
+def load_sprite(path):
+    """画像を読み込み、透明な余白をトリムする → (トリム後画像, 元サイズ, トリム位置)"""
+    img = Image.open(path).convert("RGBA")
+    bbox = img.getchannel("A").getbbox() or (0, 0, 1, 1)
+    return img.crop(bbox), img.size, bbox[:2]
+
+
+def write_page(canvas, atlas, output_dir, page_name):
+    """ページ画像と JSON を書き出す（PNG 圧縮は GIL を離すのでスレッドで並列化できる）"""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    canvas.save(output_dir / f"{page_name}.png", "PNG", optimize=True)
+    with open(output_dir / f"{page_name}.json", "w", encoding="utf-8") as f:
+        json.dump(atlas, f, ensure_ascii=False, indent=1)
+
+
+def build_group(name, frames, output_dir=OUTPUT_DIR, max_size=MAX_PAGE_SIZE,
+                padding=PADDING, write=True, jobs=None, allow_growth=False):
+    """
+    1グループをアトラスにする
+    ページのデコード後サイズが元の画像（重複除外後）の合計を超えるときは、
+    allow_growth でなければ書き出さない（report["skipped"] = True）
+    戻り値: レポート用の dict（ページ数・充填率・デコード後バイト数など）
+    """
+    sprites = []          # 配置する画像（内容の重複は除く）
+    frame_sprite = {}     # フレーム名 → sprites のインデックス
+    by_digest = {}
+    missing = []
+    source_bytes = 0
+
+    for frame_name, path in frames.items():
+        if not path.exists():
+            missing.append(frame_name)
+            continue
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        if digest not in by_digest:
+            trimmed, source_size, offset = load_sprite(path)
+            by_digest[digest] = len(sprites)
+            sprites.append((trimmed, source_size, offset))
+            source_bytes += source_size[0] * source_size[1] * 4
+        frame_sprite[frame_name] = by_digest[digest]
+
+    report = {
+        "group": name,
+        "frames": len(frame_sprite),
+        "unique": len(sprites),
+        "missing": missing,
+        "pages": [],
+        "skipped": False,
+        "unique_decoded_bytes": source_bytes,
+        "source_decoded_bytes": sum(
+            sprites[i][1][0] * sprites[i][1][1] * 4 for i in frame_sprite.values()
+        ),
+    }
+    if not sprites:
+        return report
+
+    placements, page_sizes = pack([s[0].size for s in sprites], max_size, padding)
+    if not allow_growth and sum(pw * ph * 4 for pw, ph in page_sizes) > source_bytes:
+        # 余白のぶんメモリが増えるだけなので個別テクスチャのまま
+        write = False
+        report["skipped"] = True
+    pool = ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1)
+    writes = []
+
+    for page, (pw, ph) in enumerate(page_sizes):
+        page_name = f"{name}_{page}"
+        members = [i for i, p in enumerate(placements) if p[0] == page]
+        used = sum(sprites[i][0].width * sprites[i][0].height for i in members)
+        report["pages"].append({
+            "name": page_name,
+            "size": [pw, ph],
+            "sprites": len(members),
+            "fill": used / (pw * ph),
+            "decoded_bytes": pw * ph * 4,
+        })
+        if not write:
+            continue
+
+        canvas = Image.new("RGBA", (pw, ph), (0, 0, 0, 0))
+        for i in members:
+            _, x, y = placements[i]
+            canvas.paste(sprites[i][0], (x, y))
+
+        atlas_frames = {}
+        for frame_name, i in frame_sprite.items():
+            if placements[i][0] != page:
+                continue
+            trimmed, (sw, sh), (ox, oy) = sprites[i]
+            _, x, y = placements[i]
+            atlas_frames[frame_name] = {
+                "frame": {"x": x, "y": y, "w": trimmed.width, "h": trimmed.height},
+                "rotated": False,
+                "trimmed": trimmed.size != (sw, sh),
+                "spriteSourceSize": {"x": ox, "y": oy, "w": trimmed.width, "h": trimmed.height},
+                "sourceSize": {"w": sw, "h": sh},
+            }
+
+        atlas = {
+            "frames": atlas_frames,
+            "meta": {
+                "app": "inusanpo pack_atlas.py",
+                "image": f"{page_name}.png",
+                "format": "RGBA8888",
+                "size": {"w": pw, "h": ph},
+                "scale": "1",
+            },
+        }
+        writes.append(pool.submit(write_page, canvas, atlas, output_dir, page_name))
+
+    for future in writes:
+        future.result()
+    pool.shutdown()
+
+    report["atlas_decoded_bytes"] = sum(p["decoded_bytes"] for p in report["pages"])
+    return report
+
+
+def print_report(reports):
+    """グループごとのページ数・充填率・デコード後サイズを表示"""
+    total_requests_before = 0
+    total_requests_after = 0
+    total_before = 0
+    total_after = 0
+
+    for r in reports:
+        print(f"\n[Atlas] {r['group']}: {r['frames']}フレーム（重複除外後 {r['unique']}枚）")
+        for name in r["missing"]:
+            print(f"  ⚠ 画像が見つかりません: {name}")
+        for p in r["pages"]:
+            print(f"  📄 {p['name']}: {p['size'][0]}x{p['size'][1]} "
+                  f"{p['sprites']}枚 充填率 {p['fill'] * 100:.1f}% "
+                  f"({p['decoded_bytes'] / 1024 / 1024:.1f}MB)")
+        if r["skipped"]:
+            print(f"  ⚠ デコード後 {r['unique_decoded_bytes'] / 1024 / 1024:.1f}MB → "
+                  f"{r['atlas_decoded_bytes'] / 1024 / 1024:.1f}MB に増えるので個別テクスチャのまま"
+                  f"（詰めるには --allow-growth）")
+            total_requests_before += r["frames"]
+            total_requests_after += r["frames"]
+            total_before += r["source_decoded_bytes"]
+            total_after += r["source_decoded_bytes"]
+        elif r["pages"]:
+            before = r["source_decoded_bytes"]
+            after = r["atlas_decoded_bytes"]
+            fill = sum(p["fill"] * p["decoded_bytes"] for p in r["pages"]) / after
+            print(f"  → {len(r['pages'])}ページ / 充填率 {fill * 100:.1f}% / "
+                  f"デコード後 {before / 1024 / 1024:.1f}MB → {after / 1024 / 1024:.1f}MB")
+            total_requests_before += r["frames"]
+            total_requests_after += len(r["pages"])
+            total_before += before
+            total_after += after
+
+    print("\n" + "=" * 60)
+    print(f"📦 リクエスト数: {total_requests_before} → {total_requests_after}（JSON は別に同数）")
+    print(f"🧠 デコード後テクスチャ: {total_before / 1024 / 1024:.1f}MB → {total_after / 1024 / 1024:.1f}MB")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Phaser 用テクスチャアトラス作成")
+    parser.add_argument("--only", nargs="+", help="作成するグループ（characters / costumes / icons）")
+    parser.add_argument("--max-size", type=int, default=MAX_PAGE_SIZE, help="ページの最大サイズ（2のべき乗）")
+    parser.add_argument("--padding", type=int, default=PADDING, help="フレーム間の余白 px")
+    parser.add_argument("--output", type=Path, default=OUTPUT_DIR, help="出力フォルダ")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="PNG 書き出しの並列数")
+    parser.add_argument("--dry-run", action="store_true", help="書き出さずにレポートだけ表示")
+    parser.add_argument("--allow-growth", action="store_true",
+                        help="デコード後サイズが元より大きくなるグループもアトラスにする")
+    args = parser.parse_args()
+
+    groups = collect_groups()
+    names = args.only or list(groups)
+    for name in names:
+        if name not in groups:
+            parser.error(f"不明なグループ: {name}（{', '.join(groups)}）")
+
+    reports = [
+        build_group(name, groups[name], args.output, args.max_size, args.padding,
+                    not args.dry_run, args.jobs, args.allow_growth)
+        for name in names
+    ]
+    print_report(reports)
+
+
+if __name__ == "__main__":
+    main()
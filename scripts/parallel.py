@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+画像・音声処理の並列実行ヘルパー
+- プロセスプールで1ファイル1タスクを並列実行し、入力と同じ順番で結果を返す
+- 1タスクの例外は全体を止めずにエラーとして返す（エラー件数の集計用）
+- jobs=1 ならプールを作らずその場で実行（デバッグ・小さいバッチ用）
+
+ワーカー関数はモジュールのトップレベルに定義すること
+（Windows の spawn 方式でも子プロセスから import できるように）
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+def default_jobs():
+    """既定のワーカー数（CPU コア数）"""
+    return os.cpu_count() or 1
+
+
+def parse_jobs(argv, default=None):
+    """sys.argv 形式の引数から --jobs N / -j N を読む（無ければ default）"""
+    for flag in ("--jobs", "-j"):
+        if flag in argv:
+            idx = argv.index(flag)
+            if idx + 1 < len(argv):
+                return int(argv[idx + 1])
+    return default
+
+
+def _call(func, args):
+    try:
+        return func(*args), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def map_ordered(func, tasks, jobs=None, executor="process"):
+    """
+    tasks（引数タプルのリスト）に func を適用し、
+    入力と同じ順番で (結果, エラー文字列 or None) のリストを返す
+    executor: "process"（CPU処理向け）/ "thread"（I/O・GIL解放処理向け）
+    """
+    tasks = [tuple(t) for t in tasks]
+    jobs = min(jobs or default_jobs(), max(len(tasks), 1))
+
+    if jobs <= 1:
+        return [_call(func, args) for args in tasks]
+
+    pool_class = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    with pool_class(max_workers=jobs) as pool:
+        futures = [pool.submit(_call, func, args) for args in tasks]
+        return [f.result() for f in futures]
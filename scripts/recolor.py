@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+キャラクター画像の色変換エンジン（キンピカ・シルバーなど）
+- make_golden.py の ImageEnhance / blend / point の連鎖を NumPy の1パス処理にまとめたもの
+  1. 彩度（Color）: グレーとのブレンド → (輝度, 値) の 256x256 テーブルで表せる
+  2. 明るさ → コントラスト → 色のオーバーレイ → チャンネル倍率 → 明るさ
+     → 全部1チャンネルの値だけで決まる LUT なので、1. のテーブルに畳み込む
+     → 画素ごとの処理は「輝度を計算してテーブルを1回引く」だけ
+     （コントラストの基準値は画像の平均輝度なので、テーブルは画像ごとに作る）
+  3. パレット画像（リポジトリの PNG はほぼこれ）は 256 色だけ変換して展開する
+- アルファチャンネルには一切触らない
+- 計算は Pillow の C 実装と同じ float32・切り捨てで再現しているので、
+  gold プリセットの結果は make_golden.py の旧処理とピクセル単位で一致する（--verify で確認）
+
+使い方:
+    python recolor.py --list
+    python recolor.py gold ../assets/characters/dog_29_goldenwanko
+    python recolor.py silver ../assets/characters/dog_* -o ../_preview/silver
+    python recolor.py gold ../assets/characters/dog_29_goldenwanko --verify
+"""
+
+import argparse
+import colorsys
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from backup_store import backup_before_write
+from parallel import map_ordered
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+EXPRESSIONS = ["neutral", "happy", "sad", "excited"]
+BACKUP_TOOL = "recolor"  # バックアップ置き場での名前（backup_store.py）
+
+# RGBA 1画素を 32bit 整数として扱う型（バイト順 R, G, B, A に固定）
+PIXEL = np.dtype("<u4")
+
+# プリセット
+# saturation / brightness / contrast: ImageEnhance の倍率（1.0 = そのまま）
+# tint: オーバーレイ色（"rainbow" なら横方向の虹色グラデーション）、tint_amount: ブレンド率
+# gains: チャンネル倍率 (R, G, B)、final_brightness: 最後の明るさ
+PRESETS = {
+    "gold": {
+        "saturation": 1.3,
+        "brightness": 1.15,
+        "contrast": 1.1,
+        "tint": (255, 215, 0),
+        "tint_amount": 0.25,
+        "gains": (1.1, 1.05, 0.7),
+        "final_brightness": 1.1,
+    },
+    "silver": {
+        "saturation": 0.0,
+        "brightness": 1.1,
+        "contrast": 1.15,
+        "tint": (220, 225, 235),
+        "tint_amount": 0.2,
+        "gains": (1.0, 1.0, 1.05),
+        "final_brightness": 1.05,
+    },
+    "bronze": {
+        "saturation": 1.1,
+        "brightness": 1.05,
+        "contrast": 1.1,
+        "tint": (205, 127, 50),
+        "tint_amount": 0.3,
+        "gains": (1.1, 0.95, 0.8),
+        "final_brightness": 1.0,
+    },
+    "rainbow-tint": {
+        "saturation": 1.2,
+        "brightness": 1.1,
+        "contrast": 1.05,
+        "tint": "rainbow",
+        "tint_amount": 0.3,
+        "gains": (1.0, 1.0, 1.0),
+        "final_brightness": 1.05,
+    },
+}
+
+
+# ========================================
+# Pillow と同じ丸めの基本演算
+# ========================================
+
+def blend(in1, in2, alpha):
+    """
+    Image.blend と同じ計算（float32、0〜1 の外は 0〜255 にクリップして切り捨て）
+    in1, in2 は整数配列（ブロードキャスト可）
+    """
+    diff = (np.asarray(in2, dtype=np.int32) - np.asarray(in1, dtype=np.int32)).astype(np.float32)
+    t = np.asarray(in1, dtype=np.float32) + np.float32(alpha) * diff
+    if not 0.0 <= alpha <= 1.0:
+        t = np.clip(t, 0, 255)
+    return t.astype(np.uint8)
+
+
+# RGB → L の固定小数点係数（Pillow の Convert.c と同じ、丸めの 0x8000 は R 側に含める）
+LUMA_R = np.arange(256, dtype=np.uint32) * 19595 + 0x8000
+LUMA_G = np.arange(256, dtype=np.uint32) * 38470
+LUMA_B = np.arange(256, dtype=np.uint32) * 7471
+
+
+def luma(rgb):
+    """RGB → L 変換（Pillow と同じ固定小数点、掛け算は LUT で済ませる）"""
+    total = LUMA_R.take(rgb[..., 0]) + LUMA_G.take(rgb[..., 1]) + LUMA_B.take(rgb[..., 2])
+    return (total >> 16).astype(np.uint8)
+
+
+def saturation_table(factor):
+    """彩度調整の (輝度, 値) → 値 テーブル (256, 256)"""
+    values = np.arange(256, dtype=np.int32)
+    return blend(values[:, None], values[None, :], factor)
+
+
+def gain_lut(gain):
+    """point(lambda x: min(255, int(x * gain))) と同じ LUT"""
+    return np.array([min(255, int(x * gain)) for x in range(256)], dtype=np.uint8)
+
+
+# ========================================
+# LUT の組み立て
+# ========================================
+
+def contrast_mean(lum, weights=None):
+    """
+    ImageEnhance.Contrast の基準値（輝度 L の平均を四捨五入）
+    weights を渡すと各色の画素数として重み付き平均（パレット画像用）
+    """
+    lum = np.asarray(lum).ravel().astype(np.int64)
+    if weights is None:
+        return int(int(lum.sum()) / lum.size + 0.5)
+    weights = np.asarray(weights, dtype=np.int64).ravel()
+    return int(int((lum * weights).sum()) / int(weights.sum()) + 0.5)
+
+
+def pre_lut(preset, mean):
+    """明るさ → コントラスト の LUT（全チャンネル共通）"""
+    values = np.arange(256, dtype=np.uint8)
+    lut = blend(0, values, preset["brightness"])
+    return blend(mean, lut, preset["contrast"])
+
+
+def post_luts(preset):
+    """チャンネル倍率 → 最後の明るさ の LUT (3, 256)"""
+    return np.stack([
+        blend(0, gain_lut(gain), preset["final_brightness"])
+        for gain in preset["gains"]
+    ])
+
+
+def rainbow_overlay(width):
+    """横方向の虹色グラデーション (1, width, 3)"""
+    colors = [colorsys.hsv_to_rgb(x / max(width, 1), 0.6, 1.0) for x in range(width)]
+    return (np.array(colors) * 255).astype(np.uint8)[None, :, :]
+
+
+def recolor_array(rgba, preset, weights=None):
+    """
+    RGBA 配列 (h, w, 4) uint8 に色変換をかけた新しい配列を返す（アルファはそのまま）
+    preset: PRESETS のキーか設定 dict
+    weights: 各画素が表す画素数（パレットの色を変換するとき用。形は (h, w)）
+    """
+    if isinstance(preset, str):
+        preset = PRESETS[preset]
+    rgba = np.ascontiguousarray(rgba)
+    rgb = rgba[:, :, :3]
+
+    # 1. 彩度は (輝度, 値) で決まる → 以降の LUT も全部このテーブルに畳み込める
+    #    インデックス = 輝度 * 256 + 値 をチャンネルごとに1回だけ作り、あとは take で引く
+    table = saturation_table(preset["saturation"]).astype(PIXEL).ravel()
+    base = luma(rgb).astype(PIXEL) << 8
+    index = [base | rgb[:, :, c] for c in range(3)]
+
+    # 2. コントラストの基準は「彩度・明るさ調整後」の平均輝度
+    #    （明るさと輝度の係数もテーブルに畳み込んで、各チャンネル1回ずつ引く）
+    brightened = blend(0, np.arange(256), preset["brightness"]).astype(PIXEL)[table]
+    coefficients = [(19595, 0x8000), (38470, 0), (7471, 0)]
+    total = sum((brightened * k + r).take(index[c]) for c, (k, r) in enumerate(coefficients))
+    mean = contrast_mean(total >> 16, weights)
+    lut = pre_lut(preset, mean)
+    post = post_luts(preset)
+
+    alpha = rgba.view(PIXEL)[:, :, 0] & 0xFF000000
+    if preset["tint"] == "rainbow":
+        # 位置で色が変わるオーバーレイはブレンドを1回だけ行う
+        overlay = rainbow_overlay(rgba.shape[1])
+        toned = lut.astype(PIXEL)[table]
+        out = alpha
+        for c in range(3):
+            mixed = blend(toned.take(index[c]), overlay[:, :, c], preset["tint_amount"])
+            out = out | (post[c].astype(PIXEL).take(mixed) << (8 * c))
+    else:
+        # 単色オーバーレイも LUT に畳み込む → チャンネルごとのテーブルを1回引いて RGBA に詰める
+        out = alpha
+        for c in range(3):
+            fused = post[c][blend(lut, preset["tint"][c], preset["tint_amount"])]
+            out = out | (fused.astype(PIXEL)[table] << (8 * c)).take(index[c])
+    return out.view(np.uint8).reshape(rgba.shape)
+
+
+def palette_colors(img):
+    """P モード画像の 256 色を、img.convert('RGBA') と同じ規則で RGBA にした配列 (256, 4)"""
+    strip = Image.frombytes("P", (256, 1), bytes(range(256)))
+    strip.putpalette(img.getpalette(img.palette.mode), img.palette.mode)
+    if "transparency" in img.info:
+        strip.info["transparency"] = img.info["transparency"]
+    return np.asarray(strip.convert("RGBA"))[0]
+
+
+def recolor_image(img, preset="gold"):
+    """PIL 画像に色変換をかけた RGBA 画像を返す"""
+    if isinstance(preset, str):
+        preset = PRESETS[preset]
+
+    if img.mode == "P" and preset["tint"] != "rainbow":
+        # パレット画像は 256 色だけ変換して（平均輝度は色ごとの画素数で重み付け）、
+        # 最後に画素へ展開する
+        indices = np.asarray(img)
+        counts = np.bincount(indices.ravel(), minlength=256)
+        colors = recolor_array(palette_colors(img)[:, None, :], preset, counts[:, None])
+        return Image.fromarray(colors[:, 0, :][indices], "RGBA")
+
+    rgba = np.asarray(img.convert("RGBA"))
+    return Image.fromarray(recolor_array(rgba, preset), "RGBA")
+
+
+# ========================================
+# フォルダ単位の一括処理
+# ========================================
+
+def recolor_file(src, dst, preset):
+    """1枚を変換して保存（ワーカープロセスで実行）"""
+    src, dst = Path(src), Path(dst)
+    result = recolor_image(Image.open(src), preset)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    result.save(dst, "PNG", optimize=True)
+    return result.size
+
+
+def recolor_folders(folders, preset, output_dir=None, jobs=None):
+    """
+    dog_* / legend_* フォルダの4表情を一括変換
+    output_dir を省略するとその場で上書き（元画像は backup_store.py の置き場にバックアップ）
+    """
+    tasks = []
+    for folder in folders:
+        folder = Path(folder)
+        for expr in EXPRESSIONS:
+            src = folder / f"{expr}.png"
+            if not src.exists():
+                print(f"  ⚠ {folder.name}/{expr}.png が見つかりません")
+                continue
+            dst = Path(output_dir) / folder.name / src.name if output_dir else src
+            tasks.append((src, dst, preset))
+
+    if not output_dir:
+        backup_before_write(f"{BACKUP_TOOL}_{preset}", [src for src, _, _ in tasks], jobs)
+    results = map_ordered(recolor_file, tasks, jobs)
+    errors = 0
+    for (src, dst, _), (_, error) in zip(tasks, results):
+        if error:
+            print(f"  ✗ {src.parent.name}/{src.name}: {error}")
+            errors += 1
+        else:
+            print(f"  ✨ {src.parent.name}/{src.name} → {dst}")
+    print(f"\n✅ {len(tasks) - errors}枚変換 / ❌ {errors}エラー（{preset}）")
+
+
+def verify_gold(folders):
+    """gold プリセットと make_golden.py の旧処理の結果を比較"""
+    import make_golden
+
+    mismatched = 0
+    for folder in folders:
+        for expr in EXPRESSIONS:
+            path = Path(folder) / f"{expr}.png"
+            if not path.exists():
+                continue
+            img = Image.open(path)
+            legacy = np.asarray(make_golden.make_golden_sparkle_legacy(img))
+            fused = np.asarray(recolor_image(img, "gold"))
+            diff = int((legacy != fused).any(axis=2).sum())
+            mismatched += diff > 0
+            print(f"  {'✓' if diff == 0 else '✗'} {Path(folder).name}/{expr}.png 差分 {diff}px")
+    print(f"\n{'✅ 全て一致' if mismatched == 0 else f'❌ {mismatched}枚で不一致'}")
+    return mismatched == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="キャラクター画像の色変換（プリセット）")
+    parser.add_argument("preset", nargs="?", help="プリセット名")
+    parser.add_argument("folders", nargs="*", type=Path, help="dog_* / legend_* フォルダ")
+    parser.add_argument("--output", "-o", type=Path, help="出力先（省略時は上書き + バックアップ置き場に退避）")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="ワーカー数")
+    parser.add_argument("--list", action="store_true", help="プリセット一覧")
+    parser.add_argument("--verify", action="store_true", help="gold と旧処理の一致を確認（書き込みなし）")
+    args = parser.parse_args()
+
+    if args.list or not args.preset:
+        for name, preset in PRESETS.items():
+            print(f"  {name}: {preset}")
+        return
+    if args.preset not in PRESETS:
+        parser.error(f"不明なプリセット: {args.preset}（{', '.join(PRESETS)}）")
+
+    if args.verify:
+        sys.exit(0 if verify_gold(args.folders) else 1)
+    recolor_folders(args.folders, args.preset, args.output, args.jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+デコード済みスプライトシートのキャッシュ（メモリマップ）
+- ADJUSTMENTS を調整しながら切り抜きを何度も実行すると、毎回のシートの PNG デコード
+  （と背景キーイング）が時間の大半を占める
+- デコード・モード変換・キーイングまで済ませた画素を、生の配列（.npy）として
+  .asset_cache/sheets/<キー>.npy に保存する
+  キー = PNG の内容ハッシュ + モード・キーイングなどのパラメータ + SHEET_VERSION
+- 2回目以降は np.load(mmap_mode="r") で読み取り専用にマップし、Image.frombuffer で
+  コピーせずに PIL 画像にする（L / P / RGBA）→ デコードなし
+  セルの crop はそのセルの行のページだけを読む（シート全体は読み込まない）
+- 解析用には array() で読み取り専用の配列そのもの（スライスはコピーなしのビュー）を返す
+- 配列にできるモード: L / LA / RGB / RGBA / P（P はパレットと透過色を索引に保存）
+  それ以外（1 / I;16 など）はキャッシュせず毎回デコード
+- PNG のハッシュはビルドキャッシュ（.asset_cache/sheet_cache.json）に (サイズ, 更新時刻) つきでメモ
+- 同じシートの古い内容の配列は save() のときに削除
+
+使い方:
+    python sheet_cache.py --list
+    python sheet_cache.py --clear
+"""
+
+import argparse
+import os
+import sys
+import threading
+import uuid
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from build_cache import CACHE_DIR, BuildCache, make_key
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# 保存形式を変えたら上げる（キャッシュを無効化するため）
+SHEET_VERSION = 1
+CACHE_NAME = "sheet_cache"
+SHEET_FOLDER = "sheets"
+
+ARRAY_MODES = {"L", "LA", "RGB", "RGBA", "P"}
+INFO_KEYS = ("transparency", "dpi", "gamma", "icc_profile")  # PNG 保存時に使われる info
+
+
+def _encode_info(info):
+    """画像の info を JSON にできる形に（bytes は16進文字列）"""
+    encoded = {}
+    for name in INFO_KEYS:
+        value = info.get(name)
+        if isinstance(value, bytes):
+            encoded[name] = {"hex": value.hex()}
+        elif isinstance(value, tuple):
+            encoded[name] = {"tuple": list(value)}
+        elif isinstance(value, (int, float, str)):
+            encoded[name] = value
+    return encoded
+
+
+def _decode_info(encoded):
+    info = {}
+    for name, value in encoded.items():
+        if isinstance(value, dict) and "hex" in value:
+            info[name] = bytes.fromhex(value["hex"])
+        elif isinstance(value, dict) and "tuple" in value:
+            info[name] = tuple(value["tuple"])
+        else:
+            info[name] = value
+    return info
+
+
+def to_image(array, entry):
+    """マップした配列から PIL 画像を作る（L / P / RGBA はコピーなし、読み取り専用）"""
+    height, width = array.shape[:2]
+    mode = entry["mode"]
+    img = Image.frombuffer(mode, (width, height), array, "raw", mode, 0, 1)
+    if mode == "P":
+        img.putpalette(entry["palette"], entry["palette_mode"])
+    img.info.update(_decode_info(entry["info"]))
+    return img
+
+
+class SheetCache:
+    """
+    デコード済みシートの配列キャッシュ
+
+    results: { キー: {"source", "sha256", "mode", "shape", "info", ("palette", "palette_mode")} }
+    配列本体は SHEET_FOLDER/<キー>.npy
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.index = BuildCache(CACHE_NAME, cache_dir)
+        self.dir = Path(cache_dir) / SHEET_FOLDER
+        self.hits = 0
+        self.misses = 0
+        self._current = {}  # {シートの相対パス: 今回使ったキーの set}
+        self._lock = threading.Lock()
+
+    def sheet_key(self, source, params=None):
+        return make_key("sheet", SHEET_VERSION, self.index.digest(source), params)
+
+    def _path(self, key):
+        return self.dir / f"{key}.npy"
+
+    def _map(self, key):
+        """キャッシュの配列をマップ（無い・壊れていれば None）"""
+        entry = self.index.lookup(key)
+        path = self._path(key)
+        if entry is None or not path.exists():
+            return None, None
+        try:
+            array = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None, None
+        if list(array.shape) != entry["shape"]:
+            return None, None
+        return array, entry
+
+    def _store(self, img, source, key):
+        """デコードした画像を配列で保存（配列にできないモードは保存しない）"""
+        if img.mode not in ARRAY_MODES:
+            return
+        array = np.asarray(img)
+        entry = {
+            "source": self.index._rel(source),
+            "sha256": self.index.digest(source),
+            "mode": img.mode,
+            "shape": list(array.shape),
+            "info": _encode_info(img.info),
+        }
+        if img.mode == "P":
+            entry["palette_mode"] = img.palette.mode
+            entry["palette"] = img.getpalette(rawmode=img.palette.mode)
+
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.dir / f"{uuid.uuid4().hex}.npy.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, self._path(key))
+        self.index.store(key, entry)
+
+    def _use(self, source, key, hit):
+        with self._lock:
+            self._current.setdefault(self.index._rel(source), set()).add(key)
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def load(self, source, decode, params=None):
+        """
+        シートの PIL 画像（キャッシュにあればマップ、無ければ decode() して保存）
+        params: decode の結果を決めるパラメータ（モード・キーイングの設定など）
+        """
+        key = self.sheet_key(source, params)
+        array, entry = self._map(key)
+        if array is not None:
+            self._use(source, key, True)
+            return to_image(array, entry)
+        img = decode()
+        self._store(img, source, key)
+        self._use(source, key, False)
+        return img
+
+    def array(self, source, decode, params=None):
+        """
+        シートの読み取り専用の配列（キャッシュにあればマップしたもの）と mode
+        スライス（array[top:bottom, left:right]）はコピーなしのビュー
+        """
+        key = self.sheet_key(source, params)
+        array, entry = self._map(key)
+        if array is None:
+            img = decode()
+            self._store(img, source, key)
+            array, entry = self._map(key)
+            if array is None:
+                # 配列にできないモード
+                self._use(source, key, False)
+                array = np.asarray(img)
+                array.flags.writeable = False
+                return array, img.mode
+            self._use(source, key, False)
+        else:
+            self._use(source, key, True)
+        return array, entry["mode"]
+
+    def save(self):
+        """
+        インデックスを保存し、今回使ったシートの古い内容の配列を削除
+        （今回使っていないシートの配列は残す）
+        """
+        keep = []
+        for key, entry in self.index.results.items():
+            current = self._current.get(entry["source"])
+            if current is None or key in current:
+                keep.append(key)
+                continue
+            try:
+                self._path(key).unlink()
+            except OSError:
+                # Windows でマップ中のファイルは消せないので次回に回す
+                keep.append(key)
+        self.index.prune_results(keep)
+        self.index.save()
+
+    def entries(self):
+        """[(キー, エントリ, バイト数)]（シートの名前順）"""
+        rows = []
+        for key, entry in self.index.results.items():
+            path = self._path(key)
+            rows.append((key, entry, path.stat().st_size if path.exists() else 0))
+        rows.sort(key=lambda row: row[1]["source"])
+        return rows
+
+    def clear(self):
+        """全ての配列とインデックスを削除。戻り値: 削除したバイト数"""
+        freed = 0
+        for path in self.dir.glob("*.npy*") if self.dir.exists() else []:
+            freed += path.stat().st_size
+            path.unlink()
+        self.index.clear()
+        self.index.save()
+        return freed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="デコード済みシートのキャッシュの管理")
+    parser.add_argument("--list", action="store_true", help="キャッシュしているシートの一覧")
+    parser.add_argument("--clear", action="store_true", help="全て削除")
+    args = parser.parse_args()
+
+    cache = SheetCache()
+    if args.clear:
+        freed = cache.clear()
+        print(f"🧹 {freed / 1024 / 1024:.1f}MB を削除")
+        return
+
+    rows = cache.entries()
+    for key, entry, size in rows:
+        shape = "x".join(str(n) for n in entry["shape"])
+        print(f"  {entry['source']:<70} {entry['mode']:<5} {shape:<14} {size / 1024 / 1024:7.1f}MB")
+    total = sum(size for _, _, size in rows)
+    print(f"\n📦 {len(rows)}シート / {total / 1024 / 1024:.1f}MB（{cache.dir}）")
+
+
+if __name__ == "__main__":
+    main()
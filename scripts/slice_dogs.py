@@ -4,11 +4,18 @@
 20種類の犬を各4表情で切り抜いて保存
 """
 
-from PIL import Image
 from pathlib import Path
+import sys
+
+import sprite_slicer
+from build_cache import BuildCache
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
 
 # ベースパス
-BASE_DIR = Path(r"C:\Users\janne\Documents\APP-KEROFEN\inusanpo")
+BASE_DIR = Path(__file__).resolve().parent.parent
 SOURCE_DIR = BASE_DIR / "assets" / "gazou" / "wanko"
 OUTPUT_DIR = BASE_DIR / "assets" / "characters"
 
@@ -69,6 +76,7 @@ IMAGE_CONFIG = {
 INSET_PX = 1
 
 # 微調整用の追加トリム量（必要な犬だけ設定）
+# python grid_detect.py --only dogs で、検出したセルの境目を trim に直した値と比べられる
 # 例:
 # ADJUSTMENTS = {
 #     ("dalmatian", "sad"): {"left": 0, "top": 0, "right": 2, "bottom": 0},
@@ -116,13 +124,45 @@ ADJUSTMENTS = {
     ("papillon", "excited"): {"left": 10, "right": 10, "top": 10, "bottom": 10},
 }
 
-def main():
+def build_manifest():
+    """切り抜きマニフェストを作成（sprite_slicer 用）"""
+    # 切り抜き後に center_dogs.py で中央配置するので、その設定もキャッシュキーに含める
+    # （OUTPUT_SIZE / PADDING_RATIO を変えたら切り抜きからやり直す）
+    center_dogs = sprite_slicer.load_script("assets/characters/center_dogs.py")
+    center_params = center_dogs.center_params()
+
+    # 犬種ごとの出力先マッピングを作成
+    dog_info = {dog_en: dog_id for dog_id, dog_en, dog_ja in DOG_LIST}
+
+    sheets = []
+    for file_name, config in IMAGE_CONFIG.items():
+        cells = []
+        for dog_idx, dog_en in enumerate(config["dogs"]):
+            # 出力フォルダ（連番で命名）
+            dog_folder = OUTPUT_DIR / f"dog_{str(dog_info[dog_en]).zfill(2)}_{dog_en}"
+            for expr_idx, expression in enumerate(EXPRESSIONS):
+                cells.append(sprite_slicer.cell(
+                    dog_idx, expr_idx, dog_folder / f"{expression}.png",
+                    trim=ADJUSTMENTS.get((dog_en, expression)),
+                ))
+        # 全て 4x4 グリッド、内側に INSET_PX 切り込む（透過処理はしない）
+        sheets.append(sprite_slicer.sheet(SOURCE_DIR / file_name, 4, 4, cells, inset=INSET_PX,
+                                          cache_params=center_params))
+    return sheets
+
+
+def main(jobs=None, force=False):
+    """
+    切り抜きを実行
+    シートと切り抜き設定が前回と同じ画像はスキップ（ビルドキャッシュ）
+    force=True なら既存の dog_ フォルダを削除して全て作り直す
+    """
     print("=" * 60)
     print("DOG CHARACTER IMAGE SLICER - FINAL")
     print("=" * 60)
     
     # 既存のcharactersフォルダをクリア（dog_で始まるフォルダのみ）
-    if OUTPUT_DIR.exists():
+    if force and OUTPUT_DIR.exists():
         import shutil
         for item in OUTPUT_DIR.iterdir():
             if item.is_dir() and item.name.startswith("dog_"):
@@ -131,79 +171,11 @@ def main():
     
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     
-    # 犬種ごとの出力先マッピングを作成
-    dog_info = {dog_en: (dog_id, dog_ja) for dog_id, dog_en, dog_ja in DOG_LIST}
-    
-    all_results = []
-    processed_dogs = set()
-    
-    # 各画像を処理
-    for file_name, config in IMAGE_CONFIG.items():
-        print(f"\n[File] {file_name}")
-        source_path = SOURCE_DIR / file_name
-        
-        if not source_path.exists():
-            print(f"  WARNING: File not found: {file_name}")
-            continue
-        
-        img = Image.open(source_path)
-        width, height = img.size
-        dogs = config["dogs"]
-        
-        # 全て 4x4 グリッド
-        rows, cols = 4, 4
-        cell_width = width // cols
-        cell_height = height // rows
-        
-        print(f"  Image size: {width}x{height}, Grid: {rows}x{cols}")
-        print(f"  Cell size: {cell_width}x{cell_height}, Inset: {INSET_PX}px")
-        
-        for dog_idx, dog_en in enumerate(dogs):
-            dog_id, dog_ja = dog_info[dog_en]
-            print(f"  [{dog_id:02d}] {dog_ja} ({dog_en})")
-            
-            # 出力フォルダを作成（連番で命名）
-            dog_folder = OUTPUT_DIR / f"dog_{str(dog_id).zfill(2)}_{dog_en}"
-            dog_folder.mkdir(parents=True, exist_ok=True)
-            
-            for expr_idx, expression in enumerate(EXPRESSIONS):
-                # 切り抜き座標を計算（内側に1px切り込む）
-                base_left = expr_idx * cell_width + INSET_PX
-                base_top = dog_idx * cell_height + INSET_PX
-                base_right = base_left + cell_width - (INSET_PX * 2)
-                base_bottom = base_top + cell_height - (INSET_PX * 2)
-
-                # 個別微調整
-                adj = ADJUSTMENTS.get((dog_en, expression), {})
-                left = base_left + adj.get("left", 0)
-                top = base_top + adj.get("top", 0)
-                right = base_right - adj.get("right", 0)
-                bottom = base_bottom - adj.get("bottom", 0)
-
-                # 安全チェック
-                left = max(0, left)
-                top = max(0, top)
-                right = min(width, right)
-                bottom = min(height, bottom)
-
-                # 切り抜き（透過処理はしない）
-                cell = img.crop((left, top, right, bottom))
-                
-                # 保存
-                output_path = dog_folder / f"{expression}.png"
-                cell.save(output_path, "PNG")
-                
-                all_results.append({
-                    "id": dog_id,
-                    "dog_ja": dog_ja,
-                    "dog": dog_en,
-                    "expression": expression,
-                    "path": str(output_path),
-                    "size": cell.size
-                })
-                print(f"      {expression}: {cell.size[0]}x{cell.size[1]}")
-            
-            processed_dogs.add(dog_en)
+    cache = BuildCache(sprite_slicer.CACHE_NAME)
+    results = sprite_slicer.run(build_manifest(), jobs, cache=cache)
+    processed_dogs = {
+        Path(r["output"]).parent.name.split("_", 2)[2] for r in results if not r["error"]
+    }
     
     print("\n" + "=" * 60)
     print(f"COMPLETE! Processed {len(processed_dogs)} dog breeds")
@@ -215,7 +187,7 @@ def main():
     if missing:
         print(f"\nWARNING: Missing dogs: {missing}")
     
-    return all_results, len(processed_dogs)
+    return results, len(processed_dogs)
 
 if __name__ == "__main__":
-    results, count = main()
+    results, count = main(force="--force" in sys.argv)
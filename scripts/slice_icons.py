@@ -3,9 +3,10 @@
 3種類のスプライトシート（inu1, inu2, inu3）に対応
 """
 
-from PIL import Image
 import os
 
+import sprite_slicer
+
 # アイコンの名前マッピング（左上から右へ、上から下へ）
 ICON_NAMES = [
     # 1行目
@@ -36,82 +37,34 @@ ICON_NAMES = [
 # スプライトシートの種類
 SPRITE_SHEETS = ["inu1", "inu2", "inu3"]
 
-def slice_icons(input_path, output_dir, grid_size=4):
-    """
-    4x4グリッドの画像を個別のアイコンに切り抜く
-    """
-    # 画像を読み込み
-    img = Image.open(input_path)
-    width, height = img.size
-    
-    print(f"入力画像: {width}x{height}")
-    
-    # 各セルのサイズを計算
-    cell_width = width // grid_size
-    cell_height = height // grid_size
-    
-    print(f"セルサイズ: {cell_width}x{cell_height}")
-    
-    # 出力ディレクトリを作成
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # 各アイコンを切り抜き
-    for i, name in enumerate(ICON_NAMES):
-        row = i // grid_size
-        col = i % grid_size
-        
-        # 切り抜き範囲を計算
-        left = col * cell_width
-        top = row * cell_height
-        right = left + cell_width
-        bottom = top + cell_height
-        
-        # 切り抜き
-        icon = img.crop((left, top, right, bottom))
-        
-        # 透明部分をトリミング（余白を削除）
-        bbox = icon.getbbox()
-        if bbox:
-            # 少しのパディングを追加（10ピクセル）
-            padding = 10
-            left_trim = max(0, bbox[0] - padding)
-            top_trim = max(0, bbox[1] - padding)
-            right_trim = min(icon.width, bbox[2] + padding)
-            bottom_trim = min(icon.height, bbox[3] + padding)
-            icon = icon.crop((left_trim, top_trim, right_trim, bottom_trim))
-        
-        # 保存
-        output_path = os.path.join(output_dir, f"{name}.png")
-        icon.save(output_path, "PNG")
-        
-        print(f"[OK] {name}.png ({icon.width}x{icon.height})")
+def build_manifest():
+    """切り抜きマニフェストを作成（sprite_slicer 用）"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_dir = os.path.dirname(script_dir)
+    icon_dir = os.path.join(project_dir, "assets", "icon")
     
-    print(f"\n[DONE] {len(ICON_NAMES)} icons saved to {output_dir}")
+    sheets = []
+    for sheet_name in SPRITE_SHEETS:
+        output_dir = os.path.join(icon_dir, sheet_name)
+        cells = sprite_slicer.named_cells(
+            ICON_NAMES, 4, lambda name: os.path.join(output_dir, f"{name}.png")
+        )
+        # 透明部分をトリミングして10ピクセルの余白を残す
+        sheets.append(sprite_slicer.sheet(
+            os.path.join(icon_dir, f"{sheet_name}.png"), 4, 4, cells, content_padding=10
+        ))
+    return sheets
 
 
-def slice_all_icon_sheets():
+def slice_all_icon_sheets(jobs=None):
     """
     全てのスプライトシート（inu1, inu2, inu3）を処理
     """
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_dir = os.path.dirname(script_dir)
-    icon_dir = os.path.join(project_dir, "assets", "icon")
+    print(f"\n{'='*50}")
+    print(f"[START] Processing {', '.join(SPRITE_SHEETS)}")
+    print(f"{'='*50}")
     
-    for sheet_name in SPRITE_SHEETS:
-        input_path = os.path.join(icon_dir, f"{sheet_name}.png")
-        output_dir = os.path.join(icon_dir, sheet_name)
-        
-        if not os.path.exists(input_path):
-            print(f"[SKIP] {sheet_name}.png not found")
-            continue
-        
-        print(f"\n{'='*50}")
-        print(f"[START] Processing {sheet_name}.png")
-        print(f"Input: {input_path}")
-        print(f"Output: {output_dir}")
-        print(f"{'='*50}\n")
-        
-        slice_icons(input_path, output_dir)
+    sprite_slicer.run(build_manifest(), jobs)
 
 
 if __name__ == "__main__":
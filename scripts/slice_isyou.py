@@ -3,9 +3,10 @@
 16個のアクセサリーアイテムを個別のPNG画像に分割
 """
 
-from PIL import Image
 import os
 
+import sprite_slicer
+
 # アイテムの名前マッピング（左上から右へ、上から下へ）
 ISYOU_ITEMS = [
     # 1行目
@@ -33,80 +34,30 @@ ISYOU_ITEMS = [
     "hat_explorer",     # 探検帽
 ]
 
-def slice_isyou(input_path, output_dir, grid_size=4):
-    """
-    4x4グリッドの画像を個別のアイテムに切り抜く
-    """
-    # 画像を読み込み
-    img = Image.open(input_path)
-    width, height = img.size
-    
-    print(f"入力画像: {width}x{height}")
-    
-    # 各セルのサイズを計算
-    cell_width = width // grid_size
-    cell_height = height // grid_size
-    
-    print(f"セルサイズ: {cell_width}x{cell_height}")
-    
-    # 出力ディレクトリを作成
-    os.makedirs(output_dir, exist_ok=True)
+def build_manifest():
+    """切り抜きマニフェストを作成（sprite_slicer 用）"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    project_dir = os.path.dirname(script_dir)
     
-    # 各アイテムを切り抜き
-    for i, name in enumerate(ISYOU_ITEMS):
-        row = i // grid_size
-        col = i % grid_size
-        
-        # 切り抜き範囲を計算
-        left = col * cell_width
-        top = row * cell_height
-        right = left + cell_width
-        bottom = top + cell_height
-        
-        # 切り抜き
-        item = img.crop((left, top, right, bottom))
-        
-        # 透明部分をトリミング（余白を削除）
-        bbox = item.getbbox()
-        if bbox:
-            # 少しのパディングを追加（5ピクセル）
-            padding = 5
-            left_trim = max(0, bbox[0] - padding)
-            top_trim = max(0, bbox[1] - padding)
-            right_trim = min(item.width, bbox[2] + padding)
-            bottom_trim = min(item.height, bbox[3] + padding)
-            item = item.crop((left_trim, top_trim, right_trim, bottom_trim))
-        
-        # 保存
-        output_path = os.path.join(output_dir, f"{name}.png")
-        item.save(output_path, "PNG")
-        
-        print(f"[OK] {name}.png ({item.width}x{item.height})")
+    input_path = os.path.join(project_dir, "assets", "kisekae", "isyou", "isyou.png")
+    output_dir = os.path.join(project_dir, "assets", "kisekae", "isyou")
     
-    print(f"\n[DONE] {len(ISYOU_ITEMS)} items saved to {output_dir}")
+    cells = sprite_slicer.named_cells(
+        ISYOU_ITEMS, 4, lambda name: os.path.join(output_dir, f"{name}.png")
+    )
+    # 透明部分をトリミングして5ピクセルの余白を残す
+    return [sprite_slicer.sheet(input_path, 4, 4, cells, content_padding=5)]
 
 
-def main():
+def main(jobs=None):
     """
     メイン処理
     """
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_dir = os.path.dirname(script_dir)
-    
-    input_path = os.path.join(project_dir, "assets", "kisekae", "isyou", "isyou.png")
-    output_dir = os.path.join(project_dir, "assets", "kisekae", "isyou")
-    
-    if not os.path.exists(input_path):
-        print(f"[ERROR] {input_path} not found")
-        return
-    
     print(f"\n{'='*50}")
     print(f"[START] Processing isyou.png")
-    print(f"Input: {input_path}")
-    print(f"Output: {output_dir}")
-    print(f"{'='*50}\n")
+    print(f"{'='*50}")
     
-    slice_isyou(input_path, output_dir)
+    sprite_slicer.run(build_manifest(), jobs)
 
 
 if __name__ == "__main__":
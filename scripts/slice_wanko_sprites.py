@@ -3,9 +3,10 @@
 4×4グリッドの画像から個別のスプライトを切り出します
 """
 
-from PIL import Image
 import os
 
+import sprite_slicer
+
 # 入力フォルダと出力フォルダ
 INPUT_DIR = "../assets/gazou/wanko"
 OUTPUT_DIR = "../assets/gazou/wanko/sliced"
@@ -25,63 +26,34 @@ DOG_BREEDS = {
 EXPRESSIONS = ["normal", "happy", "sad", "excited"]
 
 
-def slice_image(input_path: str, output_dir: str, breeds: list[str]):
-    """4×4グリッド画像を16個の個別画像に切り分ける"""
-    
-    img = Image.open(input_path)
-    width, height = img.size
-    
-    # 1セルのサイズを計算
-    cell_width = width // 4
-    cell_height = height // 4
-    
-    print(f"処理中: {input_path}")
-    print(f"  画像サイズ: {width}x{height}")
-    print(f"  セルサイズ: {cell_width}x{cell_height}")
-    
-    for row, breed in enumerate(breeds):
-        for col, expression in enumerate(EXPRESSIONS):
-            # 切り抜き範囲を計算
-            left = col * cell_width
-            top = row * cell_height
-            right = left + cell_width
-            bottom = top + cell_height
-            
-            # 切り抜き
-            cropped = img.crop((left, top, right, bottom))
-            
-            # ファイル名を生成
-            filename = f"{breed}_{expression}.png"
-            output_path = os.path.join(output_dir, filename)
-            
-            # 保存
-            cropped.save(output_path, "PNG")
-            print(f"  保存: {filename}")
-
-
-def main():
+def build_manifest():
+    """切り抜きマニフェストを作成（sprite_slicer 用）"""
     # スクリプトのディレクトリを基準にパスを解決
     script_dir = os.path.dirname(os.path.abspath(__file__))
     input_dir = os.path.normpath(os.path.join(script_dir, INPUT_DIR))
     output_dir = os.path.normpath(os.path.join(script_dir, OUTPUT_DIR))
-    
-    # 出力フォルダを作成
-    os.makedirs(output_dir, exist_ok=True)
-    print(f"出力先: {output_dir}\n")
-    
-    # 各画像を処理
+
+    sheets = []
     for filename, breeds in DOG_BREEDS.items():
-        input_path = os.path.join(input_dir, filename)
-        
-        if os.path.exists(input_path):
-            slice_image(input_path, output_dir, breeds)
-            print()
-        else:
-            print(f"⚠️ ファイルが見つかりません: {input_path}\n")
+        # 4×4グリッド: 行 = 犬種、列 = 表情
+        cells = [
+            sprite_slicer.cell(row, col, os.path.join(output_dir, f"{breed}_{expression}.png"))
+            for row, breed in enumerate(breeds)
+            for col, expression in enumerate(EXPRESSIONS)
+        ]
+        sheets.append(sprite_slicer.sheet(os.path.join(input_dir, filename), 4, 4, cells))
+    return sheets
+
+
+def main(jobs=None):
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    output_dir = os.path.normpath(os.path.join(script_dir, OUTPUT_DIR))
+    print(f"出力先: {output_dir}")
+    
+    results = sprite_slicer.run(build_manifest(), jobs)
     
     # 結果を表示
-    total_files = len([f for f in os.listdir(output_dir) if f.endswith('.png')])
-    print(f"✅ 完了！{total_files}個のスプライトを生成しました")
+    print(f"✅ 完了！{sum(1 for r in results if not r['error'])}個のスプライトを生成しました")
     print(f"📁 保存先: {output_dir}")
 
 
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+キャラクター画像の解像度違い（密度バリアント）の書き出しとマニフェスト
+- 中央配置した 512x512（@1x）から @0.5x（256px）・@0.25x（128px）を作る
+  どの密度も「1つ上の密度」から LANCZOS で縮小する1本の縮小チェーン
+  （キャンバスごと縮小するので、余白と位置の比率は全密度で同じ）
+- @1x は今までどおり assets/characters/<犬>/<表情>.png
+  それ以外は assets/characters/@0.5x/<犬>/<表情>.png のように密度ごとのフォルダ
+  （dog_*/*.png を見る他のツールの対象にならないように、フォルダを分ける）
+- マニフェスト assets/characters/density_manifest.json
+    {
+      "base_size": 512,
+      "densities": [{"scale": 1, "dir": ""}, {"scale": 0.5, "dir": "@0.5x/"}, ...],
+      "sprites": {"dog_01_shiba/neutral.png": [1, 0.5, 0.25], ...}
+    }
+  ゲーム側は「表示サイズ × devicePixelRatio 以上になる一番小さい scale」を選び、
+  ./assets/characters/<dir><sprite> を読み込んで setDisplaySize で元の大きさに戻す
+  （図鑑の小さいアイコンだけの端末なら @0.25x で GPU メモリは 1/16）
+"""
+
+import json
+import os
+from pathlib import Path
+
+from PIL import Image
+
+from parallel import map_ordered
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+CHARACTERS_DIR = PROJECT_ROOT / "assets" / "characters"
+MANIFEST_NAME = "density_manifest.json"
+
+DENSITIES = [1, 0.5, 0.25]  # 大きい順（縮小チェーンの順番）
+
+
+def density_label(scale):
+    return f"@{scale:g}x"
+
+
+def density_dir(scale):
+    """@1x は "" 、それ以外は "@0.5x/" のようなフォルダ名（マニフェスト用）"""
+    return "" if scale == 1 else f"{density_label(scale)}/"
+
+
+def variant_path(path, scale, root=CHARACTERS_DIR):
+    """@1x の出力パスから、その密度のファイルのパス"""
+    path = Path(path)
+    if scale == 1:
+        return path
+    return Path(root) / density_label(scale) / path.relative_to(root)
+
+
+def density_chain(img, densities=DENSITIES):
+    """
+    @1x の画像から {scale: 画像} を作る
+    各密度は1つ上の密度から縮小（毎回 @1x から縮小しない）
+    """
+    if img.mode != 'RGBA':
+        img = img.convert('RGBA')
+    chain = {}
+    previous = None
+    for scale in sorted(densities, reverse=True):
+        size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+        if previous is None or previous.size == size:
+            level = img if size == img.size else img.resize(size, Image.Resampling.LANCZOS)
+        else:
+            level = previous.resize(size, Image.Resampling.LANCZOS)
+        chain[scale] = previous = level
+    return chain
+
+
+def save_variants(img, path, root=CHARACTERS_DIR, densities=DENSITIES, save_options=None):
+    """
+    @1x 以外の密度を書き出す（@1x は呼び出し側が保存済み）
+    戻り値: 書き出した密度のリスト（@1x を含む）
+    """
+    save_options = {"optimize": True} if save_options is None else save_options
+    for scale, level in density_chain(img, densities).items():
+        if scale == 1:
+            continue
+        out = variant_path(path, scale, root)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        level.save(out, "PNG", **save_options)
+    return sorted(densities, reverse=True)
+
+
+def variants_exist(path, root=CHARACTERS_DIR, densities=DENSITIES):
+    return all(variant_path(path, scale, root).exists() for scale in densities)
+
+
+def emit_variants(path, root=CHARACTERS_DIR, densities=DENSITIES):
+    """保存済みの @1x を読み込んで他の密度を書き出す（ワーカープロセスで実行）"""
+    with Image.open(path) as img:
+        img.load()
+        return save_variants(img, path, root, densities)
+
+
+def emit_all(paths, root=CHARACTERS_DIR, jobs=None, densities=DENSITIES):
+    """@1x の画像群の密度バリアントをまとめて書き出す。戻り値: map_ordered の結果"""
+    return map_ordered(emit_variants, [(Path(p), Path(root), densities) for p in paths], jobs)
+
+
+def update_manifest(paths, root=CHARACTERS_DIR, densities=DENSITIES):
+    """
+    @1x の画像群をマニフェストに登録（他のスクリプトが登録した分は残す）
+    実際に存在する密度だけを書く。戻り値: マニフェストのパス
+    """
+    root = Path(root)
+    manifest_path = root / MANIFEST_NAME
+    manifest = {"base_size": None, "densities": [], "sprites": {}}
+    if manifest_path.exists():
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+
+    for path in paths:
+        path = Path(path)
+        if not path.exists():
+            continue
+        if manifest["base_size"] is None:
+            with Image.open(path) as img:
+                manifest["base_size"] = max(img.size)
+        key = path.relative_to(root).as_posix()
+        manifest["sprites"][key] = [
+            scale for scale in sorted(densities, reverse=True)
+            if variant_path(path, scale, root).exists()
+        ]
+
+    used = {scale for scales in manifest["sprites"].values() for scale in scales}
+    manifest["densities"] = [
+        {"scale": scale, "dir": density_dir(scale)}
+        for scale in sorted(used, reverse=True)
+    ]
+    manifest["sprites"] = dict(sorted(manifest["sprites"].items()))
+
+    tmp_path = manifest_path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest_path
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+背景キーイング（背景色→透過）モジュール
+- RGBA バッファを NumPy 配列として一括処理（ピクセルごとのタプル生成なし）
+- hard: 各チャンネルがキー色から threshold 未満なら完全透過（fix_dalmatian の旧動作）
+- soft: キー色との距離に応じてアルファを滑らかに落とす（輪郭のギザギザ対策）
+- 切り抜き前のシート全体に1回だけかける想定（16セル分を1パスで処理）
+
+使い方:
+    python sprite_keying.py ../assets/gazou/wanko/2-2.png -o keyed/2-2.png
+    python sprite_keying.py ../assets/gazou/wanko/*.png -o keyed --mode soft --inner 20 --outer 60
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+# 既定のキー色（黒背景）と閾値
+DEFAULT_KEY_COLOR = (0, 0, 0)
+DEFAULT_THRESHOLD = 30     # hard: 各チャンネルの差がこれ未満なら背景
+DEFAULT_SOFT_INNER = 20    # soft: 距離がこれ以下なら完全透過
+DEFAULT_SOFT_OUTER = 60    # soft: 距離がこれ以上なら元のアルファのまま
+
+
+def hard_key_mask(rgba, key_color=DEFAULT_KEY_COLOR, threshold=DEFAULT_THRESHOLD):
+    """
+    背景ピクセルのマスク（True = 背景）を返す
+    各チャンネルについて |c - key| < threshold のとき背景とみなす
+    （キー色が黒なら r, g, b < threshold と同じ）
+    """
+    rgb = rgba[:, :, :3].astype(np.int16)
+    diff = np.abs(rgb - np.asarray(key_color, dtype=np.int16))
+    return (diff < threshold).all(axis=2)
+
+
+def soft_key_alpha(rgba, key_color=DEFAULT_KEY_COLOR,
+                   inner=DEFAULT_SOFT_INNER, outer=DEFAULT_SOFT_OUTER):
+    """
+    キー色とのユークリッド距離からアルファ倍率 (0.0〜1.0) を返す
+    - 距離 <= inner: 0.0（完全透過）
+    - 距離 >= outer: 1.0（そのまま）
+    - その間は線形
+    """
+    rgb = rgba[:, :, :3].astype(np.float32)
+    dist = np.sqrt(((rgb - np.asarray(key_color, dtype=np.float32)) ** 2).sum(axis=2))
+    return np.clip((dist - inner) / max(outer - inner, 1e-6), 0.0, 1.0)
+
+
+def key_array(rgba, mode="hard", key_color=DEFAULT_KEY_COLOR,
+              threshold=DEFAULT_THRESHOLD, inner=DEFAULT_SOFT_INNER,
+              outer=DEFAULT_SOFT_OUTER):
+    """
+    RGBA 配列 (h, w, 4) uint8 をその場でキーイングする
+    完全透過になったピクセルは (0, 0, 0, 0) にそろえる
+    """
+    if mode == "hard":
+        rgba[hard_key_mask(rgba, key_color, threshold)] = 0
+    elif mode == "soft":
+        factor = soft_key_alpha(rgba, key_color, inner, outer)
+        alpha = np.rint(rgba[:, :, 3] * factor).astype(np.uint8)
+        rgba[:, :, 3] = alpha
+        rgba[alpha == 0] = 0
+    else:
+        raise ValueError(f"Unknown keying mode: {mode}")
+    return rgba
+
+
+def key_image(img, mode="hard", key_color=DEFAULT_KEY_COLOR,
+              threshold=DEFAULT_THRESHOLD, inner=DEFAULT_SOFT_INNER,
+              outer=DEFAULT_SOFT_OUTER):
+    """PIL 画像をキーイングした新しい RGBA 画像を返す"""
+    rgba = np.array(img.convert("RGBA"))
+    key_array(rgba, mode, key_color, threshold, inner, outer)
+    return Image.fromarray(rgba, "RGBA")
+
+
+def key_sheet(source_path, output_path=None, **options):
+    """
+    スプライトシート全体をキーイング
+    output_path を指定すると保存する。キーイング済みの画像を返す
+    """
+    img = Image.open(source_path)
+    keyed = key_image(img, **options)
+    if output_path is not None:
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        keyed.save(output_path, "PNG")
+    return keyed
+
+
+def parse_color(value):
+    """'0,0,0' や '#000000' を (r, g, b) に変換"""
+    value = value.strip()
+    if value.startswith("#"):
+        return tuple(int(value[i:i + 2], 16) for i in (1, 3, 5))
+    return tuple(int(v) for v in value.split(","))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スプライトシートの背景キーイング")
+    parser.add_argument("sources", nargs="+", type=Path, help="入力シート")
+    parser.add_argument("-o", "--output", type=Path, required=True,
+                        help="出力先（入力が1枚ならファイル、複数ならフォルダ）")
+    parser.add_argument("--mode", choices=["hard", "soft"], default="hard")
+    parser.add_argument("--key", type=parse_color, default=DEFAULT_KEY_COLOR,
+                        help="キー色（例: 0,0,0 / #00ff00）")
+    parser.add_argument("--threshold", type=int, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--inner", type=float, default=DEFAULT_SOFT_INNER)
+    parser.add_argument("--outer", type=float, default=DEFAULT_SOFT_OUTER)
+    args = parser.parse_args()
+
+    options = {
+        "mode": args.mode,
+        "key_color": args.key,
+        "threshold": args.threshold,
+        "inner": args.inner,
+        "outer": args.outer,
+    }
+
+    single = len(args.sources) == 1 and args.output.suffix.lower() == ".png"
+    for source in args.sources:
+        output_path = args.output if single else args.output / source.name
+        keyed = key_sheet(source, output_path, **options)
+        print(f"  ✓ {source.name} → {output_path} ({keyed.width}x{keyed.height})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,473 @@
+# -*- coding: utf-8 -*-
+"""
+スプライトシート切り抜きエンジン
+- マニフェスト（シート → グリッド → セル名 → セルごとのトリム）で切り抜きを定義
+- 各シートのデコードは1回だけ。セルの切り抜き・後処理・PNG保存はワーカープールで並列実行
+- slice_dogs.py / slice_icons.py などの個別スクリプトはマニフェストを返すだけの設定ファイル
+- キャッシュ（build_cache.BuildCache）を渡すと、シート内容・切り抜きパラメータが
+  変わっていないセルはスキップ。全セルが最新のシートはデコードもしない
+- デコード（+ モード変換・キーイング）済みのシートは sheet_cache.py が .npy に保存し、
+  2回目以降はメモリマップするだけ（ADJUSTMENTS の調整で何度も実行してもデコードしない）
+- grid="detect" のシートは固定グリッド（幅 // 列数）ではなく、grid_detect.py が
+  アルファの投影プロファイルから見つけたセルの境目で切り抜く
+
+ワーカーはスレッドプール:
+Pillow はデコード・リサイズ・PNG エンコード中に GIL を解放するので、
+デコード済みシートをコピー（pickle）せずに全ワーカーで共有できる
+
+使い方:
+    python sprite_slicer.py --all              # 全シートを一括で切り抜き
+    python sprite_slicer.py --only dogs icons  # 一部だけ
+    python sprite_slicer.py --all --force      # キャッシュを無視して全部作り直す
+    python sprite_slicer.py --all --no-sheet-cache  # シートを毎回デコードする
+    python sprite_slicer.py --only dogs --detect-grid  # 検出したグリッドで切り抜く
+    python sprite_slicer.py --list
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from PIL import Image
+
+import grid_detect
+from build_cache import BuildCache, make_key
+from sheet_cache import SheetCache
+from sprite_keying import key_image
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# 切り抜き処理を変えたら上げる（キャッシュを無効化するため）
+TOOL_VERSION = 1
+CACHE_NAME = "sprites"
+
+# 一括実行の対象（名前 → build_manifest() を持つスクリプト）
+# 同じ出力先に書くセルがある場合は後のマニフェストが優先
+SLICE_CONFIGS = {
+    "dogs": "scripts/slice_dogs.py",
+    "new_dogs": "scripts/slice_new_dogs.py",
+    "wanko_sprites": "scripts/slice_wanko_sprites.py",
+    "icons": "scripts/slice_icons.py",
+    "isyou": "scripts/slice_isyou.py",
+    "menu_icons": "scripts/crop_icons.py",
+    "menu_single_icon": "scripts/crop_single_icon.py",
+    "shop_icons": "scripts/crop_shop_icons.py",
+    "paws": "assets/nikukyu/split_paws.py",
+    "legend_dogs": "assets/characters/densetu/extract_legend_dogs.py",
+}
+
+
+# ========================================
+# マニフェスト
+# ========================================
+
+def sheet(source, rows, cols, cells, name=None, inset=0, content_padding=None,
+          postprocess=None, mode=None, key=None, save_options=None, cache_params=None,
+          grid="fixed", extend_edges=False):
+    """
+    シート1枚分の定義
+    - inset: セルの四辺から内側に切り込む量（隣の混入防止）
+    - content_padding: 指定時は透明部分をトリミングしてこの余白を残す（0 なら余白なし）
+    - postprocess: 切り抜き後に適用する関数 img -> img（中央配置など）
+    - mode: デコード直後に変換するモード（例: "RGBA"）
+    - key: 背景キーイングのオプション（sprite_keying.key_image に渡す）。シート全体に1回だけ適用
+    - save_options: PIL の save に渡す追加オプション（例: {"optimize": True}）
+    - cache_params: キャッシュキーに含める追加パラメータ
+      （postprocess の設定値など、関数そのものはキーにできないので値で渡す）
+    - grid: "fixed"（幅 // 列数の固定グリッド + セルの trim）/
+      "detect"（grid_detect.py で検出した境目。trim は固定グリッド用なので使わない）
+    - extend_edges: 固定グリッドの右端の列・下端の行を画像の端まで伸ばす
+      （幅・高さが列数・行数で割り切れないシートで、余りの画素を落とさない）
+    """
+    source = Path(source)
+    if name is None:
+        try:
+            name = source.resolve().relative_to(PROJECT_ROOT).as_posix()
+        except ValueError:
+            name = source.name
+    return {
+        "name": name,
+        "source": source,
+        "rows": rows,
+        "cols": cols,
+        "cells": cells,
+        "inset": inset,
+        "content_padding": content_padding,
+        "postprocess": postprocess,
+        "mode": mode,
+        "key": key,
+        "save_options": save_options or {},
+        "cache_params": cache_params or {},
+        "grid": grid,
+        "extend_edges": extend_edges,
+    }
+
+
+def cell(row, col, output, trim=None):
+    """
+    セル1つ分の定義
+    trim: {"left", "top", "right", "bottom"} の追加カット量（負の値で広げる）
+    """
+    return {"row": row, "col": col, "output": Path(output), "trim": trim or {}}
+
+
+def named_cells(names, cols, output_for):
+    """左上から右へ、上から下へ並んだ名前リストからセル定義を作る"""
+    return [cell(i // cols, i % cols, output_for(name)) for i, name in enumerate(names)]
+
+
+def merge_manifests(*manifests):
+    """
+    複数のマニフェストを結合
+    同じ出力先のセルは後のものを残す（スクリプトを順番に実行した時と同じ結果）
+    """
+    owner = {}
+    for sheet_idx, sheet_spec in enumerate(s for m in manifests for s in m):
+        for c in sheet_spec["cells"]:
+            owner[c["output"].resolve()] = sheet_idx
+
+    merged = []
+    for sheet_idx, sheet_spec in enumerate(s for m in manifests for s in m):
+        cells = [c for c in sheet_spec["cells"] if owner[c["output"].resolve()] == sheet_idx]
+        dropped = len(sheet_spec["cells"]) - len(cells)
+        if dropped:
+            print(f"  ⚠ {sheet_spec['name']}: {dropped}セルは後の定義で上書きされるため省略")
+        if cells:
+            merged.append({**sheet_spec, "cells": cells})
+    return merged
+
+
+# ========================================
+# 切り抜き処理
+# ========================================
+
+def cell_box(sheet_size, rows, cols, row, col, inset=0, trim=None, extend_edges=False):
+    """
+    セルの切り抜き範囲 (left, top, right, bottom) を計算（画像内にクランプ）
+    extend_edges: 最後の列・行は画像の端まで（割り切れない余りを含める）
+    """
+    width, height = sheet_size
+    cell_width = width // cols
+    cell_height = height // rows
+    trim = trim or {}
+    cell_right = width if extend_edges and col == cols - 1 else (col + 1) * cell_width
+    cell_bottom = height if extend_edges and row == rows - 1 else (row + 1) * cell_height
+
+    left = col * cell_width + inset + trim.get("left", 0)
+    top = row * cell_height + inset + trim.get("top", 0)
+    right = cell_right - inset - trim.get("right", 0)
+    bottom = cell_bottom - inset - trim.get("bottom", 0)
+
+    return (max(0, left), max(0, top), min(width, right), min(height, bottom))
+
+
+def crop_to_content(img, padding=0):
+    """透明部分を除いたコンテンツ領域に余白付きでクロップ"""
+    bbox = img.getbbox()
+    if not bbox:
+        return img
+    return img.crop((
+        max(0, bbox[0] - padding),
+        max(0, bbox[1] - padding),
+        min(img.width, bbox[2] + padding),
+        min(img.height, bbox[3] + padding),
+    ))
+
+
+def decode_sheet(sheet_spec):
+    """シートをデコードし、モード変換・キーイングまで済ませる"""
+    img = Image.open(sheet_spec["source"])
+    img.load()
+    if sheet_spec["mode"] and img.mode != sheet_spec["mode"]:
+        img = img.convert(sheet_spec["mode"])
+    if sheet_spec["key"]:
+        img = key_image(img, **sheet_spec["key"])
+    return img
+
+
+def load_sheet(sheet_spec, sheet_cache=None):
+    """
+    デコード済みのシート（sheet_cache を渡すと、前回デコードした配列をメモリマップ）
+    マップした画像は読み取り専用（crop などの新しい画像を作る操作だけにする）
+    """
+    if sheet_cache is None:
+        return decode_sheet(sheet_spec)
+    params = {"mode": sheet_spec["mode"], "key": sheet_spec["key"]}
+    return sheet_cache.load(sheet_spec["source"], lambda: decode_sheet(sheet_spec), params)
+
+
+def inset_box(box, inset):
+    left, top, right, bottom = box
+    return (left + inset, top + inset, max(left + inset, right - inset), max(top + inset, bottom - inset))
+
+
+def prepare_sheet(sheet_spec, sheet_cache=None):
+    """シートを読み込み、grid="detect" ならセルの枠も検出する。戻り値: (画像, 枠 or None)"""
+    img = load_sheet(sheet_spec, sheet_cache)
+    boxes = None
+    if sheet_spec["grid"] == "detect":
+        boxes = grid_detect.detect_boxes(img, sheet_spec["rows"], sheet_spec["cols"])
+    return img, boxes
+
+
+def crop_cell(img, sheet_spec, cell_spec, boxes=None):
+    """デコード済みシートから1セルを切り抜く（boxes: 検出したセルの枠 {(行, 列): 枠}）"""
+    if boxes is not None:
+        box = inset_box(boxes[(cell_spec["row"], cell_spec["col"])], sheet_spec["inset"])
+    else:
+        box = cell_box(img.size, sheet_spec["rows"], sheet_spec["cols"],
+                       cell_spec["row"], cell_spec["col"],
+                       sheet_spec["inset"], cell_spec["trim"], sheet_spec["extend_edges"])
+    return img.crop(box)
+
+
+def finish_cell(result, sheet_spec, output_path):
+    """切り抜いたセルの後処理と保存（プロセスプールでも実行できるようトップレベル関数）"""
+    if sheet_spec["content_padding"] is not None:
+        result = crop_to_content(result, sheet_spec["content_padding"])
+    if sheet_spec["postprocess"]:
+        result = sheet_spec["postprocess"](result)
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    result.save(output_path, "PNG", **sheet_spec["save_options"])
+    return result.size
+
+
+def process_cell(img, sheet_spec, cell_spec, boxes=None):
+    """デコード済みシートから1セルを切り抜いて保存"""
+    return finish_cell(crop_cell(img, sheet_spec, cell_spec, boxes), sheet_spec, cell_spec["output"])
+
+
+def cell_cache_key(sheet_spec, cell_spec, source_digest):
+    """セルの出力を決める全ての入力からキャッシュキーを作る"""
+    if sheet_spec["grid"] == "fixed":
+        layout = cell_spec["trim"]
+        if sheet_spec["extend_edges"]:
+            # extend_edges を使わないシートのキーは変えない
+            layout = [layout, "extend_edges"]
+    else:
+        # 検出グリッドでは trim を使わないので、trim の調整で作り直さない
+        # （代わりに検出のパラメータが変わったら作り直す）
+        layout = [sheet_spec["grid"], grid_detect.cache_params()]
+    return make_key(
+        TOOL_VERSION,
+        source_digest,
+        sheet_spec["rows"], sheet_spec["cols"], sheet_spec["inset"],
+        sheet_spec["content_padding"], sheet_spec["mode"], sheet_spec["key"],
+        sheet_spec["save_options"], sheet_spec["cache_params"],
+        cell_spec["row"], cell_spec["col"],
+        layout,
+    )
+
+
+def run(sheets, jobs=None, verbose=True, cache=None, stage="slice", force=False,
+        executor="thread", sheet_cache=True):
+    """
+    マニフェストを実行して結果リストを返す（マニフェストの順番）
+    結果: {"sheet", "row", "col", "output", "size", "error", "skipped"}
+    cache を渡すと最新のセルはスキップし、書き出したセルを stage として記録する
+    force=True なら最新でも作り直す（記録は更新する）
+    executor="process" なら切り抜き後の後処理・保存をプロセスプールで実行する
+    （postprocess が重い Python 処理の場合用。切り抜きは親プロセスで行う）
+    sheet_cache: True なら既定の SheetCache、False / None なら毎回デコード（インスタンスも渡せる）
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if sheet_cache is True:
+        sheet_cache = SheetCache()
+    results = {}
+    cell_keys = {}
+    start = time.perf_counter()
+
+    cell_pool = ProcessPoolExecutor(max_workers=jobs) if executor == "process" else None
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        sheet_futures = {}
+        for sheet_idx, sheet_spec in enumerate(sheets):
+            if not sheet_spec["source"].exists():
+                print(f"  ⚠ ファイルが見つかりません: {sheet_spec['source']}")
+                continue
+
+            stale = range(len(sheet_spec["cells"]))
+            if cache is not None:
+                source_digest = cache.digest(sheet_spec["source"])
+                stale = []
+                for cell_idx, cell_spec in enumerate(sheet_spec["cells"]):
+                    key = cell_cache_key(sheet_spec, cell_spec, source_digest)
+                    if not force and cache.is_fresh(cell_spec["output"], stage, key):
+                        results[(sheet_idx, cell_idx)] = _result(sheet_spec, cell_spec, skipped=True)
+                    else:
+                        cell_keys[(sheet_idx, cell_idx)] = key
+                        stale.append(cell_idx)
+
+            # 全セルが最新ならデコードしない
+            if stale:
+                sheet_futures[pool.submit(prepare_sheet, sheet_spec, sheet_cache or None)] = (sheet_idx, stale)
+
+        # デコードが終わったシートから順にセルを投入
+        cell_futures = {}
+        for future in as_completed(sheet_futures):
+            sheet_idx, stale = sheet_futures[future]
+            sheet_spec = sheets[sheet_idx]
+            try:
+                img, boxes = future.result()
+            except Exception as e:
+                print(f"  ✗ {sheet_spec['name']} 読み込みエラー: {e}")
+                # 作れなかったセルもエラーとして結果に残す
+                for cell_idx in stale:
+                    result = _result(sheet_spec, sheet_spec["cells"][cell_idx])
+                    result["error"] = f"シートの読み込み・検出に失敗: {e}"
+                    results[(sheet_idx, cell_idx)] = result
+                continue
+            for cell_idx in stale:
+                cell_spec = sheet_spec["cells"][cell_idx]
+                if cell_pool is not None:
+                    future = cell_pool.submit(finish_cell, crop_cell(img, sheet_spec, cell_spec, boxes),
+                                              sheet_spec, cell_spec["output"])
+                else:
+                    future = pool.submit(process_cell, img, sheet_spec, cell_spec, boxes)
+                cell_futures[future] = (sheet_idx, cell_idx)
+
+        for future in as_completed(cell_futures):
+            sheet_idx, cell_idx = cell_futures[future]
+            sheet_spec = sheets[sheet_idx]
+            cell_spec = sheet_spec["cells"][cell_idx]
+            result = _result(sheet_spec, cell_spec)
+            try:
+                result["size"] = future.result()
+            except Exception as e:
+                result["error"] = str(e)
+            else:
+                if cache is not None:
+                    cache.record(cell_spec["output"], stage, cell_keys[(sheet_idx, cell_idx)], reset=True)
+            results[(sheet_idx, cell_idx)] = result
+
+    if cell_pool is not None:
+        cell_pool.shutdown()
+
+    if cache is not None:
+        cache.save()
+    if sheet_cache:
+        sheet_cache.save()
+
+    ordered = [results[k] for k in sorted(results)]
+    if verbose:
+        print_summary(ordered, time.perf_counter() - start, jobs, sheet_cache or None)
+    return ordered
+
+
+def _result(sheet_spec, cell_spec, skipped=False):
+    return {
+        "sheet": sheet_spec["name"],
+        "row": cell_spec["row"],
+        "col": cell_spec["col"],
+        "output": str(cell_spec["output"]),
+        "size": None,
+        "error": None,
+        "skipped": skipped,
+    }
+
+
+def print_summary(results, elapsed, jobs, sheet_cache=None):
+    """シートごとに切り抜き結果を表示"""
+    current_sheet = None
+    for r in results:
+        if r["skipped"]:
+            continue
+        if r["sheet"] != current_sheet:
+            current_sheet = r["sheet"]
+            print(f"\n[Sheet] {current_sheet}")
+        try:
+            rel = Path(r["output"]).resolve().relative_to(PROJECT_ROOT)
+        except ValueError:
+            rel = r["output"]
+        if r["error"]:
+            print(f"  ✗ ({r['row']},{r['col']}) {rel}: {r['error']}")
+        else:
+            print(f"  ✓ ({r['row']},{r['col']}) {rel} ({r['size'][0]}x{r['size'][1]})")
+
+    errors = sum(1 for r in results if r["error"])
+    skipped = sum(1 for r in results if r["skipped"])
+    print(f"\n✅ {len(results) - errors - skipped}セル完了 / ⏭ {skipped}セル最新 / ❌ {errors}エラー "
+          f"({elapsed:.2f}s, {jobs} workers)")
+    if sheet_cache is not None and sheet_cache.hits + sheet_cache.misses:
+        print(f"🗺 シート: マップ {sheet_cache.hits}枚 / デコード {sheet_cache.misses}枚")
+
+
+# ========================================
+# 一括実行
+# ========================================
+
+def load_script(rel_path, module_name=None):
+    """
+    プロジェクト内のスクリプトをモジュールとして読み込む（相対パスは PROJECT_ROOT 基準）
+    sys.modules に登録し、スクリプトのフォルダを sys.path に追加する
+    （プロセスプールの子プロセスからワーカー関数を import できるように）
+    """
+    path = PROJECT_ROOT / rel_path
+    module_name = module_name or path.stem
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+
+    if str(path.parent) not in sys.path:
+        sys.path.append(str(path.parent))
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        del sys.modules[module_name]
+        raise
+    return module
+
+
+def load_config(name):
+    """SLICE_CONFIGS のスクリプトを読み込む"""
+    return load_script(SLICE_CONFIGS[name])
+
+
+def build_all(names=None):
+    """指定した（省略時は全部の）設定のマニフェストを結合して返す"""
+    names = names or list(SLICE_CONFIGS)
+    return merge_manifests(*(load_config(name).build_manifest() for name in names))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="スプライトシート一括切り抜き")
+    parser.add_argument("--all", action="store_true", help="全ての設定を実行")
+    parser.add_argument("--only", nargs="+", choices=list(SLICE_CONFIGS),
+                        help="指定した設定だけ実行")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="ワーカー数")
+    parser.add_argument("--force", action="store_true", help="キャッシュを無視して全部作り直す")
+    parser.add_argument("--no-sheet-cache", action="store_true",
+                        help="デコード済みシートのキャッシュを使わない")
+    parser.add_argument("--detect-grid", action="store_true",
+                        help="固定グリッドではなく検出したセルの境目で切り抜く（grid_detect.py）")
+    parser.add_argument("--list", action="store_true", help="設定一覧を表示")
+    args = parser.parse_args()
+
+    if args.list or not (args.all or args.only):
+        for name, path in SLICE_CONFIGS.items():
+            print(f"  {name:<18} {path}")
+        return
+
+    print("=" * 60)
+    print("SPRITE SHEET SLICER")
+    print("=" * 60)
+    sheets = build_all(args.only)
+    if args.detect_grid:
+        sheets = [{**sheet_spec, "grid": "detect"} for sheet_spec in sheets]
+    run(sheets, args.jobs, cache=BuildCache(CACHE_NAME), force=args.force,
+        sheet_cache=not args.no_sheet_cache)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+"""
+assets/ → public/assets/ の差分同期（内容ハッシュで比較）
+- パイプラインのスクリプトは assets/ にだけ書くので、public/assets/ との差分を
+  ファイル内容の SHA-256 で比べ、変わったファイルだけをハードリンク（できなければコピー）する
+- ハッシュはビルドキャッシュ（.asset_cache/public_sync.json）に (サイズ, 更新時刻) つきでメモするので、
+  何も変わっていなければ stat だけで終わる（ハードリンク済みなら同じ inode なので public 側はハッシュも要らない）
+- 前回同期したときの内容（パス → ハッシュ）も記録し、public 側で直接編集されたファイルを見分ける
+  （上書きせずに警告。--force で assets 側に揃える）
+- public にしかないファイルは報告だけ（--prune で削除）
+- 対象外: "_" で始まるフォルダ（_backup など）・__pycache__・スクリプト（.py）
+
+使い方:
+    python sync_public_assets.py --dry-run    # 差分レポートだけ
+    python sync_public_assets.py              # 同期（ハードリンク）
+    python sync_public_assets.py --mode copy  # コピーで同期
+    python sync_public_assets.py --prune      # public にしかないファイルも削除
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import time
+from pathlib import Path
+
+from build_cache import BuildCache
+from parallel import map_ordered
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SOURCE_DIR = PROJECT_ROOT / "assets"
+PUBLIC_DIR = PROJECT_ROOT / "public" / "assets"
+
+CACHE_NAME = "public_sync"
+LAST_SYNC_KEY = "last_sync"  # 前回同期した内容 {相対パス: ハッシュ}
+
+EXCLUDE_DIRS = {"__pycache__"}
+EXCLUDE_SUFFIXES = {".py", ".pyc"}
+EXCLUDE_NAMES = {".gitkeep", ".DS_Store", "Thumbs.db"}
+
+
+# ========================================
+# ツリーの走査
+# ========================================
+
+def is_excluded_dir(name):
+    return name.startswith("_") or name in EXCLUDE_DIRS
+
+
+def is_excluded_file(name):
+    return name in EXCLUDE_NAMES or os.path.splitext(name)[1].lower() in EXCLUDE_SUFFIXES
+
+
+def scan_tree(root):
+    """{相対パス（/ 区切り）: os.stat_result} を返す（対象外は除く）"""
+    files = {}
+    root = Path(root)
+    if not root.exists():
+        return files
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if not is_excluded_dir(entry.name):
+                        stack.append(Path(entry.path))
+                elif entry.is_file() and not is_excluded_file(entry.name):
+                    rel = Path(entry.path).relative_to(root).as_posix()
+                    files[rel] = entry.stat()
+    return files
+
+
+def same_inode(a, b):
+    return a.st_ino == b.st_ino and a.st_dev == b.st_dev and a.st_ino != 0
+
+
+# ========================================
+# 差分
+# ========================================
+
+def diff_trees(cache, source_files, public_files, jobs=None):
+    """
+    両ツリーを比べて分類する
+    戻り値: {"added", "changed", "edited", "extra", "same"}（それぞれ相対パスのリスト）
+      added:   assets にだけある
+      changed: 内容が違う（public は前回同期したまま）
+      edited:  内容が違い、public 側が前回同期のあとに直接変更されている
+      extra:   public にだけある
+    と {相対パス: assets 側のハッシュ}
+    """
+    last_sync = cache.lookup(LAST_SYNC_KEY) or {}
+
+    # ハードリンク済み（同じ inode）の組は public 側のハッシュを比べなくても同じ内容
+    linked = {rel for rel, st in source_files.items()
+              if rel in public_files and same_inode(st, public_files[rel])}
+    to_hash = [SOURCE_DIR / rel for rel in source_files]
+    to_hash += [PUBLIC_DIR / rel for rel in public_files if rel in source_files and rel not in linked]
+    # メモにないファイルだけ実際に読む（スレッドで並列）
+    map_ordered(cache.digest, [(p,) for p in to_hash], jobs, executor="thread")
+
+    diff = {"added": [], "changed": [], "edited": [], "extra": [], "same": []}
+    hashes = {}
+    for rel in sorted(source_files):
+        source_sha = hashes[rel] = cache.digest(SOURCE_DIR / rel)
+        if rel in linked:
+            diff["same"].append(rel)
+            continue
+        if rel not in public_files:
+            diff["added"].append(rel)
+            continue
+        public_sha = cache.digest(PUBLIC_DIR / rel)
+        if public_sha == source_sha:
+            diff["same"].append(rel)
+        elif rel in last_sync and last_sync[rel] != public_sha:
+            diff["edited"].append(rel)
+        else:
+            diff["changed"].append(rel)
+    diff["extra"] = sorted(rel for rel in public_files if rel not in source_files)
+    return diff, hashes
+
+
+# ========================================
+# 同期
+# ========================================
+
+def place(source, target, mode="link"):
+    """
+    target を source と同じ内容にする（一時ファイル経由で置き換え）
+    mode="link" はハードリンク（別ドライブなどでできなければコピー）
+    戻り値: 実際に使った方法
+    """
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = target.with_name(target.name + ".sync_tmp")
+    if tmp_path.exists():
+        tmp_path.unlink()
+    method = "copy"
+    if mode == "link":
+        try:
+            os.link(source, tmp_path)
+            method = "link"
+        except OSError:
+            pass
+    if method == "copy":
+        shutil.copy2(source, tmp_path)
+    os.replace(tmp_path, target)
+    return method
+
+
+def sync(mode="link", dry_run=False, force=False, prune=False, jobs=None, verbose=True):
+    """assets → public/assets を同期して差分を返す"""
+    start = time.perf_counter()
+    cache = BuildCache(CACHE_NAME)
+    source_files = scan_tree(SOURCE_DIR)
+    public_files = scan_tree(PUBLIC_DIR)
+    diff, hashes = diff_trees(cache, source_files, public_files, jobs)
+
+    to_place = diff["added"] + diff["changed"] + (diff["edited"] if force else [])
+    methods = {}
+    if not dry_run:
+        placed = map_ordered(place, [(SOURCE_DIR / rel, PUBLIC_DIR / rel, mode) for rel in to_place],
+                             jobs, executor="thread")
+        for rel, (method, error) in zip(to_place, placed):
+            if error:
+                print(f"  ✗ {rel}: {error}")
+                continue
+            methods[rel] = method
+        if prune:
+            for rel in diff["extra"]:
+                (PUBLIC_DIR / rel).unlink()
+
+        # 前回同期した内容 = public 側が assets と同じになっているファイル
+        # 上書きしなかった public 側の変更は、次回も見分けられるよう前回の記録を残す
+        previous = cache.lookup(LAST_SYNC_KEY) or {}
+        synced = {rel: hashes[rel] for rel in set(diff["same"]) | set(methods)}
+        synced.update({rel: previous[rel] for rel in diff["edited"] if rel not in methods})
+        cache.store(LAST_SYNC_KEY, dict(sorted(synced.items())))
+        # 消えたファイルのハッシュのメモは捨てる
+        live = [SOURCE_DIR / rel for rel in source_files]
+        live += [PUBLIC_DIR / rel for rel in public_files if not (prune and rel in diff["extra"])]
+        cache.prune_files(live)
+    # dry-run でもハッシュのメモは残す（次回の stat だけの判定に使う）
+    cache.save()
+
+    if verbose:
+        print_report(diff, methods, dry_run, force, prune, time.perf_counter() - start)
+    return diff
+
+
+def print_report(diff, methods, dry_run, force, prune, elapsed):
+    labels = [
+        ("added", "＋ 追加", "追加"),
+        ("changed", "↻ 更新", "更新"),
+        ("edited", "⚠ public 側で変更", "public 側で変更"),
+        ("extra", "－ public のみ", "public のみ"),
+    ]
+    for name, label, _ in labels:
+        for rel in diff[name]:
+            note = ""
+            if name == "edited":
+                note = "（assets に揃えた）" if force and rel in methods else "（--force で上書き）"
+            elif name == "extra":
+                note = "（削除）" if prune and not dry_run else ""
+            elif rel in methods:
+                note = f"（{'ハードリンク' if methods[rel] == 'link' else 'コピー'}）"
+            print(f"  {label} {rel}{note}")
+
+    counts = " / ".join(f"{short} {len(diff[name])}" for name, _, short in labels)
+    state = "dry-run" if dry_run else f"{len(methods)}ファイル書き込み"
+    print(f"\n✅ 同じ {len(diff['same'])} / {counts}（{state}, {elapsed:.2f}s）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="assets/ → public/assets/ の差分同期")
+    parser.add_argument("--mode", choices=["link", "copy"], default="link",
+                        help="ハードリンク（既定、できなければコピー）かコピーか")
+    parser.add_argument("--dry-run", action="store_true", help="差分レポートだけ（書き込まない）")
+    parser.add_argument("--force", action="store_true", help="public 側で変更されたファイルも上書き")
+    parser.add_argument("--prune", action="store_true", help="public にしかないファイルを削除")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="ハッシュ・書き込みのスレッド数")
+    args = parser.parse_args()
+    sync(args.mode, args.dry_run, args.force, args.prune, args.jobs)
+
+
+if __name__ == "__main__":
+    main()
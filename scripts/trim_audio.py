@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+効果音の前後の無音カットと、鳴り始めまでの遅れ（オンセット）のレポート
+- 生成 API に 0.5〜1.0 秒で頼んだ「とても短い音」には前後に無音が残っていて、
+  バイト数と「タップしてから鳴るまでの遅れ」の両方を増やしている
+  （特に sfx_draw_step はなぞったマスごとに鳴るので遅れが目立つ）
+- ノイズフロア（NOISE_FLOOR_DB）を超える最初と最後のサンプルを探し、
+  前に PRE_ROLL_MS、後ろに FADE_OUT_MS だけ残して切る
+  残した部分には短いフェード（前: フェードイン / 後ろ: フェードアウト）をかけてプチノイズを防ぐ
+- 元ファイルは backup_store.py の置き場にバックアップしてから上書き（mp3 / ogg は ffmpeg で再エンコード）
+  （中身が同じファイルは増えないので、何回実行しても本当の元ファイルが残る）
+- 全ファイルのオンセット遅れ・長さ・サイズの変更前後を表示
+
+使い方:
+    python trim_audio.py --dry-run    # レポートだけ（書き換えない）
+    python trim_audio.py              # カットして上書き
+    python trim_audio.py --floor -45 -j 4
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+from backup_store import backup_before_write
+from loudness import load_audio
+from parallel import map_ordered
+
+# Windows コンソール用 UTF-8 設定
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SE_DIR = PROJECT_ROOT / "assets" / "audio" / "se"
+BACKUP_TOOL = "trim_audio"  # バックアップ置き場での名前
+AUDIO_EXTENSIONS = [".mp3", ".wav", ".ogg"]
+
+NOISE_FLOOR_DB = -50.0  # これより小さいサンプルは無音とみなす（dBFS）
+PRE_ROLL_MS = 5         # 鳴り始めの前に残す長さ（この間でフェードイン）
+FADE_OUT_MS = 20        # 鳴り終わりの後に残す長さ（この間でフェードアウト）
+MIN_TRIM_MS = 5         # これ未満しか削れないファイルは書き換えない
+
+# 再エンコード時の ffmpeg の設定（拡張子 → エンコーダ）
+ENCODERS = {
+    ".mp3": ["-c:a", "libmp3lame", "-q:a", "2"],
+    ".ogg": ["-c:a", "libvorbis", "-q:a", "5"],
+}
+
+
+# ========================================
+# 検出・カット
+# ========================================
+
+def sound_bounds(samples, floor_db=NOISE_FLOOR_DB):
+    """ノイズフロアを超える最初と最後のサンプル位置（無音なら None）"""
+    level = np.abs(samples).max(axis=1)
+    loud = np.flatnonzero(level > 10 ** (floor_db / 20))
+    if loud.size == 0:
+        return None
+    return int(loud[0]), int(loud[-1])
+
+
+def trim_samples(samples, rate, floor_db=NOISE_FLOOR_DB):
+    """
+    前後の無音を切ってフェードをかける
+    戻り値: (切ったサンプル, 開始位置, 終了位置)（無音ファイルはそのまま）
+    """
+    bounds = sound_bounds(samples, floor_db)
+    if bounds is None:
+        return samples, 0, samples.shape[0]
+    first, last = bounds
+    start = max(0, first - int(rate * PRE_ROLL_MS / 1000))
+    end = min(samples.shape[0], last + 1 + int(rate * FADE_OUT_MS / 1000))
+
+    trimmed = samples[start:end].copy()
+    fade_in = first - start
+    if fade_in > 0:
+        trimmed[:fade_in] *= np.linspace(0.0, 1.0, fade_in, endpoint=False)[:, None]
+    fade_out = end - (last + 1)
+    if fade_out > 0:
+        trimmed[-fade_out:] *= np.linspace(1.0, 0.0, fade_out)[:, None]
+    return trimmed, start, end
+
+
+def onset_ms(samples, rate, floor_db=NOISE_FLOOR_DB):
+    """鳴り始めまでの時間（ms、無音なら None）"""
+    bounds = sound_bounds(samples, floor_db)
+    return None if bounds is None else round(1000 * bounds[0] / rate, 1)
+
+
+def write_audio(path, samples, rate):
+    """WAV は標準ライブラリ、mp3 / ogg は ffmpeg で書く（一時ファイル経由で置き換え）"""
+    pcm = np.clip(np.round(samples * 32767), -32768, 32767).astype("<i2")
+    tmp_path = path.with_name(path.stem + ".tmp" + path.suffix)
+    if path.suffix.lower() == ".wav":
+        with wave.open(str(tmp_path), "wb") as f:
+            f.setnchannels(samples.shape[1])
+            f.setsampwidth(2)
+            f.setframerate(rate)
+            f.writeframes(pcm.tobytes())
+    else:
+        subprocess.run(
+            ["ffmpeg", "-v", "error", "-y", "-f", "s16le", "-ar", str(rate), "-ac", str(samples.shape[1]),
+             "-i", "-", *ENCODERS[path.suffix.lower()], str(tmp_path)],
+            input=pcm.tobytes(), check=True, capture_output=True,
+        )
+    tmp_path.replace(path)
+
+
+def trim_file(path, floor_db=NOISE_FLOOR_DB, dry_run=False):
+    """1ファイルをカット（ワーカーで実行）。変更前後の数値を返す"""
+    samples, rate = load_audio(path)
+    trimmed, start, end = trim_samples(samples, rate, floor_db)
+    removed_ms = 1000 * (samples.shape[0] - (end - start)) / rate
+    result = {
+        "onset_before_ms": onset_ms(samples, rate, floor_db),
+        "duration_before_ms": round(1000 * samples.shape[0] / rate),
+        "bytes_before": path.stat().st_size,
+        "removed_ms": round(removed_ms, 1),
+        "written": False,
+    }
+
+    if removed_ms < MIN_TRIM_MS:
+        # カット済みなど、ほとんど削れないファイルはそのまま（dry-run でも同じ判定）
+        result.update({
+            "onset_after_ms": result["onset_before_ms"],
+            "duration_after_ms": result["duration_before_ms"],
+            "bytes_after": result["bytes_before"],
+            "removed_ms": 0.0,
+        })
+        return result
+    if dry_run:
+        # 書き換えない場合は見込みの値
+        result.update({
+            "onset_after_ms": onset_ms(trimmed, rate, floor_db),
+            "duration_after_ms": round(1000 * trimmed.shape[0] / rate),
+            "bytes_after": None,
+        })
+        return result
+
+    write_audio(path, trimmed, rate)
+
+    # 書き出したファイルを読み直して測る（エンコーダの遅延も含めた実際の値）
+    written, written_rate = load_audio(path)
+    result.update({
+        "onset_after_ms": onset_ms(written, written_rate, floor_db),
+        "duration_after_ms": round(1000 * written.shape[0] / written_rate),
+        "bytes_after": path.stat().st_size,
+        "written": True,
+    })
+    return result
+
+
+# ========================================
+# メイン
+# ========================================
+
+def collect_files(folder=SE_DIR):
+    return sorted(p for p in folder.iterdir() if p.is_file() and p.suffix.lower() in AUDIO_EXTENSIONS)
+
+
+def format_ms(value):
+    return "   無音" if value is None else f"{value:6.1f}ms"
+
+
+def trim_all(folder=SE_DIR, floor_db=NOISE_FLOOR_DB, jobs=None, dry_run=False):
+    files = collect_files(folder)
+    print(f"✂ {len(files)}ファイル（ノイズフロア {floor_db} dBFS{'、dry-run' if dry_run else ''}）\n")
+    run_id = None if dry_run else backup_before_write(BACKUP_TOOL, files, jobs)
+    outputs = map_ordered(trim_file, [(f, floor_db, dry_run) for f in files], jobs)
+
+    print(f"  {'ファイル':<30} {'オンセット（前→後）':>22} {'長さ（前→後）':>20} {'サイズ（前→後）':>20}")
+    total_before = total_after = 0
+    errors = 0
+    for path, (r, error) in zip(files, outputs):
+        if error:
+            errors += 1
+            print(f"  ✗ {path.name:<28} {error}")
+            continue
+        size_after = "-" if r["bytes_after"] is None else f"{r['bytes_after'] / 1024:.1f}KB"
+        mark = "✂" if r["written"] else " "
+        print(f"  {mark} {path.name:<28} {format_ms(r['onset_before_ms'])} → {format_ms(r['onset_after_ms'])}"
+              f"  {r['duration_before_ms']:6d}ms → {r['duration_after_ms']:6d}ms"
+              f"  {r['bytes_before'] / 1024:7.1f}KB → {size_after:>8}")
+        total_before += r["bytes_before"]
+        total_after += r["bytes_before"] if r["bytes_after"] is None else r["bytes_after"]
+
+    print(f"\n  合計: {total_before / 1024:.1f}KB → {total_after / 1024:.1f}KB"
+          + (f"（エラー {errors}件）" if errors else ""))
+    if run_id:
+        print(f"  元ファイル: python backup_store.py --restore {run_id}")
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="効果音の前後の無音カット + オンセットレポート")
+    parser.add_argument("folder", nargs="?", type=Path, default=SE_DIR, help="対象フォルダ")
+    parser.add_argument("--floor", type=float, default=NOISE_FLOOR_DB, help="ノイズフロア（dBFS）")
+    parser.add_argument("--jobs", "-j", type=int, default=None, help="ワーカー数")
+    parser.add_argument("--dry-run", action="store_true", help="レポートだけ（書き換えない）")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    trim_all(args.folder, args.floor, args.jobs, args.dry_run)
+    print(f"\n⏱ {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+効果音生成 API（ElevenLabs Sound Effects）の共通クライアント
+- generate_*.py はプロンプト表だけを持ち、生成はこのモジュールに任せる
+- asyncio で同時実行数を制限しながら並列にリクエスト（既定 4 本）
+- 429 / 5xx / 通信エラーは指数バックオフで再試行（Retry-After があればそれに従う）
+- レスポンスは一時ファイル（.part）に少しずつ書き、最後に置き換える
+  → 途中で失敗しても壊れた mp3 が残らない
+- 標準ライブラリ（urllib）だけで動く。プロキシは使わない
+- 生成結果は保存庫（sound_store.py）に (プロンプト, 長さ, 影響度, URL) をキーにして保存
+  → 同じリクエストは二度と API を呼ばない（同じバッチ内の重複も1回だけ）
+  → --variants N でバリエーションを並べて保存し、--pick で選んだものを assets/audio/se に書き出す
+- --mock でローカルの代替サーバー（mock_sound_server.py）を立てて、オフラインで試せる
+- API キーは環境変数 ELEVENLABS_API_KEY からだけ読む（--mock のときは不要）
+
+使い方（generate_*.py 共通の引数）:
+    export ELEVENLABS_API_KEY=...
+    python generate_connect_v2.py
+    python generate_connect_v2.py --concurrency 8
+    python generate_connect_v2.py --variants 3                      # 3パターンずつ用意（足りない分だけ生成）
+    python generate_connect_v2.py --list --audition /tmp/ab         # 並べて書き出して聞き比べ
+    python generate_connect_v2.py --pick se_connect_v2_koron=2      # 2番目を使う
+    python generate_connect_v2.py --force                           # 作り直す（バリエーションが増える）
+    python generate_connect_v2.py --overwrite                       # ディスク上で変えたファイルも選択に戻す
+    python generate_connect_v2.py --mock --output /tmp/se_test     # API を使わずに試す
+    python generate_connect_v2.py --api-url http://127.0.0.1:8765/v1/sound-generation
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from sound_store import SoundStore, request_key
+
+# Windows コンソールのUTF-8対応
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding='utf-8')
+
+API_KEY_ENV = "ELEVENLABS_API_KEY"
+API_KEY = os.environ.get(API_KEY_ENV)
+API_URL = os.environ.get("SOUND_API_URL", "https://api.elevenlabs.io/v1/sound-generation")
+
+OUTPUT_DIR = Path(__file__).parent / "assets" / "audio" / "se"
+
+CONCURRENCY = 4          # 同時に投げるリクエスト数
+MAX_ATTEMPTS = 5         # 1プロンプトあたりの最大試行回数
+BACKOFF_BASE = 1.0       # 再試行の待ち時間（秒）: BACKOFF_BASE * 2^(試行回数-1) + ゆらぎ
+BACKOFF_MAX = 30.0
+TIMEOUT = 60             # 1リクエストのタイムアウト（秒）
+CHUNK_SIZE = 64 * 1024
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# プロキシを使わない（環境変数のプロキシ設定を無視する）
+_opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
+
+
+class RetryableError(Exception):
+    """再試行すれば成功するかもしれないエラー（429 / 5xx / 通信エラー）"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# ========================================
+# 1リクエスト（スレッドで実行）
+# ========================================
+
+def request_body(item, duration_seconds, prompt_influence):
+    """プロンプト表の1行 → API のリクエスト JSON（行ごとの指定が優先）"""
+    body = {
+        "text": item["prompt"],
+        "duration_seconds": item.get("duration_seconds", duration_seconds),
+        "prompt_influence": item.get("prompt_influence", prompt_influence),
+    }
+    return {k: v for k, v in body.items() if v is not None}
+
+
+def _retry_after(headers):
+    value = headers.get("Retry-After") if headers else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def post_to_file(url, api_key, body, output_path, timeout=TIMEOUT):
+    """
+    POST してレスポンスを output_path に保存（.part に書いてから置き換え）
+    戻り値: 書いたバイト数
+    """
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(body).encode("utf-8"),
+        headers={"xi-api-key": api_key, "Content-Type": "application/json", "Accept": "audio/mpeg"},
+        method="POST",
+    )
+    part_path = output_path.with_name(output_path.name + ".part")
+    try:
+        with _opener.open(request, timeout=timeout) as response, open(part_path, "wb") as f:
+            size = 0
+            for chunk in iter(lambda: response.read(CHUNK_SIZE), b""):
+                f.write(chunk)
+                size += len(chunk)
+    except urllib.error.HTTPError as e:
+        part_path.unlink(missing_ok=True)
+        detail = e.read()[:200].decode("utf-8", "replace")
+        if e.code in RETRY_STATUSES:
+            raise RetryableError(f"HTTP {e.code}: {detail}", _retry_after(e.headers)) from None
+        raise RuntimeError(f"HTTP {e.code}: {detail}") from None
+    except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+        part_path.unlink(missing_ok=True)
+        raise RetryableError(f"通信エラー: {e}") from None
+
+    if size == 0:
+        part_path.unlink(missing_ok=True)
+        raise RetryableError("空のレスポンス")
+    os.replace(part_path, output_path)
+    return size
+
+
+# ========================================
+# 並列実行
+# ========================================
+
+def _log(options, message):
+    if options["verbose"]:
+        print(message)
+
+
+async def _fetch_variant(name, key, body, store, semaphore, executor, options):
+    """
+    1回生成して保存庫に取り込む（失敗は再試行）
+    戻り値: (sha or None, 試行回数, エラー)
+    """
+    error = None
+    for attempt in range(1, options["max_attempts"] + 1):
+        async with semaphore:
+            try:
+                incoming = store.incoming_path(key)
+                await asyncio.get_running_loop().run_in_executor(
+                    executor, post_to_file,
+                    options["api_url"], options["api_key"], body, incoming, options["timeout"],
+                )
+                return store.add(key, body, incoming), attempt, None
+            except RetryableError as e:
+                error = str(e)
+                wait = e.retry_after
+            except Exception as e:
+                return None, attempt, f"{type(e).__name__}: {e}"
+        # 待っている間は他のプロンプトに枠を譲る
+        if attempt < options["max_attempts"]:
+            if wait is None:
+                wait = min(BACKOFF_MAX, options["backoff"] * 2 ** (attempt - 1)) * (0.5 + random.random() / 2)
+            _log(options, f"  ↻ {name}: {error}（{wait:.1f}秒後に再試行 {attempt + 1}/{options['max_attempts']}）")
+            await asyncio.sleep(wait)
+    return None, options["max_attempts"], error
+
+
+async def _ensure_variants(name, key, body, count, store, semaphore, executor, options):
+    """キーのバリエーションを count 個 追加で生成（同じキーの項目が何個あっても1回だけ呼ばれる）"""
+    start = time.perf_counter()
+    fetched = await asyncio.gather(*[
+        _fetch_variant(name, key, body, store, semaphore, executor, options) for _ in range(count)
+    ])
+    errors = [e for sha, _, e in fetched if sha is None]
+    return {
+        "fetched": sum(1 for sha, _, _ in fetched if sha),
+        "attempts": sum(a for _, a, _ in fetched),
+        "error": errors[0] if errors else None,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+
+async def _generate_all(prompts, output_dir, store, options):
+    output_dir.mkdir(parents=True, exist_ok=True)
+    semaphore = asyncio.Semaphore(options["concurrency"])
+    # 既定のスレッドプールは CPU 数で上限が決まるので、同時実行数ぶんのスレッドを用意する
+    executor = ThreadPoolExecutor(max_workers=options["concurrency"])
+
+    # 1. 足りないバリエーションだけ生成（同じリクエストはまとめて1回）
+    keys, jobs = {}, {}
+    for item in prompts:
+        body = request_body(item, options["duration_seconds"], options["prompt_influence"])
+        key = keys[item["name"]] = request_key(body, options["api_url"])
+        output_path = output_dir / f"{item['name']}.mp3"
+        if options["skip_existing"] and not store.variants(key) and output_path.exists():
+            # 保存庫ができる前に作ったファイルは、そのリクエストの結果として取り込む
+            store.add(key, body, output_path, move=False)
+        if key in jobs:
+            continue
+        missing = max(0, options["variants"] - len(store.variants(key)))
+        if options["force"]:
+            missing = max(missing, 1)
+        if missing:
+            jobs[key] = _ensure_variants(item["name"], key, body, missing, store, semaphore, executor, options)
+    try:
+        outcomes = dict(zip(jobs, await asyncio.gather(*jobs.values())))
+    finally:
+        executor.shutdown(wait=False)
+        store.save()
+
+    # 2. 選んだバリエーションを書き出す
+    results = []
+    for item in prompts:
+        key = keys[item["name"]]
+        outcome = outcomes.get(key, {"fetched": 0, "attempts": 0, "error": None, "seconds": 0.0})
+        output_path = output_dir / f"{item['name']}.mp3"
+        index = options["picks"].get(item["name"])
+        if index is None and options["force"] and outcome["fetched"]:
+            index = len(store.variants(key))  # 作り直した → 新しいものを使う
+        previous = store.chosen.get(item["name"], {}).get("sha")
+        try:
+            sha = store.choose(item["name"], key, index)
+        except ValueError as e:
+            sha, outcome = None, {**outcome, "error": str(e)}
+        result = {
+            "name": item["name"], "path": output_path, "ok": sha is not None,
+            "cached": outcome["fetched"] == 0 and sha is not None,
+            "variants": len(store.variants(key)),
+            "chosen": store.variants(key).index(sha) + 1 if sha else None,
+            "written": False, "drifted": False, "bytes": 0, **outcome,
+        }
+        if sha:
+            # 今回選択が変わったときだけ既存のファイルを置き換える
+            # （前回と同じ選択なら、ディスク上で変えたファイルはそのまま）
+            # skip_existing のスクリプトは、選択の記録がないファイルも置き換えない
+            changed = sha != previous and not (options["skip_existing"] and previous is None)
+            status = store.materialize(item["name"], sha, output_path,
+                                       overwrite=changed or options["overwrite"])
+            result["written"] = status == "written"
+            result["drifted"] = status == "drifted"
+            result["bytes"] = output_path.stat().st_size
+            if result["drifted"]:
+                _log(options, f"  [DRIFT] {output_path.name}: 保存庫の v{result['chosen']} と内容が違うので"
+                              f"そのまま（戻すには --overwrite）")
+            else:
+                state = "cache" if result["cached"] else f"{outcome['seconds']:.1f}s"
+                _log(options, f"  [OK] {output_path.name} (v{result['chosen']}/{result['variants']}, "
+                              f"{result['bytes'] / 1024:.1f}KB, {state})")
+        else:
+            _log(options, f"  [ERROR] {item['name']}: {outcome['error']}")
+        results.append(result)
+    store.save()
+    return results
+
+
+def generate_all(prompts, output_dir=OUTPUT_DIR, duration_seconds=1.0, prompt_influence=0.5,
+                 concurrency=CONCURRENCY, api_url=API_URL, api_key=API_KEY, skip_existing=False,
+                 max_attempts=MAX_ATTEMPTS, backoff=BACKOFF_BASE, timeout=TIMEOUT, verbose=True,
+                 store=None, variants=1, force=False, picks=None, overwrite=False):
+    """
+    プロンプト表をまとめて生成（保存庫にあるリクエストは API を呼ばない）
+    prompts: [{"name", "prompt", ("duration_seconds"), ("prompt_influence")}]
+    variants: リクエストごとに用意しておくバリエーション数（足りない分だけ生成）
+    force: 保存庫にあっても1回生成し、新しいものを使う
+    picks: {名前: バリエーション番号（1始まり）}
+    overwrite: ディスク上で変わったファイルも選んだバリエーションで上書きする
+      （既定では、ファイルが無いか今回選択が変わったときだけ書き出す）
+    戻り値: [{"name", "path", "ok", "cached", "variants", "chosen", "drifted", "bytes", "seconds", "error", ...}]
+    """
+    if not api_key:
+        raise ValueError(f"API キーがありません（環境変数 {API_KEY_ENV} を設定してください）")
+    options = {
+        "duration_seconds": duration_seconds,
+        "prompt_influence": prompt_influence,
+        "concurrency": max(1, concurrency),
+        "api_url": api_url,
+        "api_key": api_key,
+        "max_attempts": max(1, max_attempts),
+        "backoff": backoff,
+        "timeout": timeout,
+        "verbose": verbose,
+        "skip_existing": skip_existing,
+        "variants": max(1, variants),
+        "force": force,
+        "picks": picks or {},
+        "overwrite": overwrite,
+    }
+    return asyncio.run(_generate_all(prompts, Path(output_dir), store or SoundStore(), options))
+
+
+# ========================================
+# generate_*.py 共通の CLI
+# ========================================
+
+def print_summary(groups, elapsed):
+    results = [r for _, group in groups for r in group]
+    ok = sum(1 for r in results if r["ok"])
+    cached = sum(1 for r in results if r["cached"])
+    drifted = sum(1 for r in results if r["drifted"])
+    print("\n" + "=" * 50)
+    print(f"完了: {ok}/{len(results)} ファイル（保存庫から {cached}件, {elapsed:.1f}s）")
+    if drifted:
+        print(f"⚠ 保存庫の選択と内容が違うファイル: {drifted}件（そのまま。戻すには --overwrite）")
+    for title, group in groups:
+        if len(groups) > 1:
+            print(f"\n【{title}】")
+        for r in group:
+            mark = ("~" if r["drifted"] else "-") if r["ok"] else "✗"
+            variant = f"  v{r['chosen']}/{r['variants']}" if r["ok"] else f"  ({r['error']})"
+            print(f"  {mark} {r['path'].name}{variant}")
+    print("=" * 50)
+
+
+def list_variants(groups, store, api_url, audition_dir=None, **defaults):
+    """保存庫のバリエーションを表示（audition_dir があれば <名前>.v<番号>.mp3 で並べて書き出す）"""
+    for title, prompts in groups:
+        print(f"\n【{title}】")
+        for item in prompts:
+            body = request_body(item, defaults.get("duration_seconds", 1.0), defaults.get("prompt_influence", 0.5))
+            key = request_key(body, api_url)
+            variants = store.variants(key)
+            chosen = store.chosen.get(item["name"], {}).get("sha")
+            print(f"  {item['name']}  ({len(variants)} variants, key {key[:10]})")
+            for i, sha in enumerate(variants, 1):
+                blob = store.blob_path(sha)
+                mark = "✓" if sha == chosen else " "
+                print(f"    {mark} v{i}: {blob.stat().st_size / 1024:6.1f}KB  {blob}")
+                if audition_dir:
+                    store.materialize(item["name"], sha, Path(audition_dir) / f"{item['name']}.v{i}.mp3")
+
+
+def parse_picks(values):
+    """["name=2", ...] → {"name": 2}（番号は 1 以上。上限は保存庫のバリエーション数で choose が確認）"""
+    picks = {}
+    for value in values or []:
+        name, _, index = value.rpartition("=")
+        if not name or not index.isdigit() or int(index) < 1:
+            raise ValueError(f"--pick の形式が違います: {value}（NAME=N、N は 1 以上）")
+        picks[name] = int(index)
+    return picks
+
+
+def main(groups, description, output_dir=OUTPUT_DIR, skip_existing=False, argv=None, **defaults):
+    """
+    generate_*.py の共通 main
+    groups: [(見出し, プロンプト表)]。defaults は generate_all の既定値（duration_seconds など）
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--output", "-o", type=Path, default=output_dir, help="出力先フォルダ")
+    parser.add_argument("--concurrency", "-c", type=int, default=CONCURRENCY, help="同時リクエスト数")
+    parser.add_argument("--api-url", default=API_URL, help="API の URL（代替サーバーを使う場合）")
+    parser.add_argument("--mock", action="store_true", help="ローカルの代替サーバーで生成（オフライン確認用）")
+    parser.add_argument("--store", type=Path, help="保存庫の場所（--mock のときは一時フォルダ）")
+    parser.add_argument("--variants", type=int, default=1, help="リクエストごとに用意するバリエーション数")
+    parser.add_argument("--pick", nargs="+", metavar="NAME=N", help="使うバリエーションを選ぶ（1始まり）")
+    parser.add_argument("--list", action="store_true", help="保存庫のバリエーションを表示して終了")
+    parser.add_argument("--audition", type=Path, metavar="DIR", help="--list と一緒に: 全バリエーションを並べて書き出す")
+    parser.add_argument("--force", action="store_true", help="保存庫にあっても作り直す（新しいバリエーションを追加）")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="ディスク上で変わったファイルも選んだバリエーションで上書きする")
+    parser.add_argument("--only", nargs="+", help="生成する名前（部分一致）")
+    args = parser.parse_args(argv)
+    try:
+        picks = parse_picks(args.pick)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.only:
+        groups = [(title, [p for p in prompts if any(s in p["name"] for s in args.only)]) for title, prompts in groups]
+    groups = [(title, prompts) for title, prompts in groups if prompts]
+
+    api_url, api_key, server, tmp_store = args.api_url, API_KEY, None, None
+    if not args.mock and not api_key and not args.list:
+        parser.error(f"環境変数 {API_KEY_ENV} が設定されていません（API を使わずに試すなら --mock）")
+    if args.mock:
+        api_key = api_key or "mock"
+        import tempfile
+        from mock_sound_server import start_server
+        server, api_url = start_server()
+        if not args.store:
+            tmp_store = tempfile.TemporaryDirectory()
+            args.store = Path(tmp_store.name)
+        print(f"🧪 代替サーバー: {api_url}")
+    store = SoundStore(args.store) if args.store else SoundStore()
+
+    if args.list:
+        list_variants(groups, store, api_url, args.audition, **defaults)
+        return None
+
+    print("=" * 50)
+    print(description)
+    print("=" * 50)
+    start = time.perf_counter()
+    done = []
+    try:
+        for title, prompts in groups:
+            print(f"\n{title}（{len(prompts)}件, 同時 {args.concurrency}）")
+            done.append((title, generate_all(
+                prompts, args.output, concurrency=args.concurrency, api_url=api_url, api_key=api_key,
+                skip_existing=skip_existing, store=store, variants=args.variants,
+                force=args.force, picks=picks, overwrite=args.overwrite, **defaults,
+            )))
+    finally:
+        if server:
+            server.shutdown()
+        if tmp_store:
+            tmp_store.cleanup()
+    print_summary(done, time.perf_counter() - start)
+    return done
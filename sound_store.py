@@ -0,0 +1,156 @@
+"""
+生成した効果音の保存庫（リクエスト内容をキーにしたキャッシュ）
+- キー = (プロンプト, duration_seconds, prompt_influence, API の URL) のハッシュ
+  → 同じリクエストは二度とお金も時間も使わない
+- 同じリクエストで何回か生成した結果（バリエーション）を並べて保存し、聞き比べて選べる
+- 音声本体は内容の SHA-256 の名前で blobs/ に1つだけ置く（同じ音は1回分の容量）
+- 選んだバリエーションを assets/audio/se/<名前>.mp3 に書き出す（内容が同じなら書かない）
+  書き出した後にディスク上で変わったファイル（trim_audio.py でカットしたものなど）は、
+  選択が変わったときか overwrite のときだけ上書きする（それ以外は「ずれ」として残す）
+
+保存先: .asset_cache/sound_store/（git 管理外）
+    index.json  { "requests": {キー: {"request": {...}, "variants": [sha, ...]}},
+                  "chosen":   {名前: {"key": キー, "sha": sha}} }
+    blobs/<sha>.mp3
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from pathlib import Path
+
+STORE_DIR = Path(__file__).parent / ".asset_cache" / "sound_store"
+HASH_CHUNK = 1024 * 1024
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def request_key(body, endpoint):
+    """リクエストのキー（プロンプト・長さ・影響度・URL から決まる）"""
+    payload = {
+        "text": body["text"],
+        "duration_seconds": body.get("duration_seconds"),
+        "prompt_influence": body.get("prompt_influence"),
+        "endpoint": endpoint,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class SoundStore:
+    def __init__(self, root=STORE_DIR):
+        self.root = Path(root)
+        self.blob_dir = self.root / "blobs"
+        self.incoming_dir = self.root / "incoming"
+        self.index_path = self.root / "index.json"
+        self.requests = {}
+        self.chosen = {}
+        self._lock = threading.Lock()
+
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self.requests = data.get("requests", {})
+                self.chosen = data.get("chosen", {})
+            except (OSError, ValueError):
+                # 壊れた索引は作り直す（blobs は残っているので再取り込みできる）
+                self.requests = {}
+                self.chosen = {}
+
+    # ----- バリエーション -----
+
+    def variants(self, key):
+        """キーのバリエーション（sha のリスト、古い順）"""
+        with self._lock:
+            return list(self.requests.get(key, {}).get("variants", []))
+
+    def blob_path(self, sha):
+        return self.blob_dir / f"{sha}.mp3"
+
+    def incoming_path(self, key):
+        """ダウンロード中のファイルの置き場所（取り込むまで blobs には入れない）"""
+        self.incoming_dir.mkdir(parents=True, exist_ok=True)
+        return self.incoming_dir / f"{key}-{uuid.uuid4().hex}.mp3"
+
+    def add(self, key, request, path, move=True):
+        """
+        ファイルをキーの新しいバリエーションとして取り込む
+        同じ内容が既にあれば増やさない。戻り値: sha
+        """
+        sha = file_sha256(path)
+        blob = self.blob_path(sha)
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        if blob.exists():
+            if move:
+                Path(path).unlink()
+        elif move:
+            os.replace(path, blob)
+        else:
+            shutil.copy2(path, blob)
+
+        with self._lock:
+            entry = self.requests.setdefault(key, {"request": request, "variants": []})
+            if sha not in entry["variants"]:
+                entry["variants"].append(sha)
+        return sha
+
+    # ----- 選択と書き出し -----
+
+    def choose(self, name, key, index=None):
+        """
+        name に使うバリエーションを選ぶ（index は 1 始まり、None なら今の選択を保つ / 最新）
+        戻り値: 選んだ sha（バリエーションがなければ None）
+        """
+        variants = self.variants(key)
+        if not variants:
+            return None
+        if index is not None and not 1 <= index <= len(variants):
+            raise ValueError(f"{name}: v{index} はありません（バリエーションは v1〜v{len(variants)}）")
+        with self._lock:
+            current = self.chosen.get(name)
+            if index is not None:
+                sha = variants[index - 1]
+            elif current and current["key"] == key and current["sha"] in variants:
+                sha = current["sha"]
+            else:
+                # プロンプトが変わった / まだ選んでいない → 最新のバリエーション
+                sha = variants[-1]
+            self.chosen[name] = {"key": key, "sha": sha}
+        return sha
+
+    def materialize(self, name, sha, output_path, overwrite=True):
+        """
+        選んだバリエーションを書き出す（内容が同じなら何もしない）
+        overwrite=False なら、既にある違う内容のファイルは上書きしない
+        戻り値: "written" / "same" / "drifted"（上書きしなかった）
+        """
+        output_path = Path(output_path)
+        if output_path.exists():
+            if file_sha256(output_path) == sha:
+                return "same"
+            if not overwrite:
+                return "drifted"
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = output_path.with_name(output_path.name + ".part")
+        shutil.copyfile(self.blob_path(sha), tmp_path)
+        os.replace(tmp_path, output_path)
+        return "written"
+
+    def save(self):
+        """索引を保存（一時ファイル経由）"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".json.tmp")
+        with self._lock:
+            data = {"requests": self.requests, "chosen": self.chosen}
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.index_path)